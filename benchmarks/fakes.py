@@ -0,0 +1,231 @@
+import asyncio
+import datetime
+import itertools
+
+# Snowflake-ish ids so they never collide with each other across object types
+_ids = itertools.count(100000000000000000)
+
+def snowflake():
+    return next(_ids)
+
+class FakeAsset:
+    def __init__(self, url):
+        self.url = url
+
+class FakeRole:
+    def __init__(self, name):
+        self.id = snowflake()
+        self.name = name
+        self.mention = f"<@&{self.id}>"
+
+class FakeTyping:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+class FakeChannel:
+    """Text or voice channel. Everything sent to it is kept in `sent` for assertions."""
+
+    def __init__(self, guild, name, voice=False):
+        self.id = snowflake()
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{self.id}>"
+        self.voice = voice
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        msg = FakeMessage(self.guild.me, content or "", self, embed=kwargs.get("embed"))
+        self.sent.append(msg)
+        return msg
+
+    def typing(self):
+        return FakeTyping()
+
+    async def fetch_message(self, message_id):
+        for msg in self.sent:
+            if msg.id == message_id:
+                return msg
+        raise LookupError(message_id)
+
+class FakeMember:
+    def __init__(self, guild, name, bot=False, premium=False):
+        self.id = snowflake()
+        self.guild = guild
+        self.name = name
+        self.display_name = name
+        self.nick = None
+        self.bot = bot
+        self.mention = f"<@{self.id}>"
+        self.created_at = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        self.premium_since = self.created_at if premium else None
+        self.display_avatar = FakeAsset(f"https://cdn.example/avatars/{self.id}.png")
+        self.roles = []
+        self.dms = []
+
+    async def send(self, content=None, **kwargs):
+        self.dms.append(content)
+
+    async def add_roles(self, *roles, **kwargs):
+        self.roles.extend(roles)
+
+    def __str__(self):
+        return self.name
+
+class FakeGuild:
+    def __init__(self, name="Bench Guild"):
+        self.id = snowflake()
+        self.name = name
+        self.channels = {}
+        self.members = {}
+        self.roles = [FakeRole(f"Level {n}") for n in (1, 5, 10, 20, 30, 40, 50)]
+        self.me = FakeMember(self, "BOTR", bot=True)
+
+    def add_channel(self, name, voice=False):
+        channel = FakeChannel(self, name, voice)
+        self.channels[channel.id] = channel
+        return channel
+
+    def add_member(self, name, **kwargs):
+        member = FakeMember(self, name, **kwargs)
+        self.members[member.id] = member
+        return member
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_member(self, user_id):
+        return self.members.get(user_id)
+
+    @property
+    def text_channels(self):
+        return [c for c in self.channels.values() if not c.voice]
+
+class FakeReaction:
+    def __init__(self, message, emoji="🎉"):
+        self.message = message
+        self.emoji = emoji
+        self.count = 1
+
+class FakeMessage:
+    def __init__(self, author, content, channel, embed=None):
+        self.id = snowflake()
+        self.author = author
+        self.content = content
+        self.channel = channel
+        self.guild = channel.guild if channel else None
+        self.embeds = [embed] if embed else []
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self.reactions = []
+        self.attachments = []
+
+    async def edit(self, content=None, embed=None, **kwargs):
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embeds = [embed]
+
+    async def delete(self, **kwargs):
+        pass
+
+    async def add_reaction(self, emoji):
+        self.reactions.append(FakeReaction(self, emoji))
+
+class FakeVoiceState:
+    def __init__(self, channel=None, mute=False, deaf=False):
+        self.channel = channel
+        self.mute = mute
+        self.deaf = deaf
+        self.self_mute = False
+        self.self_deaf = False
+
+class FakeRawPayload:
+    """Stand-in for RawMessageDeleteEvent / RawMessageUpdateEvent."""
+
+    def __init__(self, guild, channel, message_id, cached_message=None):
+        self.guild_id = guild.id
+        self.channel_id = channel.id
+        self.message_id = message_id
+        self.cached_message = cached_message
+
+class FakeContext:
+    """Enough of commands.Context to call a command's callback directly."""
+
+    def __init__(self, bot, author, channel, command=None):
+        self.bot = bot
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.message = FakeMessage(author, "", channel)
+        self.command = command
+        self.invoked_with = command.name if command else None
+        self.interaction = None
+        self.db_time = [0.0]
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    async def reply(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    async def defer(self, **kwargs):
+        pass
+
+    def typing(self, **kwargs):
+        return FakeTyping()
+
+class FakeBot:
+    """
+    The parts of BOTR the cogs touch: db, metrics, the gateway cache lookups and
+    readiness (Bench attaches ticks/prices). Nothing here ever opens a socket.
+    """
+
+    def __init__(self, db, metrics):
+        self.db = db
+        self.metrics = metrics
+        self.guilds = []
+        self.user = None
+        self._closed = False
+
+    @property
+    def loop(self):
+        return asyncio.get_running_loop()
+
+    def add_guild(self, guild):
+        self.guilds.append(guild)
+        self.user = guild.me
+        return guild
+
+    def get_guild(self, guild_id):
+        for guild in self.guilds:
+            if guild.id == guild_id:
+                return guild
+        return None
+
+    def get_channel(self, channel_id):
+        for guild in self.guilds:
+            channel = guild.get_channel(channel_id)
+            if channel:
+                return channel
+        return None
+
+    def get_user(self, user_id):
+        for guild in self.guilds:
+            member = guild.get_member(user_id)
+            if member:
+                return member
+        return None
+
+    async def fetch_user(self, user_id):
+        return self.get_user(user_id)
+
+    async def wait_until_ready(self):
+        pass
+
+    def is_ready(self):
+        return True
+
+    def is_closed(self):
+        return self._closed
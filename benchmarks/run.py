@@ -0,0 +1,124 @@
+"""
+Offline benchmark runner.
+
+    python -m benchmarks.run                     # every scenario
+    python -m benchmarks.run economy logging     # scenarios whose name starts with these
+    python -m benchmarks.run --latency-ms 50     # simulate slow market/streamer APIs
+    python -m benchmarks.run --json bench.json   # save results
+    python -m benchmarks.run --compare bench.json
+
+Every scenario gets a fresh in-memory database, a fake guild and a seeded RNG.
+yfinance and all HTTP APIs (CoinGecko, Twitch, YouTube, Kick, TikTok) are stubbed,
+so nothing leaves the machine and two runs do the same work.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import stubs
+from benchmarks.scenarios import SCENARIOS, Bench
+
+async def run_scenario(name, build, stats, seed, warmup):
+    bench = await Bench(seed).open()
+    try:
+        ops = await build(bench)
+
+        # Warm caches / lazy imports on a few ops, then measure the rest from a clean slate
+        for op in ops[:warmup]:
+            await op()
+        ops = ops[warmup:]
+        bench.metrics.reset()
+        stats.reset()
+
+        series = bench.metrics
+        start = time.perf_counter()
+        for op in ops:
+            op_start = time.perf_counter()
+            error = False
+            try:
+                await op()
+            except Exception:
+                error = True
+                logging.getLogger("botr.bench").exception(f"{name}: op failed")
+            series.record("bench", name, time.perf_counter() - op_start, error)
+        wall = time.perf_counter() - start
+
+        row = series.top("bench", "count", 1)[0]
+        return {
+            "scenario": name,
+            "ops": len(ops),
+            "errors": row[2],
+            "ops_per_sec": len(ops) / wall if wall else 0.0,
+            "p50_ms": row[4] * 1000,
+            "p95_ms": row[5] * 1000,
+            "p99_ms": row[6] * 1000,
+            "queries_per_op": bench.queries() / len(ops) if ops else 0.0,
+            "stub_calls_per_op": sum(stats.calls.values()) / len(ops) if ops else 0.0,
+        }
+    finally:
+        await bench.close()
+
+def print_table(results, baseline=None):
+    header = f"{'scenario':<26}{'ops':>6}{'ops/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'q/op':>7}{'api/op':>8}{'err':>5}"
+    if baseline:
+        header += f"{'Δ ops/s':>10}{'Δ p95':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = (f"{r['scenario']:<26}{r['ops']:>6}{r['ops_per_sec']:>11.1f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+                f"{r['p99_ms']:>9.2f}{r['queries_per_op']:>7.1f}{r['stub_calls_per_op']:>8.1f}{r['errors']:>5}")
+        old = (baseline or {}).get(r["scenario"])
+        if old:
+            line += f"{_delta(r['ops_per_sec'], old['ops_per_sec']):>10}{_delta(r['p95_ms'], old['p95_ms']):>9}"
+        print(line)
+
+def _delta(new, old):
+    if not old:
+        return "-"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+async def main(args):
+    stats = stubs.StubStats(latency=args.latency_ms / 1000)
+    stubs.install_yfinance(stats)
+    stubs.install_http(stubs.HttpRouter(stats))
+
+    names = [n for n in SCENARIOS if not args.only or any(n.startswith(prefix) for prefix in args.only)]
+    if not names:
+        print(f"No scenarios match {args.only}. Available: {', '.join(SCENARIOS)}")
+        return 1
+
+    results = []
+    for name in names:
+        results.append(await run_scenario(name, SCENARIOS[name], stats, args.seed, args.warmup))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+
+    print_table(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"seed": args.seed, "latency_ms": args.latency_ms, "results": results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the offline BOTR benchmarks.")
+    parser.add_argument("only", nargs="*", help="Scenario name prefixes to run (default: all)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--warmup", type=int, default=5, help="Ops per scenario to run before measuring")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated latency for every stubbed API call")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Show deltas against a previous --json file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    logging.getLogger("discord").setLevel(logging.ERROR) # voice dependency warnings from importing bot.py
+    sys.exit(asyncio.run(main(args)))
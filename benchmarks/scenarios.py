@@ -0,0 +1,415 @@
+import os
+import random
+import shutil
+import tempfile
+import aiosqlite
+from utils import perf
+from utils.ticks import TickStore
+from utils.price_poller import PricePoller
+from utils.ohlcv import OhlcvStore
+from utils.notify import NotificationQueue
+from utils.screener import SCREENS, UNIVERSE, Screener
+from utils.symbols import SymbolIndex
+from benchmarks.fakes import FakeBot, FakeGuild, FakeContext, FakeMessage, FakeReaction, FakeVoiceState, FakeRawPayload
+
+SCENARIOS = {}
+
+def scenario(name):
+    """Register a scenario. The function gets a Bench and returns a list of async callables (one per op)."""
+    def wrap(func):
+        SCENARIOS[name] = func
+        return func
+    return wrap
+
+class Bench:
+    """
+    One isolated run: a fresh in-memory database with the production schema,
+    a seeded RNG and a fake guild. Scenarios build their fixtures from it.
+    """
+
+    def __init__(self, seed=1234):
+        self.seed = seed
+        self.metrics = perf.Metrics()
+
+    async def open(self):
+        from bot import BOTR
+
+        random.seed(self.seed)
+        conn = await aiosqlite.connect(":memory:")
+        self.bot = FakeBot(perf.InstrumentedConnection(conn, self.metrics), self.metrics)
+        await BOTR.create_tables(self.bot)
+        self.bot.ticks = TickStore()
+        self.bot.prices = PricePoller(self.bot, self.bot.ticks)
+        self.ohlcv_dir = tempfile.mkdtemp(prefix="bench-ohlcv-")
+        self.bot.ohlcv = OhlcvStore(self.ohlcv_dir, self.metrics, self.bot.prices.quotes.breaker("yfinance"))
+        self.bot.notifier = NotificationQueue(self.bot, per_second=10000)
+        self.bot.notifier.start()
+        self.bot.screener = Screener(self.bot)
+        self.bot.symbols = SymbolIndex(self.bot, os.path.join(self.ohlcv_dir, "symbols.json"))
+        self.bot.symbols.build(synthetic_symbols())
+
+        self.guild = self.bot.add_guild(FakeGuild())
+        self.general = self.guild.add_channel("general")
+        self.logs = self.guild.add_channel("mod-logs")
+        self.voice = [self.guild.add_channel(f"Voice {i}", voice=True) for i in range(3)]
+        return self
+
+    async def close(self):
+        self.bot.notifier.stop()
+        await self.bot.db.close()
+        shutil.rmtree(self.ohlcv_dir, ignore_errors=True)
+
+    def members(self, count, prefix="user"):
+        return [self.guild.add_member(f"{prefix}{i}", premium=i % 10 == 0) for i in range(count)]
+
+    def message(self, author, content, channel=None):
+        return FakeMessage(author, content, channel or self.general)
+
+    def context(self, author, command=None, channel=None):
+        return FakeContext(self.bot, author, channel or self.general, command)
+
+    async def seed_users(self, members, balance=1_000_000):
+        await self.bot.db.executemany("INSERT OR IGNORE INTO users (user_id, balance, xp, level) VALUES (?, ?, 0, 1)",
+                                      [(m.id, balance) for m in members])
+        await self.bot.db.commit()
+
+    async def seed_positions(self, rows):
+        """rows: (user_id, ticker, shares, price); written as the ledger's aggregate rows would be."""
+        await self.bot.db.executemany("INSERT INTO portfolio (user_id, ticker, shares, cost, avg_price, avg_buy_price) VALUES (?, ?, ?, ?, ?, ?)",
+                                      [(u, t, n, n * p, p, p) for u, t, n, p in rows])
+        await self.bot.db.commit()
+
+    def queries(self):
+        return sum(series.count for series in self.metrics.series.get("query", {}).values())
+
+def synthetic_symbols(coins=15000):
+    """Symbol index data shaped like the real lists: the stocks the stubs know plus a crowd of coins."""
+    rng = random.Random(99)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    equities = [[t, f"{t.title()} Corp."] for t in sorted(set(UNIVERSE + STOCKS))]
+    listed = [[c.split(":", 1)[1], c.split(":", 1)[1][:3], c.split(":", 1)[1].title()] for c in COINS]
+    for i in range(coins):
+        name = "".join(rng.choices(letters, k=rng.randint(4, 14)))
+        listed.append([f"{name}-{i}", name[:rng.randint(2, 5)], name.title()])
+    return {"equities": equities, "coins": listed}
+
+# --- Economy ---
+
+@scenario("economy.on_message")
+async def economy_on_message(bench):
+    from cogs.economy import Economy
+    economy = Economy(bench.bot)
+    members = bench.members(200)
+    messages = [bench.message(random.choice(members), f"message {i}") for i in range(2000)]
+    return [lambda m=m: economy.on_message(m) for m in messages]
+
+@scenario("economy.on_reaction_add")
+async def economy_on_reaction_add(bench):
+    from cogs.economy import Economy
+    economy = Economy(bench.bot)
+    members = bench.members(200)
+    await bench.seed_users(members, balance=0)
+    target = bench.message(members[0], "react to me")
+    return [lambda u=random.choice(members): economy.on_reaction_add(FakeReaction(target), u) for _ in range(1000)]
+
+@scenario("economy.voice_session")
+async def economy_voice_session(bench):
+    from cogs.economy import Economy
+    economy = Economy(bench.bot)
+    members = bench.members(100)
+
+    async def session(member):
+        channel = random.choice(bench.voice)
+        await economy.on_voice_state_update(member, FakeVoiceState(), FakeVoiceState(channel))
+        economy.voice_tracking[member.id] -= 15 * 60 # pretend they stayed 15 minutes
+        await economy.on_voice_state_update(member, FakeVoiceState(channel), FakeVoiceState())
+
+    return [lambda m=random.choice(members): session(m) for _ in range(500)]
+
+# --- Logging ---
+
+async def logging_cog(bench):
+    from cogs.logging import Logging
+    logging_ = Logging(bench.bot)
+    await bench.bot.db.execute("INSERT INTO log_settings (guild_id, log_type, channel_id) VALUES (?, 'all', ?)", (bench.guild.id, bench.logs.id))
+    await bench.bot.db.commit()
+    return logging_
+
+@scenario("logging.message_edit")
+async def logging_message_edit(bench):
+    logging_ = await logging_cog(bench)
+    members = bench.members(50)
+    pairs = []
+    for i in range(1000):
+        before = bench.message(random.choice(members), f"original {i}")
+        after = bench.message(before.author, f"edited {i}")
+        pairs.append((before, after))
+    return [lambda p=p: logging_.on_message_edit(*p) for p in pairs]
+
+@scenario("logging.message_delete")
+async def logging_message_delete(bench):
+    logging_ = await logging_cog(bench)
+    members = bench.members(50)
+    ops = []
+    for i in range(1000):
+        msg = bench.message(random.choice(members), f"deleted {i}")
+        if i % 4 == 0:
+            ops.append(lambda m=msg: logging_.on_raw_message_delete(FakeRawPayload(bench.guild, bench.general, m.id)))
+        else:
+            ops.append(lambda m=msg: logging_.on_message_delete(m))
+    return ops
+
+@scenario("logging.voice")
+async def logging_voice(bench):
+    logging_ = await logging_cog(bench)
+    members = bench.members(50)
+    ops = []
+    for _ in range(1000):
+        before, after = random.sample([None] + bench.voice, 2)
+        ops.append(lambda m=random.choice(members), b=before, a=after: logging_.on_voice_state_update(m, FakeVoiceState(b), FakeVoiceState(a)))
+    return ops
+
+# --- Market ---
+
+def market_cog(bench):
+    from cogs.market import Market
+    market = Market(bench.bot)
+    market.alerts_task.cancel() # background loops, not part of any scenario
+    market.snapshot_task.cancel()
+    return market
+
+STOCKS = ["AAPL", "TSLA", "NVDA", "AMD", "MSFT", "GOOGL", "AMZN", "META", "NFLX", "GME"]
+COINS = ["CRYPTO:bitcoin", "CRYPTO:ethereum", "CRYPTO:solana"]
+
+@scenario("market.portfolio")
+async def market_portfolio(bench):
+    market = market_cog(bench)
+    members = bench.members(20)
+    await bench.seed_positions([(m.id, t, random.randint(1, 50), random.uniform(10, 400)) for m in members for t in STOCKS + COINS])
+    return [lambda m=random.choice(members): market.portfolio.callback(market, bench.context(m, market.portfolio)) for _ in range(100)]
+
+@scenario("market.movers")
+async def market_movers(bench):
+    market = market_cog(bench)
+    member = bench.members(1)[0]
+    await bench.bot.screener.refresh()
+    return [lambda: market.movers.callback(market, bench.context(member, market.movers)) for _ in range(100)] + \
+           [lambda s=random.choice(list(SCREENS)): market.screen.callback(market, bench.context(member, market.screen), s) for _ in range(100)]
+
+@scenario("market.screener_refresh")
+async def market_screener_refresh(bench):
+    # The first pass downloads a year for the whole universe, later ones overlay the last 5 days
+    await bench.bot.screener.refresh()
+    return [bench.bot.screener.refresh for _ in range(20)]
+
+@scenario("market.limit_orders")
+async def market_limit_orders(bench):
+    market = market_cog(bench)
+    members = bench.members(50)
+    await bench.seed_users(members)
+
+    async def place_and_cancel(member, ticker):
+        ctx = bench.context(member, market.buy)
+        await market.buy.callback(market, ctx, ticker, round(random.uniform(10, 400), 2), random.randint(1, 10))
+        async with bench.bot.db.execute("SELECT MAX(order_id) FROM limit_orders WHERE user_id = ?", (member.id,)) as cursor:
+            order_id = (await cursor.fetchone())[0]
+        await market.orders.callback(market, ctx)
+        await market.cancel.callback(market, ctx, order_id)
+
+    return [lambda m=random.choice(members), t=random.choice(STOCKS): place_and_cancel(m, t) for _ in range(500)]
+
+@scenario("market.snapshot")
+async def market_snapshot(bench):
+    from utils import snapshots
+    members = bench.members(500)
+    await bench.seed_users(members)
+    await bench.seed_positions([(m.id, t, random.randint(1, 50), random.uniform(10, 400)) for m in members for t in random.sample(STOCKS + COINS, 6)])
+    return [lambda: snapshots.take_snapshot(bench.bot) for _ in range(20)]
+
+@scenario("market.indicator_alerts")
+async def market_indicator_alerts(bench):
+    market = market_cog(bench)
+    members = bench.members(500)
+    kinds = [("rsi", 14, None, 70, "above"), ("sma_cross", 50, 200, None, "above"), ("ema_cross", 12, 26, None, "below"), ("move", None, None, 5, "below")]
+    rows = [(m.id, random.choice(STOCKS + COINS[:1] if k[0] == "move" else STOCKS)) + k for m in members for k in random.sample(kinds, 3)]
+    await bench.bot.db.executemany("INSERT INTO indicator_alerts (user_id, ticker, kind, period, period2, threshold, direction) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    await bench.bot.db.commit()
+    await bench.bot.prices.refresh_since(STOCKS + COINS, 0)
+
+    async def evaluate():
+        # One pass of the alerts loop over every open indicator alert (1500 across 11 symbols)
+        async with bench.bot.db.execute("SELECT id, user_id, ticker, kind, period, period2, threshold, direction FROM indicator_alerts WHERE triggered = 0") as cursor:
+            await market.indicator_alerts.evaluate(await cursor.fetchall())
+
+    return [evaluate for _ in range(100)]
+
+@scenario("market.alerts_loop")
+async def market_alerts_loop(bench):
+    market = market_cog(bench)
+    members = bench.members(200)
+    await bench.seed_users(members)
+    owner = members[0].id
+    # Fresh database, so each sentinel gets id 1: all three must fire on the first pass.
+    # The move sentinel is a coin, whose move is live at any hour (a stock's isn't before the open)
+    await bench.bot.db.execute("INSERT INTO price_alerts (user_id, ticker, target_price, condition) VALUES (?, 'AAPL', 0.01, 'above')", (owner,))
+    await bench.bot.db.execute("INSERT INTO limit_orders (user_id, symbol, order_type, target_price, quantity, created_at) VALUES (?, 'AAPL', 'buy_limit', 1e9, 1, '')", (owner,))
+    await bench.bot.db.execute("INSERT INTO indicator_alerts (user_id, ticker, kind, threshold, direction) VALUES (?, ?, 'move', -1000, 'above')", (owner, COINS[0]))
+    kinds = [("rsi", 14, None, 70, "above"), ("sma_cross", 50, 200, None, "above"), ("move", None, None, 5, "below")]
+    rows = [(m.id, random.choice(STOCKS)) + k for m in members for k in kinds]
+    await bench.bot.db.executemany("INSERT INTO indicator_alerts (user_id, ticker, kind, period, period2, threshold, direction) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    await bench.bot.db.executemany("INSERT INTO price_alerts (user_id, ticker, target_price, condition) VALUES (?, ?, 1e9, 'above')",
+                                   [(m.id, random.choice(STOCKS)) for m in members])
+    await bench.bot.db.commit()
+    await bench.bot.prices.refresh_since(STOCKS + COINS, 0)
+
+    async def check():
+        # One pass of check_alerts_loop's body, then the sentinels must be settled
+        assert await market.check_alerts()
+        async with bench.bot.db.execute("SELECT (SELECT triggered FROM price_alerts WHERE id = 1), (SELECT COUNT(*) FROM limit_orders WHERE order_id = 1), "
+                                        "(SELECT triggered FROM indicator_alerts WHERE id = 1), (SELECT SUM(shares) FROM portfolio WHERE user_id = ?)", (owner,)) as cursor:
+            assert tuple(await cursor.fetchone()) == (1, 0, 1, 1)
+
+    return [check for _ in range(100)]
+
+@scenario("market.symbols")
+async def market_symbols(bench):
+    import types
+    from utils import symbols
+    interaction = types.SimpleNamespace(client=bench.bot)
+    typed = [t[:n] for t in STOCKS + ["bitcoin", "eth", "sol", "doge"] for n in range(1, 5)]
+    typos = ["APPL", "TSLAA", "NVIDA", "MSFTT", "GOGL"]
+
+    async def validate(query):
+        # An unknown symbol costs one quote, then its miss is cached and it's rejected locally
+        if not await bench.bot.symbols.resolve(query):
+            bench.bot.symbols.suggest(query)
+
+    return [lambda q=random.choice(typed): symbols.complete_symbols(interaction, q) for _ in range(1000)] + \
+           [lambda q=random.choice(typos + STOCKS): validate(q) for _ in range(500)]
+
+@scenario("market.quote_outage")
+async def market_quote_outage(bench):
+    # The stub returns nothing for INVALID* tickers; once they have been priced that reads as
+    # Yahoo throttling us, so after the breaker opens the polls below stop reaching it
+    from utils.quotes import FAILURE_THRESHOLD
+    symbols = [f"INVALID{i}" for i in range(100)]
+    bench.bot.ticks.update_many({s: (100.0, 99.0) for s in symbols})
+
+    yahoo = next(p for p in bench.bot.prices.quotes.providers if p.name == "yfinance")
+    calls = []
+    fetch = yahoo.fetch
+    async def counted(batch):
+        calls.append(len(batch))
+        return await fetch(batch)
+    yahoo.fetch = counted
+
+    async def refresh():
+        await bench.bot.prices.refresh_stocks(symbols)
+        # Every batch comes back empty; the breaker opens after FAILURE_THRESHOLD of them and
+        # Yahoo isn't called again before its retry time (30s, longer than this scenario)
+        assert len(calls) <= FAILURE_THRESHOLD, calls
+
+    async def quote(symbol):
+        tick = await bench.bot.prices.quote(symbol)
+        assert tick.stale # served from the store while the breaker is open
+        assert len(calls) == FAILURE_THRESHOLD, calls
+
+    return [refresh for _ in range(50)] + \
+           [lambda s=random.choice(symbols): quote(s) for _ in range(100)]
+
+@scenario("market.chart_history")
+async def market_chart_history(bench):
+    from utils.ohlcv import frame_from_bars
+
+    async def load(ticker, interval):
+        # What /chart does before plotting: stored bars (refreshed if stale) -> DataFrame
+        frame_from_bars(await bench.bot.ohlcv.history(ticker, interval))
+
+    return [lambda t=random.choice(STOCKS), i=random.choice(["1d", "1wk", "1mo"]): load(t, i) for _ in range(300)]
+
+@scenario("market.backtest")
+async def market_backtest(bench):
+    from utils import backtest
+    from benchmarks.stubs import synthetic_history
+
+    # Known answer: SMA(1) > SMA(2) from bar 1 on, so the buy fills at bar 2's close (12) and rides to 18
+    result = backtest.run([10, 11, 12, 15, 18], "sma", 1, 2)
+    assert abs(result["return"] - 0.5) < 1e-9 and result["trades"] == 1, result
+
+    closes = {t: synthetic_history(t, 756)["Close"].to_numpy() for t in STOCKS}
+
+    async def run(ticker, strategy):
+        # The engine /backtest runs in its worker processes, called in-process here
+        backtest.run(closes[ticker], strategy)
+
+    return [lambda t=random.choice(STOCKS), s=random.choice(list(backtest.STRATEGIES)): run(t, s) for _ in range(200)]
+
+# --- Options ---
+
+def options_cog(bench):
+    from cogs.options import Options
+    options = Options(bench.bot)
+    options.check_expiry_task.cancel() # background loop, not part of any scenario
+    return options
+
+@scenario("options.chain")
+async def options_chain(bench):
+    options = options_cog(bench)
+    member = bench.members(1)[0]
+    return [lambda t=random.choice(STOCKS): options.chain.callback(options, bench.context(member, options.chain), t) for _ in range(300)]
+
+@scenario("options.settle")
+async def options_settle(bench):
+    options = options_cog(bench)
+    members = bench.members(200)
+    await bench.seed_users(members)
+    rows = [(m.id, random.choice(STOCKS), random.choice(["call", "put"]), random.uniform(20, 500), "2000-01-03", 1.0, 1)
+            for m in members for _ in range(10)]
+    await bench.bot.db.executemany("INSERT INTO options (user_id, ticker, option_type, strike_price, expiration_date, premium, contracts) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    await bench.bot.db.commit()
+
+    async def settle():
+        await bench.bot.db.execute("UPDATE options SET status = 'active', payout = NULL")
+        assert await options.settle_expired() == len(rows)
+        # Contracts already settled (by this pass or a manual exercise) are never paid again
+        assert await options.settle_expired() == 0
+
+    return [settle for _ in range(20)]
+
+@scenario("risk.report")
+async def risk_report(bench):
+    from cogs.risk import Risk
+    cog = Risk(bench.bot)
+    members = bench.members(300)
+    await bench.seed_positions([(m.id, t, random.randint(1, 50), random.uniform(10, 400)) for m in members for t in random.sample(STOCKS + COINS, 5)])
+    options = [(m.id, random.choice(STOCKS), random.choice(["call", "put"]), random.uniform(20, 500), "2999-01-01", random.uniform(1, 20), 1)
+               for m in members for _ in range(5)]
+    await bench.bot.db.executemany("INSERT INTO options (user_id, ticker, option_type, strike_price, expiration_date, premium, contracts) VALUES (?, ?, ?, ?, ?, ?, ?)", options)
+    await bench.bot.db.commit()
+    admin = members[0]
+    return [lambda: cog.riskreport.callback(cog, bench.context(admin, cog.riskreport)) for _ in range(30)] + \
+           [lambda m=random.choice(members): cog.risk.callback(cog, bench.context(m, cog.risk)) for _ in range(100)]
+
+# --- Streamers ---
+
+@scenario("streamers.check_loop")
+async def streamers_check_loop(bench):
+    from cogs.streamers import Streamers
+    os.environ.setdefault("TWITCH_CLIENT_ID", "stub")
+    os.environ.setdefault("TWITCH_CLIENT_SECRET", "stub")
+    os.environ.setdefault("YOUTUBE_API_KEY", "stub")
+
+    streamers = Streamers(bench.bot)
+    streamers.streamer_check_loop.cancel() # driven by hand below
+
+    platforms = ["twitch", "youtube", "kick", "tiktok"]
+    rows = [(bench.guild.id, bench.general.id, platforms[i % 4], f"streamer{i}", 0) for i in range(80)]
+    await bench.bot.db.executemany("INSERT INTO streamers (guild_id, channel_id, platform, username, last_live) VALUES (?, ?, ?, ?, ?)", rows)
+    await bench.bot.db.commit()
+
+    async def iteration():
+        # Reset cooldowns so every iteration sends the same alerts
+        await bench.bot.db.execute("UPDATE streamers SET last_live = 0")
+        await streamers.streamer_check_loop.coro(streamers)
+
+    return [iteration for _ in range(20)]
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import sys
+import time
+import types
+import urllib.parse
+import zlib
+import numpy as np
+import pandas as pd
+
+# Rows of synthetic history per yfinance period
+PERIOD_BARS = {"1d": 26, "5d": 130, "1mo": 21, "3mo": 63, "6mo": 26, "1y": 52, "2y": 24, "5y": 60, "max": 120, "ytd": 200}
+# Sessions per period for daily downloads (the screener's 1y history, the poller's 5d quotes)
+DAILY_BARS = {"1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260}
+
+def _seed(name):
+    return zlib.crc32(name.encode())
+
+def synthetic_history(symbol, bars):
+    """Deterministic random-walk OHLCV for a symbol; same symbol and length, same frame."""
+    rng = np.random.default_rng(_seed(symbol))
+    base = 20 + _seed(symbol) % 480
+    close = base * np.exp(np.cumsum(rng.normal(0, 0.015, bars)))
+    open_ = np.concatenate(([base], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.01, bars)) * close
+    index = pd.date_range(end=pd.Timestamp("2025-01-31 16:00", tz="America/New_York"), periods=bars, freq="B")
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) + spread,
+        "Low": np.minimum(open_, close) - spread,
+        "Close": close,
+        "Volume": rng.integers(100_000, 5_000_000, bars),
+    }, index=index)
+
+class StubStats:
+    """Call counters and simulated latency shared by the yfinance and HTTP stubs."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = {}
+
+    def hit(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def reset(self):
+        self.calls.clear()
+
+def make_yfinance(stats):
+    """A module object that mimics the slice of yfinance the cogs use."""
+    module = types.ModuleType("yfinance")
+
+    class Ticker:
+        def __init__(self, symbol):
+            self.ticker = symbol.upper()
+
+        def history(self, period="1mo", interval="1d", **kwargs):
+            stats.hit("yfinance.history")
+            if stats.latency:
+                time.sleep(stats.latency) # the real library blocks the caller too
+            if self.ticker.startswith("INVALID"):
+                return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+            return synthetic_history(self.ticker, PERIOD_BARS.get(period, 21))
+
+        @property
+        def info(self):
+            stats.hit("yfinance.info")
+            if stats.latency:
+                time.sleep(stats.latency)
+            hist = synthetic_history(self.ticker, 2)
+            return {"currentPrice": float(hist["Close"].iloc[-1]), "previousClose": float(hist["Close"].iloc[0]),
+                    "shortName": self.ticker, "symbol": self.ticker}
+
+        @property
+        def news(self):
+            stats.hit("yfinance.news")
+            return [{"content": {"title": f"{self.ticker} shares jump on record profit", "canonicalUrl": {"url": "https://news.example/1"}}},
+                    {"content": {"title": f"{self.ticker} analysts see decline", "canonicalUrl": {"url": "https://news.example/2"}}}]
+
+    def download(tickers, period="1mo", interval="1d", group_by="column", **kwargs):
+        stats.hit("yfinance.download")
+        if stats.latency:
+            time.sleep(stats.latency)
+        symbols = tickers.split() if isinstance(tickers, str) else list(tickers)
+        if interval == "1d":
+            bars = int(period[:-1]) if period.endswith("d") else DAILY_BARS.get(period, 21)
+        else:
+            bars = PERIOD_BARS.get(period, 21)
+        frames = {s.upper(): synthetic_history(s.upper(), bars) for s in symbols if not s.upper().startswith("INVALID")}
+        if not frames:
+            return pd.DataFrame()
+        data = pd.concat(frames, axis=1) # (ticker, field) columns, like group_by="ticker"
+        return data if group_by == "ticker" else data.swaplevel(axis=1).sort_index(axis=1)
+
+    module.Ticker = Ticker
+    module.download = download
+    return module
+
+def install_yfinance(stats):
+    """Make `import yfinance` (and the cogs' lazy proxies) resolve to the stub."""
+    sys.modules["yfinance"] = make_yfinance(stats)
+
+class StubResponse:
+    def __init__(self, status, payload):
+        self.status = status
+        self._payload = payload
+
+    async def json(self, **kwargs):
+        return self._payload
+
+    async def text(self, **kwargs):
+        return self._payload if isinstance(self._payload, str) else json.dumps(self._payload)
+
+    async def read(self):
+        return (await self.text()).encode()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+class _PendingRequest:
+    """Returned by session.get/post; awaitable and usable as `async with`, like aiohttp's."""
+
+    def __init__(self, router, method, url, kwargs):
+        self.router = router
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+
+    async def _send(self):
+        return await self.router.handle(self.method, self.url, self.kwargs)
+
+    def __await__(self):
+        return self._send().__await__()
+
+    async def __aenter__(self):
+        return await self._send()
+
+    async def __aexit__(self, *exc):
+        return False
+
+class StubSession:
+    def __init__(self, router, *args, **kwargs):
+        self.router = router
+        self.closed = False
+
+    def get(self, url, **kwargs):
+        return _PendingRequest(self.router, "GET", url, kwargs)
+
+    def post(self, url, **kwargs):
+        return _PendingRequest(self.router, "POST", url, kwargs)
+
+    async def close(self):
+        self.closed = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        return False
+
+class HttpRouter:
+    """
+    Serves canned CoinGecko / Twitch / YouTube / Kick / TikTok responses by host and path.
+    Whether a streamer is live is a pure function of their name, so runs are repeatable.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def session(self, *args, **kwargs):
+        return StubSession(self, *args, **kwargs)
+
+    async def handle(self, method, url, kwargs):
+        parts = urllib.parse.urlsplit(url)
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        self.stats.hit(f"http.{parts.hostname}")
+        if self.stats.latency:
+            await asyncio.sleep(self.stats.latency)
+
+        handler = {
+            "api.coingecko.com": self.coingecko,
+            "id.twitch.tv": self.twitch_auth,
+            "api.twitch.tv": self.twitch,
+            "www.googleapis.com": self.youtube,
+            "kick.com": self.kick,
+            "www.tiktok.com": self.tiktok,
+        }.get(parts.hostname)
+        if not handler:
+            return StubResponse(404, {})
+        return handler(parts.path, query)
+
+    @staticmethod
+    def is_live(name):
+        return _seed(name) % 4 == 0
+
+    def coingecko(self, path, query):
+        data = {}
+        for coin in query.get("ids", "").split(","):
+            if not coin or coin.startswith("invalid"):
+                continue
+            hist = synthetic_history(f"CRYPTO:{coin}", 2)
+            price = float(hist["Close"].iloc[-1])
+            data[coin] = {"usd": price, "eur": price * 0.92, "gbp": price * 0.79,
+                          "usd_24h_change": float(hist["Close"].pct_change().iloc[-1] * 100)}
+        return StubResponse(200, data)
+
+    def twitch_auth(self, path, query):
+        return StubResponse(200, {"access_token": "stub-token", "expires_in": 3600})
+
+    def twitch(self, path, query):
+        if path.endswith("/streams"):
+            user = query.get("user_login", "")
+            if not self.is_live(user):
+                return StubResponse(200, {"data": []})
+            return StubResponse(200, {"data": [{"title": f"{user} live", "thumbnail_url": "https://img.example/{width}x{height}.jpg",
+                                                "game_name": "Just Chatting", "viewer_count": 1234, "user_id": str(_seed(user))}]})
+        return StubResponse(200, {"data": [{"profile_image_url": "https://img.example/avatar.png"}]})
+
+    def youtube(self, path, query):
+        if path.endswith("/search") and query.get("type") == "channel":
+            return StubResponse(200, {"items": [{"id": {"channelId": "UC" + query.get("q", "").lstrip("@")}}]})
+        if path.endswith("/search"):
+            channel = query.get("channelId", "")
+            if not self.is_live(channel):
+                return StubResponse(200, {"items": []})
+            return StubResponse(200, {"items": [{"id": {"videoId": "vid"}, "snippet": {"title": f"{channel} live",
+                                                 "thumbnails": {"high": {"url": "https://img.example/yt.jpg"}}}}]})
+        if path.endswith("/videos"):
+            return StubResponse(200, {"items": [{"liveStreamingDetails": {"concurrentViewers": "321"}}]})
+        return StubResponse(200, {"items": [{"snippet": {"thumbnails": {"default": {"url": "https://img.example/yt-avatar.png"}}}}]})
+
+    def kick(self, path, query):
+        user = path.rstrip("/").rsplit("/", 1)[-1]
+        livestream = None
+        if self.is_live(user):
+            livestream = {"session_title": f"{user} live", "thumbnail": {"url": "https://img.example/kick.jpg"},
+                          "categories": [{"name": "Slots"}], "viewer_count": 99}
+        return StubResponse(200, {"livestream": livestream, "user": {"profile_pic": "https://img.example/kick.png"}})
+
+    def tiktok(self, path, query):
+        user = path.strip("/").split("/")[0].lstrip("@")
+        return StubResponse(200, '{"roomStatus":2}' if self.is_live(user) else '{"roomStatus":4}')
+
+def install_http(router):
+    """Route every aiohttp.ClientSession the cogs open to the stub router."""
+    import aiohttp
+    aiohttp.ClientSession = router.session
@@ -5,9 +5,22 @@ import asyncio
 import aiosqlite
 from dotenv import load_dotenv
 import sys
-import traceback
 import datetime
+import time
 from utils.embeds import Embeds
+from utils.scheduler import Scheduler
+from utils.lazy import preload
+from utils import command_sync
+from utils import log
+from utils import perf
+from utils.loopmon import LoopMonitor
+from utils.ticks import TickStore
+from utils.price_poller import PricePoller
+from utils.ohlcv import OhlcvStore
+from utils.screener import Screener
+from utils.symbols import SymbolIndex
+from utils.notify import NotificationQueue
+from utils import positions
 import difflib
 import atexit
 import subprocess
@@ -16,6 +29,10 @@ load_dotenv()
 
 TOKEN = os.getenv('DISCORD_TOKEN')
 
+startup_log = log.get_logger("startup")
+command_log = log.get_logger("commands")
+event_log = log.get_logger("events")
+
 # Intents setup
 intents = discord.Intents.default()
 intents.message_content = True
@@ -26,43 +43,140 @@ class BOTR(commands.Bot):
     def __init__(self):
         super().__init__(command_prefix='!', intents=intents, help_command=None) # Disable default help
         self.db = None
+        self.scheduler = Scheduler(self)
+        self.metrics = perf.Metrics()
+        self.ticks = TickStore()
+        self.prices = PricePoller(self, self.ticks)
+        self.ohlcv = OhlcvStore(metrics=self.metrics, breaker=self.prices.quotes.breaker("yfinance"))
+        self.notifier = NotificationQueue(self)
+        self.screener = Screener(self)
+        self.symbols = SymbolIndex(self, metrics=self.metrics)
+        self.loop_monitor = LoopMonitor(self.metrics, stall_threshold=int(os.getenv("LOOP_STALL_MS", "250")) / 1000)
+        self.before_invoke(self.before_command)
+        self.after_invoke(self.after_command)
 
     async def setup_hook(self):
-        with open("startup.log", "w") as f:
-            f.write("Starting setup_hook...\n")
+        startup_log.info("Starting setup_hook...")
+
+        # Sample event-loop lag and catch callbacks that block it
+        self.loop_monitor.start()
+
+        # Warm up yfinance/pandas/mplfinance/tweepy in a worker thread while we connect
+        self.preload_task = asyncio.create_task(self.preload_heavy_modules())
         
         try:
             # Initialize database
-            self.db = await aiosqlite.connect('data/bot.db')
+            self.db = perf.InstrumentedConnection(await aiosqlite.connect('data/bot.db'), self.metrics)
+            perf.instrument_http(self.http, self.metrics)
             await self.create_tables()
-            with open("startup.log", "a") as f: f.write("Tables created.\n")
+            startup_log.info("Tables created.")
+
+            # Load pending giveaway/raffle timers
+            pending = await self.scheduler.load()
+            startup_log.info(f"Loaded {pending} scheduled jobs.")
             
-            # Load cogs
-            for filename in os.listdir('./cogs'):
-                if filename.endswith('.py'):
-                    try:
-                        await self.load_extension(f'cogs.{filename[:-3]}')
-                        print(f'Loaded {filename}')
-                        with open("startup.log", "a") as f: f.write(f"Loaded {filename}\n")
-                    except Exception as e:
-                        print(f"Failed to load {filename}: {e}")
-                        with open("startup.log", "a") as f: f.write(f"Failed to load {filename}: {e}\n")
+            # Load cogs one at a time (extension imports are synchronous anyway), timing each
+            started = time.perf_counter()
+            cog_files = sorted(f for f in os.listdir('./cogs') if f.endswith('.py'))
+            results = [await self.load_cog(filename) for filename in cog_files]
+
+            # Per-cog load time report, slowest first
+            for filename, elapsed, error in sorted(results, key=lambda r: r[1], reverse=True):
+                latency_ms = round(elapsed * 1000, 1)
+                if error:
+                    startup_log.error(f"Failed to load {filename}: {error}", exc_info=error, extra={"cog": filename[:-3], "latency_ms": latency_ms})
+                else:
+                    startup_log.info(f"Loaded {filename} in {latency_ms}ms", extra={"cog": filename[:-3], "latency_ms": latency_ms})
+            startup_log.info(f"Loaded {len(cog_files)} cogs in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+            # Cogs have registered their job handlers, start the timer
+            self.scheduler.start()
+
+            # Keep prices for every tracked symbol in the tick store
+            self.prices.start()
+            self.notifier.start()
+            self.screener.start()
+            self.symbols.start()
             
-            # Sync commands
-            try:
-                synced = await self.tree.sync()
-                print(f"Synced {len(synced)} commands globally.")
-                with open("startup.log", "a") as f: f.write(f"Synced {len(synced)} commands globally.\n")
-            except Exception as e:
-                print(f"Error syncing commands: {e}")
-                with open("startup.log", "a") as f: f.write(f"Error syncing commands: {e}\n")
+            # Optional Prometheus endpoint for the perf metrics
+            port = os.getenv("PERF_EXPORTER_PORT")
+            if port:
+                self.metrics_server = await perf.serve_prometheus(self.metrics, int(port))
+                startup_log.info(f"Serving perf metrics on 127.0.0.1:{port}")
+
+            # Sync commands (only when the command tree changed since the last successful sync)
+            await self.sync_commands_if_changed()
 
-            print(f'Logged in as {self.user} (ID: {self.user.id})')
-            with open("startup.log", "a") as f: f.write(f"Logged in as {self.user}\n")
+            startup_log.info(f"Logged in as {self.user} (ID: {self.user.id})")
             
         except Exception as e:
-            print(f"Setup Hook Error: {e}")
-            with open("startup.log", "a") as f: f.write(f"Setup Hook Error: {e}\n")
+            startup_log.exception(f"Setup Hook Error: {e}")
+
+    async def load_cog(self, filename):
+        """Load one extension, returning (filename, seconds, error)."""
+        start = time.perf_counter()
+        try:
+            await self.load_extension(f'cogs.{filename[:-3]}')
+            return filename, time.perf_counter() - start, None
+        except Exception as e:
+            return filename, time.perf_counter() - start, e
+
+    async def preload_heavy_modules(self):
+        report = await asyncio.to_thread(preload)
+        for name, result in report.items():
+            if isinstance(result, Exception):
+                startup_log.warning(f"Preload {name} failed: {result}")
+            else:
+                startup_log.info(f"Preloaded {name} in {result * 1000:.1f}ms", extra={"latency_ms": round(result * 1000, 1)})
+
+    async def sync_commands_if_changed(self):
+        commands_now = command_sync.snapshot(self.tree)
+        state = command_sync.load_state()
+        new_hash = command_sync.tree_hash(commands_now)
+
+        if state.get("hash") == new_hash and os.getenv("FORCE_SYNC") != "1":
+            startup_log.info(f"Command tree unchanged ({new_hash[:12]}), skipped sync.")
+            return
+
+        added, removed, changed = command_sync.diff(state.get("commands", {}), commands_now)
+        startup_log.info(f"Command tree changed: {state.get('hash', 'none')[:12]} -> {new_hash[:12]}",
+                         extra={"data": {"added": added, "removed": removed, "changed": changed}})
+        if added: startup_log.info(f"  Added: {', '.join(added)}")
+        if removed: startup_log.info(f"  Removed: {', '.join(removed)}")
+        if changed: startup_log.info(f"  Changed: {', '.join(changed)}")
+
+        try:
+            synced = await self.tree.sync()
+            command_sync.save_state(commands_now)
+            startup_log.info(f"Synced {len(synced)} commands globally.")
+        except Exception as e:
+            startup_log.exception(f"Error syncing commands: {e}")
+
+    async def before_command(self, ctx):
+        # Bind command context for everything logged while this command runs
+        ctx.log_token = log.bind(command=ctx.command.qualified_name if ctx.command else None,
+                                 cog=ctx.cog.qualified_name if ctx.cog else None,
+                                 guild=ctx.guild.id if ctx.guild else None,
+                                 user=ctx.author.id)
+        ctx.perf_token, ctx.db_time = perf.begin_command()
+        ctx.started_at = time.perf_counter()
+
+    async def after_command(self, ctx):
+        started = getattr(ctx, "started_at", None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            name = ctx.command.qualified_name
+            self.metrics.record("command", name, elapsed, ctx.command_failed)
+            self.metrics.record("command_db", name, ctx.db_time[0])
+            perf.end_command(ctx.perf_token)
+            command_log.info(f"Command {name} finished", extra={"latency_ms": round(elapsed * 1000, 1),
+                                                                 "data": {"db_ms": round(ctx.db_time[0] * 1000, 1), "failed": ctx.command_failed}})
+        token = getattr(ctx, "log_token", None)
+        if token is not None:
+            try:
+                log.unbind(token)
+            except ValueError:
+                pass # Hook ran in a different context than before_invoke
 
     async def create_tables(self):
         async with self.db.cursor() as cursor:
@@ -152,6 +266,15 @@ class BOTR(commands.Bot):
                     ended BOOLEAN DEFAULT 0
                 )
             ''')
+            # Giveaway Entrants Table (snapshot taken at end, used for rerolls)
+            await cursor.execute('''
+                CREATE TABLE IF NOT EXISTS giveaway_entrants (
+                    message_id INTEGER,
+                    user_id INTEGER,
+                    won BOOLEAN DEFAULT 0,
+                    PRIMARY KEY (message_id, user_id)
+                )
+            ''')
             # Raffles Table
             await cursor.execute('''
                 CREATE TABLE IF NOT EXISTS raffles (
@@ -160,9 +283,15 @@ class BOTR(commands.Bot):
                     message_id INTEGER,
                     prize TEXT,
                     ticket_cost INTEGER,
-                    ended BOOLEAN DEFAULT 0
+                    ended BOOLEAN DEFAULT 0,
+                    end_time TEXT,
+                    winners_count INTEGER DEFAULT 1
                 )
             ''')
+            try: await cursor.execute("ALTER TABLE raffles ADD COLUMN end_time TEXT")
+            except: pass
+            try: await cursor.execute("ALTER TABLE raffles ADD COLUMN winners_count INTEGER DEFAULT 1")
+            except: pass
             # Raffle Entries Table
             await cursor.execute('''
                 CREATE TABLE IF NOT EXISTS raffle_entries (
@@ -243,10 +372,76 @@ class BOTR(commands.Bot):
                     status TEXT DEFAULT 'open'
                 )
             ''')
+            # Ticket Archives Table (gzip-compressed transcripts of closed tickets)
+            await cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ticket_archives (
+                    channel_id INTEGER PRIMARY KEY,
+                    guild_id INTEGER,
+                    user_id INTEGER,
+                    channel_name TEXT,
+                    closed_at TEXT,
+                    message_count INTEGER,
+                    transcript BLOB
+                )
+            ''')
+            # Ticket Messages (archived message text; the FTS index below reads its content by rowid)
+            await cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ticket_messages (
+                    id INTEGER PRIMARY KEY,
+                    ticket_id INTEGER,
+                    guild_id INTEGER,
+                    message_id INTEGER,
+                    author TEXT,
+                    content TEXT,
+                    created_at TEXT
+                )
+            ''')
+            await cursor.execute("CREATE INDEX IF NOT EXISTS idx_ticket_messages_ticket ON ticket_messages (ticket_id, id)")
+            # Ticket Messages Full-Text Index (external content: stores only the index)
+            try:
+                await cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'ticket_messages_fts'")
+                row = await cursor.fetchone()
+                if row and "ticket_id" in row[0]:
+                    # Older self-contained index kept ticket_id/guild_id as UNINDEXED columns: move the rows out
+                    await cursor.execute("INSERT INTO ticket_messages (ticket_id, guild_id, message_id, author, content, created_at) "
+                                         "SELECT ticket_id, guild_id, message_id, author, content, created_at FROM ticket_messages_fts")
+                    await cursor.execute("DROP TABLE ticket_messages_fts")
+                await cursor.execute('''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS ticket_messages_fts USING fts5(
+                        content,
+                        author,
+                        content='ticket_messages',
+                        content_rowid='id'
+                    )
+                ''')
+                if row and "ticket_id" in row[0]:
+                    await cursor.execute("INSERT INTO ticket_messages_fts (ticket_messages_fts) VALUES ('rebuild')")
+            except Exception as e:
+                startup_log.warning(f"Could not create ticket search index (SQLite built without FTS5?): {e}")
             # Portfolio Table
             try: await cursor.execute("ALTER TABLE portfolio ADD COLUMN avg_buy_price REAL DEFAULT 0.0")
             except: pass
+            try: await cursor.execute("ALTER TABLE portfolio ADD COLUMN cost REAL")
+            except: pass
+            try: await cursor.execute("ALTER TABLE portfolio ADD COLUMN realized REAL DEFAULT 0")
+            except: pass
+            try:
+                await cursor.execute("ALTER TABLE portfolio ADD COLUMN reserved INTEGER DEFAULT 0")
+                # Sell limits used to take their shares out of the portfolio; hold them as reserved instead
+                await cursor.execute('''
+                    INSERT INTO portfolio (user_id, ticker, shares, avg_price, avg_buy_price, reserved)
+                    SELECT user_id, symbol, 0, 0, 0, 0 FROM limit_orders WHERE order_type = 'sell_limit'
+                    ON CONFLICT (user_id, ticker) DO NOTHING
+                ''')
+                await cursor.execute('''
+                    UPDATE portfolio SET
+                        shares = shares + (SELECT SUM(quantity) FROM limit_orders o WHERE o.order_type = 'sell_limit' AND o.user_id = portfolio.user_id AND o.symbol = portfolio.ticker),
+                        reserved = (SELECT SUM(quantity) FROM limit_orders o WHERE o.order_type = 'sell_limit' AND o.user_id = portfolio.user_id AND o.symbol = portfolio.ticker)
+                    WHERE EXISTS (SELECT 1 FROM limit_orders o WHERE o.order_type = 'sell_limit' AND o.user_id = portfolio.user_id AND o.symbol = portfolio.ticker)
+                ''')
+            except: pass
 
+            # shares/cost/realized/reserved are running totals over fills (see utils/positions.py)
             await cursor.execute('''
                 CREATE TABLE IF NOT EXISTS portfolio (
                     user_id INTEGER,
@@ -254,9 +449,39 @@ class BOTR(commands.Bot):
                     avg_price REAL,
                     shares INTEGER,
                     avg_buy_price REAL DEFAULT 0.0,
+                    cost REAL,
+                    realized REAL DEFAULT 0,
+                    reserved INTEGER DEFAULT 0,
                     PRIMARY KEY (user_id, ticker)
                 )
             ''')
+            # Fills Table (append-only trade ledger)
+            await cursor.execute('''
+                CREATE TABLE IF NOT EXISTS fills (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    ticker TEXT,
+                    side TEXT, -- 'buy' or 'sell'
+                    shares INTEGER,
+                    price REAL,
+                    realized REAL, -- FIFO P/L on sells
+                    source TEXT, -- 'paper', 'limit'
+                    created_at TEXT
+                )
+            ''')
+            # Lots Table (open FIFO lots; fill_id is NULL for holdings from before the ledger)
+            await cursor.execute('''
+                CREATE TABLE IF NOT EXISTS lots (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    ticker TEXT,
+                    fill_id INTEGER,
+                    remaining INTEGER,
+                    price REAL
+                )
+            ''')
+            await cursor.execute("CREATE INDEX IF NOT EXISTS idx_lots_open ON lots (user_id, ticker, id) WHERE remaining > 0")
+            await positions.backfill(cursor)
 
             # Limit Orders Table
             await cursor.execute('''
@@ -304,6 +529,60 @@ class BOTR(commands.Bot):
                     triggered BOOLEAN DEFAULT 0
                 )
             ''')
+            # Indicator Alerts Table
+            await cursor.execute('''
+                CREATE TABLE IF NOT EXISTS indicator_alerts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    ticker TEXT,
+                    kind TEXT,        -- 'rsi', 'sma_cross', 'ema_cross' or 'move'
+                    period INTEGER,   -- RSI period / fast average
+                    period2 INTEGER,  -- slow average
+                    threshold REAL,   -- RSI level or % move
+                    direction TEXT,   -- 'above' or 'below'
+                    triggered BOOLEAN DEFAULT 0,
+                    created_at TEXT
+                )
+            ''')
+            # Screener Snapshot Table (the whole universe, replaced on every refresh)
+            await cursor.execute('''
+                CREATE TABLE IF NOT EXISTS screener (
+                    ticker TEXT PRIMARY KEY,
+                    price REAL,
+                    change_pct REAL,    -- vs previous close
+                    volume REAL,
+                    avg_volume REAL,    -- previous 20 sessions
+                    volume_ratio REAL,
+                    high_52w REAL,
+                    low_52w REAL,
+                    from_high_pct REAL,
+                    new_high BOOLEAN DEFAULT 0,
+                    new_low BOOLEAN DEFAULT 0,
+                    updated_at TEXT
+                )
+            ''')
+            # Watchlist Table
+            await cursor.execute('''
+                CREATE TABLE IF NOT EXISTS watchlist (
+                    user_id INTEGER,
+                    ticker TEXT,
+                    PRIMARY KEY (user_id, ticker)
+                )
+            ''')
+            # Portfolio Snapshots Table (one row per holder per session close)
+            await cursor.execute('''
+                CREATE TABLE IF NOT EXISTS portfolio_snapshots (
+                    user_id INTEGER,
+                    day TEXT,
+                    value REAL, -- holdings at the close
+                    cost REAL,  -- cost basis of those holdings
+                    cash REAL,  -- wallet + bank
+                    partial INTEGER DEFAULT 0, -- some holdings had no closing price and are carried at cost
+                    PRIMARY KEY (user_id, day)
+                )
+            ''')
+            try: await cursor.execute("ALTER TABLE portfolio_snapshots ADD COLUMN partial INTEGER DEFAULT 0")
+            except: pass
             # Polls Table
             await cursor.execute('''
                 CREATE TABLE IF NOT EXISTS polls (
@@ -340,6 +619,8 @@ class BOTR(commands.Bot):
                     status TEXT DEFAULT 'active'
                 )
             ''')
+            try: await cursor.execute("ALTER TABLE options ADD COLUMN payout REAL")
+            except: pass
             # Birthdays Table
             await cursor.execute('''
                 CREATE TABLE IF NOT EXISTS birthdays (
@@ -366,11 +647,27 @@ class BOTR(commands.Bot):
                     timestamp TEXT
                 )
             ''')
+            # Scheduled Jobs Table (giveaway/raffle end timers)
+            await cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                    kind TEXT,
+                    job_key INTEGER,
+                    due REAL,
+                    PRIMARY KEY (kind, job_key)
+                )
+            ''')
         await self.db.commit()
 
     async def close(self):
+        self.scheduler.stop()
+        self.loop_monitor.stop()
+        self.prices.stop()
+        self.notifier.stop()
+        self.screener.stop()
+        self.symbols.stop()
         await self.db.close()
         await super().close()
+        log.shutdown_logging()
 
     async def on_command_error(self, ctx, error):
         if isinstance(error, commands.CommandNotFound):
@@ -395,12 +692,14 @@ class BOTR(commands.Bot):
             await ctx.send(embed=Embeds.error("Permission Denied", f"You need **{perms}** permissions."))
             return
 
-        print(f"Ignoring exception in command {ctx.command}:", file=sys.stderr)
-        traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
+        command_log.error(f"Ignoring exception in command {ctx.command}", exc_info=(type(error), error, error.__traceback__),
+                          extra={"command": ctx.command.qualified_name if ctx.command else ctx.invoked_with,
+                                 "cog": ctx.cog.qualified_name if ctx.cog else None,
+                                 "guild": ctx.guild.id if ctx.guild else None,
+                                 "user": ctx.author.id})
 
     async def on_error(self, event_method, *args, **kwargs):
-        print(f"Ignoring exception in {event_method}:", file=sys.stderr)
-        traceback.print_exc(file=sys.stderr)
+        event_log.exception(f"Ignoring exception in {event_method}", extra={"event": event_method})
 
     async def on_message(self, message):
         if message.author.bot:
@@ -418,8 +717,6 @@ class BOTR(commands.Bot):
 
         await self.process_commands(message)
 
-bot = BOTR()
-
 def cleanup_lock():
     """Removes the lock file on exit."""
     if os.path.exists("bot.lock"):
@@ -472,4 +769,7 @@ if __name__ == '__main__':
     if not TOKEN:
         print("Error: DISCORD_TOKEN not found in .env")
     else:
-        bot.run(TOKEN)
+        log.setup_logging()
+        # Built here rather than at import: spawned worker processes re-import this module
+        bot = BOTR()
+        bot.run(TOKEN, log_handler=None) # Logging is already routed through utils.log
@@ -1,7 +1,7 @@
 import discord
 from discord.ext import commands, tasks
 import datetime
-import zoneinfo
+from utils import market_hours
 
 class Alerts(commands.Cog):
     def __init__(self, bot):
@@ -14,13 +14,7 @@ class Alerts(commands.Cog):
     @tasks.loop(minutes=1)
     async def market_status_loop(self):
         # Get current time in ET
-        try:
-            et_tz = zoneinfo.ZoneInfo("America/New_York")
-        except:
-            # Fallback if zoneinfo fails (though it shouldn't on modern Python)
-            et_tz = datetime.timezone(datetime.timedelta(hours=-5))
-            
-        now = datetime.datetime.now(et_tz)
+        now = market_hours.now_et()
         current_time = now.strftime("%H:%M")
         weekday = now.weekday() # 0=Mon, 6=Sun
 
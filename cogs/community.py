@@ -1,13 +1,78 @@
 import discord
 from discord.ext import commands
-import asyncio
 import random
 import datetime
 
+# Persist giveaway entrants when a giveaway ends so rerolls don't re-page the reactions
+SNAPSHOT_ENTRANTS = True
+
+def weighted_draw(entries, k=1, rng=random):
+    """
+    Draw up to k distinct ids from (id, weight) rows, weighted by weight, without replacement.
+    Weights are kept in a Fenwick tree, so memory is O(participants) and each pick is O(log n)
+    no matter how many entries a user bought.
+    """
+    ids = [i for i, w in entries if w > 0]
+    weights = [w for i, w in entries if w > 0]
+    n = len(ids)
+    if n == 0: return []
+
+    # Build the tree in O(n)
+    tree = [0] + weights
+    for i in range(1, n + 1):
+        parent = i + (i & -i)
+        if parent <= n: tree[parent] += tree[i]
+
+    total = sum(weights)
+    top = 1 << (n.bit_length() - 1)
+    winners = []
+    for _ in range(min(k, n)):
+        # Find the first slot whose prefix sum exceeds the target
+        target = rng.randrange(total)
+        pos, step = 0, top
+        while step:
+            nxt = pos + step
+            if nxt <= n and tree[nxt] <= target:
+                pos = nxt
+                target -= tree[nxt]
+            step >>= 1
+
+        winners.append(ids[pos])
+
+        # Remove the winner's weight so they can't be drawn again
+        w = weights[pos]
+        weights[pos] = 0
+        total -= w
+        i = pos + 1
+        while i <= n:
+            tree[i] -= w
+            i += i & -i
+
+    return winners
+
 class Community(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_load(self):
+        # Giveaway/raffle end timers are persisted and fired by the bot-wide scheduler
+        self.bot.scheduler.register("giveaway", self.end_giveaway)
+        self.bot.scheduler.register("raffle", self.end_raffle)
+        await self.backfill_jobs()
+
+    async def backfill_jobs(self):
+        # Giveaways/raffles started before end timers were persisted have no job yet
+        for kind, table in (("giveaway", "giveaways"), ("raffle", "raffles")):
+            async with self.bot.db.execute(f"SELECT message_id, end_time FROM {table} WHERE ended = 0 AND end_time IS NOT NULL "
+                                           "AND message_id NOT IN (SELECT job_key FROM scheduled_jobs WHERE kind = ?)", (kind,)) as cursor:
+                rows = await cursor.fetchall()
+            for message_id, end_time in rows:
+                try:
+                    due = datetime.datetime.fromisoformat(end_time).timestamp()
+                except ValueError:
+                    continue
+                await self.bot.scheduler.schedule(kind, message_id, due)
+
     # --- News ---
     @commands.hybrid_command(description="Admin: Post a news update.")
     @commands.has_permissions(administrator=True)
@@ -76,8 +141,7 @@ class Community(commands.Cog):
                                   (msg.id, ctx.channel.id, prize, end_time.isoformat(), winners))
         await self.bot.db.commit()
 
-        await asyncio.sleep(seconds)
-        await self.end_giveaway(msg.id)
+        await self.bot.scheduler.schedule("giveaway", msg.id, end_time.timestamp())
 
     async def end_giveaway(self, message_id):
         async with self.bot.db.execute("SELECT channel_id, prize, winners_count, ended FROM giveaways WHERE message_id = ?", (message_id,)) as cursor:
@@ -92,15 +156,7 @@ class Community(commands.Cog):
         except:
             return # Message deleted
 
-        users = []
-        async for user in msg.reactions[0].users():
-            if not user.bot:
-                users.append(user)
-
-        if len(users) < winners_count:
-            winners = users
-        else:
-            winners = random.sample(users, winners_count)
+        winners = await self.sample_entrants(msg, winners_count, snapshot=SNAPSHOT_ENTRANTS)
 
         if winners:
             winner_mentions = ", ".join([w.mention for w in winners])
@@ -108,18 +164,72 @@ class Community(commands.Cog):
         else:
             await channel.send("No one entered the giveaway.")
 
+        if SNAPSHOT_ENTRANTS and winners:
+            await self.bot.db.executemany("UPDATE giveaway_entrants SET won = 1 WHERE message_id = ? AND user_id = ?",
+                                          [(message_id, w.id) for w in winners])
         await self.bot.db.execute("UPDATE giveaways SET ended = 1 WHERE message_id = ?", (message_id,))
         await self.bot.db.commit()
 
+    async def sample_entrants(self, msg, k, snapshot=False):
+        """
+        Pick up to k non-bot users who reacted with 🎉, using reservoir sampling while the
+        reaction pages stream in, so only k users are held in memory.
+        With snapshot=True every entrant is also written to giveaway_entrants for rerolls.
+        """
+        reaction = discord.utils.get(msg.reactions, emoji="🎉")
+        if not reaction: return []
+
+        reservoir = []
+        batch = []
+        seen = 0
+        async for user in reaction.users():
+            if user.bot: continue
+
+            if seen < k:
+                reservoir.append(user)
+            else:
+                j = random.randrange(seen + 1)
+                if j < k: reservoir[j] = user
+            seen += 1
+
+            if snapshot:
+                batch.append((msg.id, user.id))
+                if len(batch) >= 500:
+                    await self.bot.db.executemany("INSERT OR IGNORE INTO giveaway_entrants (message_id, user_id) VALUES (?, ?)", batch)
+                    batch.clear()
+
+        if batch:
+            await self.bot.db.executemany("INSERT OR IGNORE INTO giveaway_entrants (message_id, user_id) VALUES (?, ?)", batch)
+        if snapshot:
+            await self.bot.db.commit()
+
+        return reservoir
+
     @commands.hybrid_command(description="Admin: End a giveaway early.")
     @commands.has_permissions(administrator=True)
     async def gend(self, ctx, message_id: int):
         await self.end_giveaway(message_id)
+        await self.bot.scheduler.cancel("giveaway", message_id)
 
     @commands.hybrid_command(description="Admin: Reroll a giveaway winner.")
     @commands.has_permissions(administrator=True)
     async def greroll(self, ctx, message_id: int):
-        # Simplified reroll logic (just picks one new winner)
+        # Picks one new winner. Uses the entrant snapshot taken when the giveaway ended if there is one.
+        async with self.bot.db.execute("SELECT user_id FROM giveaway_entrants WHERE message_id = ? AND won = 0 ORDER BY RANDOM() LIMIT 1", (message_id,)) as cursor:
+            row = await cursor.fetchone()
+
+        if row:
+            await self.bot.db.execute("UPDATE giveaway_entrants SET won = 1 WHERE message_id = ? AND user_id = ?", (message_id, row[0]))
+            await self.bot.db.commit()
+            await ctx.send(f"🎉 New winner: <@{row[0]}>!")
+            return
+
+        # A snapshot with no row left means everyone who entered has already won
+        async with self.bot.db.execute("SELECT 1 FROM giveaway_entrants WHERE message_id = ? LIMIT 1", (message_id,)) as cursor:
+            if await cursor.fetchone():
+                await ctx.send("No eligible entrants remain, everyone who entered has already won.")
+                return
+
         channel = ctx.channel
         try:
             msg = await channel.fetch_message(message_id)
@@ -127,17 +237,12 @@ class Community(commands.Cog):
             await ctx.send("Message not found.")
             return
 
-        users = []
-        async for user in msg.reactions[0].users():
-            if not user.bot:
-                users.append(user)
-
-        if not users:
+        winners = await self.sample_entrants(msg, 1)
+        if not winners:
             await ctx.send("No valid entries.")
             return
 
-        winner = random.choice(users)
-        await ctx.send(f"🎉 New winner: {winner.mention}!")
+        await ctx.send(f"🎉 New winner: {winners[0].mention}!")
 
     # --- Raffles ---
     @commands.hybrid_group(invoke_without_command=True, description="Manage raffles.")
@@ -146,7 +251,11 @@ class Community(commands.Cog):
 
     @raffle.command(description="Admin: Start a raffle.")
     @commands.has_permissions(administrator=True)
-    async def start(self, ctx, prize: str, ticket_cost: int, duration: str):
+    async def start(self, ctx, prize: str, ticket_cost: int, duration: str, winners: int = 1):
+        if winners < 1:
+            await ctx.send("Winners must be at least 1.")
+            return
+
         # Parse duration
         unit = duration[-1]
         try:
@@ -164,17 +273,15 @@ class Community(commands.Cog):
             return
 
         embed = discord.Embed(title="🎟️ RAFFLE STARTED 🎟️", description=f"Prize: **{prize}**\nTicket Cost: **{ticket_cost}** 🎟️\nUse `!raffle enter <amount>` to join!", color=discord.Color.magenta())
-        embed.set_footer(text=f"Ends in: {duration}")
+        embed.set_footer(text=f"Ends in: {duration} | {winners} winner(s)")
         msg = await ctx.send(embed=embed)
 
-        await self.bot.db.execute("INSERT INTO raffles (channel_id, message_id, prize, ticket_cost) VALUES (?, ?, ?, ?)", 
-                                  (ctx.channel.id, msg.id, prize, ticket_cost))
+        end_time = datetime.datetime.now() + datetime.timedelta(seconds=seconds)
+        await self.bot.db.execute("INSERT INTO raffles (channel_id, message_id, prize, ticket_cost, end_time, winners_count) VALUES (?, ?, ?, ?, ?, ?)", 
+                                  (ctx.channel.id, msg.id, prize, ticket_cost, end_time.isoformat(), winners))
         await self.bot.db.commit()
 
-        # Auto-end task (simplified: just sleep)
-        # In production, use a background task loop to check DB for ended raffles
-        await asyncio.sleep(seconds)
-        await self.end_raffle(msg.id)
+        await self.bot.scheduler.schedule("raffle", msg.id, end_time.timestamp())
 
     @raffle.command(description="Enter the current raffle.")
     async def enter(self, ctx, entries: int):
@@ -217,27 +324,28 @@ class Community(commands.Cog):
         await ctx.send(f"Bought {entries} entries for 🎟️ {total_cost}!")
 
     async def end_raffle(self, message_id):
-        async with self.bot.db.execute("SELECT raffle_id, channel_id, prize, ended FROM raffles WHERE message_id = ?", (message_id,)) as cursor:
+        async with self.bot.db.execute("SELECT raffle_id, channel_id, prize, ended, winners_count FROM raffles WHERE message_id = ?", (message_id,)) as cursor:
             raffle = await cursor.fetchone()
         
         if not raffle or raffle[3]: return
 
-        raffle_id, channel_id, prize, _ = raffle
+        raffle_id, channel_id, prize, _, winners_count = raffle
         channel = self.bot.get_channel(channel_id)
 
-        # Get entries (weighted)
-        async with self.bot.db.execute("SELECT user_id, entries_count FROM raffle_entries WHERE raffle_id = ?", (raffle_id,)) as cursor:
+        # Get entries (one aggregated row per user, weighted by entries_count)
+        async with self.bot.db.execute("SELECT user_id, entries_count FROM raffle_entries WHERE raffle_id = ? AND entries_count > 0", (raffle_id,)) as cursor:
             entries = await cursor.fetchall()
         
-        pool = []
-        for user_id, count in entries:
-            pool.extend([user_id] * count)
-
-        if pool:
-            winner_id = random.choice(pool)
-            winner = channel.guild.get_member(winner_id)
-            mention = winner.mention if winner else f"User ID {winner_id}"
-            await channel.send(f"🎟️ The raffle for **{prize}** has ended!\nWinner: {mention} 🎉")
+        # Never more winners than entrants (weighted_draw caps at len(entries)); rows from before validation may hold 0
+        winner_ids = weighted_draw(entries, max(winners_count or 1, 1))
+
+        if winner_ids:
+            mentions = []
+            for winner_id in winner_ids:
+                winner = channel.guild.get_member(winner_id)
+                mentions.append(winner.mention if winner else f"User ID {winner_id}")
+            label = "Winner" if len(mentions) == 1 else "Winners"
+            await channel.send(f"🎟️ The raffle for **{prize}** has ended!\n{label}: {', '.join(mentions)} 🎉")
         else:
             await channel.send(f"🎟️ The raffle for **{prize}** has ended. No entries.")
 
@@ -248,6 +356,7 @@ class Community(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def end_cmd(self, ctx, message_id: int):
         await self.end_raffle(message_id)
+        await self.bot.scheduler.cancel("raffle", message_id)
 
     # --- Welcome ---
     @commands.hybrid_group(invoke_without_command=True, description="Manage welcome messages.")
@@ -3,6 +3,7 @@ from discord.ext import commands
 import random
 import time
 import datetime
+from utils.log import get_logger
 
 LEVEL_UP_MESSAGES = [
     "🎉 **Level Up!** Way to go, {user}! You've reached Level {level}!",
@@ -67,6 +68,8 @@ LEVEL_ROLES = {
     50: "Level 50"
 }
 
+log = get_logger("economy")
+
 class Economy(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -204,7 +207,7 @@ class Economy(commands.Cog):
 
     @commands.hybrid_command(description="Check your coin and ticket balance.")
     async def balance(self, ctx):
-        print(f"Balance command invoked by {ctx.author} ({ctx.author.id})")
+        log.debug(f"Balance command invoked by {ctx.author} ({ctx.author.id})")
         await ctx.defer()
         async with self.bot.db.execute("SELECT balance, xp, level, tickets FROM users WHERE user_id = ?", (ctx.author.id,)) as cursor:
             row = await cursor.fetchone()
@@ -2,8 +2,12 @@ import discord
 from discord.ext import commands, tasks
 import aiohttp
 import os
-import tweepy
 import datetime
+from utils.lazy import lazy_import
+from utils.log import get_logger
+
+tweepy = lazy_import("tweepy")
+log = get_logger("external")
 
 class External(commands.Cog):
     def __init__(self, bot):
@@ -25,9 +29,9 @@ class External(commands.Cog):
                     access_token=access_token,
                     access_token_secret=access_secret
                 )
-                print("Twitter Client Initialized")
+                log.info("Twitter Client Initialized")
         except Exception as e:
-            print(f"Twitter Setup Error: {e}")
+            log.error(f"Twitter Setup Error: {e}")
 
     @commands.hybrid_command(description="Get top news headlines.")
     async def marketnews(self, ctx, query: str = None):
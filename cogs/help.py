@@ -1,6 +1,9 @@
 import discord
 from discord.ext import commands
 from utils.embeds import Embeds
+from utils.log import get_logger
+
+log = get_logger("help")
 
 class HelpSelect(discord.ui.Select):
     def __init__(self, bot, mapping):
@@ -31,7 +34,9 @@ class HelpSelect(discord.ui.Select):
             "Options": "Trade stock options (calls/puts) and check expiry.",
             "PaperTrading": "Simulate stock trading without real money.",
             "Utility": "User info, server info, and avatar lookup.",
-            "Games": "Social games like Connect 4 and Tic-Tac-Toe."
+            "Games": "Social games like Connect 4 and Tic-Tac-Toe.",
+            "Perf": "Admin performance report for commands, queries and API calls.",
+            "Risk": "Mark-to-market value, P/L and option Greeks for your positions, plus an admin risk report."
         }
 
         # Filter cogs that have commands
@@ -60,6 +65,8 @@ class HelpSelect(discord.ui.Select):
             elif label == "PaperTrading": emoji = "📝"
             elif label == "Utility": emoji = "🛠️"
             elif label == "Games": emoji = "🎮"
+            elif label == "Perf": emoji = "⏱️"
+            elif label == "Risk": emoji = "⚖️"
             
             options.append(discord.SelectOption(label=label, description=desc[:100], emoji=emoji, value=label))
 
@@ -101,17 +108,17 @@ class Help(commands.Cog):
 
     @commands.hybrid_command(description="Show the help menu.")
     async def help(self, ctx):
-        print("Help command triggered!")
+        log.debug("Help command triggered!")
         try:
             mapping = self.bot.help_command.get_bot_mapping()
         except AttributeError:
             # If help_command is None, we need to build mapping manually
-            print("Building mapping manually...")
+            log.debug("Building mapping manually...")
             mapping = {cog: cog.get_commands() for cog in self.bot.cogs.values()}
             # Add standalone commands
             mapping[None] = [c for c in self.bot.commands if c.cog is None]
         
-        print(f"Mapping keys: {mapping.keys()}")
+        log.debug(f"Mapping keys: {mapping.keys()}")
         
         view = HelpView(self.bot, mapping)
         
@@ -3,6 +3,9 @@ from discord.ext import commands
 import datetime
 import re
 from typing import Union
+from utils.log import get_logger
+
+log = get_logger("logging")
 
 class Logging(commands.Cog):
     def __init__(self, bot):
@@ -79,13 +82,12 @@ class Logging(commands.Cog):
             return
 
         try:
-            print(f"Setting log: Guild={ctx.guild.id}, Type={log_type}, Channel={channel_obj.id}")
+            log.debug(f"Setting log: Guild={ctx.guild.id}, Type={log_type}, Channel={channel_obj.id}")
             await self.bot.db.execute("INSERT OR REPLACE INTO log_settings (guild_id, log_type, channel_id) VALUES (?, ?, ?)", (ctx.guild.id, log_type, channel_obj.id))
             await self.bot.db.commit()
-            print("Database commit successful")
             await ctx.send(f"✅ Logging for **{log_type}** set to {channel_obj.mention}.")
         except Exception as e:
-            print(f"Error setting log: {e}")
+            log.exception(f"Error setting log: {e}")
             await ctx.send(f"❌ Error setting log: {e}")
 
     @log_cmd.command(description="Disable logging for a category.")
@@ -1,19 +1,31 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
-import discord
-from discord.ext import commands
-import yfinance as yf
 import asyncio
-import matplotlib.pyplot as plt
 import io
-import pandas as pd
-import mplfinance as mpf
 import aiohttp
 import datetime
+from utils import indicators, market_hours, ohlcv, positions, screener, snapshots, symbols
+from utils.lazy import lazy_import
+from utils.log import get_logger
+
+# Imported on first use (and warmed in the background by setup_hook)
+mpf = lazy_import("mplfinance")
+mfigure = lazy_import("matplotlib.figure")
+
+log = get_logger("market")
 
 class Market(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.indicator_alerts = indicators.IndicatorAlerts(bot)
+        self.alerts_task = self.bot.loop.create_task(self.check_alerts_loop())
+        self.snapshot_task = self.bot.loop.create_task(self.snapshot_loop())
+
+    def cog_unload(self):
+        self.alerts_task.cancel()
+        self.snapshot_task.cancel()
+
     # --- Limit Orders ---
     @commands.hybrid_group(name="limit", description="Manage limit orders.")
     async def limit(self, ctx):
@@ -53,15 +65,13 @@ class Market(commands.Cog):
             await ctx.send("Price and quantity must be positive.")
             return
 
-        # Check shares
-        async with self.bot.db.execute("SELECT shares FROM portfolio WHERE user_id = ? AND ticker = ?", (ctx.author.id, ticker)) as cursor:
-            row = await cursor.fetchone()
-            if not row or row[0] < quantity:
-                await ctx.send(f"❌ You don't have enough shares of {ticker}.")
-                return
+        # Check shares not already held by another sell limit
+        if await positions.available(self.bot.db, ctx.author.id, ticker) < quantity:
+            await ctx.send(f"❌ You don't have enough shares of {ticker}.")
+            return
 
-        # Reserve shares
-        await self.bot.db.execute("UPDATE portfolio SET shares = shares - ? WHERE user_id = ? AND ticker = ?", (quantity, ctx.author.id, ticker))
+        # Reserve shares (still owned until the order fills)
+        await positions.reserve(self.bot.db, ctx.author.id, ticker, quantity)
         
         created_at = datetime.datetime.now().isoformat()
         await self.bot.db.execute("INSERT INTO limit_orders (user_id, symbol, order_type, target_price, quantity, created_at) VALUES (?, ?, ?, ?, ?, ?)",
@@ -106,17 +116,8 @@ class Market(commands.Cog):
             refund = price * qty
             await self.bot.db.execute("UPDATE users SET balance = balance + ? WHERE user_id = ?", (refund, user_id))
         else:
-            # Return shares
-            # Check if portfolio entry exists (it might be empty if they sold all reserved shares, but here we reserved them by deducting)
-            # Actually we deducted shares, so we add them back.
-            async with self.bot.db.execute("SELECT 1 FROM portfolio WHERE user_id = ? AND ticker = ?", (user_id, symbol)) as cursor:
-                if await cursor.fetchone():
-                    await self.bot.db.execute("UPDATE portfolio SET shares = shares + ? WHERE user_id = ? AND ticker = ?", (qty, user_id, symbol))
-                else:
-                    # Should exist if we just deducted, unless we delete rows with 0 shares. 
-                    # If we delete rows with 0 shares, we need to re-insert.
-                    # For now assuming we keep 0 share rows or insert new.
-                    await self.bot.db.execute("INSERT INTO portfolio (user_id, ticker, shares, avg_price, avg_buy_price) VALUES (?, ?, ?, 0, 0)", (user_id, symbol, qty))
+            # Release the reserved shares
+            await positions.release(self.bot.db, user_id, symbol, qty)
 
         await self.bot.db.execute("DELETE FROM limit_orders WHERE order_id = ?", (order_id,))
         await self.bot.db.commit()
@@ -127,107 +128,124 @@ class Market(commands.Cog):
         await self.bot.wait_until_ready()
         while not self.bot.is_closed():
             try:
-                # 1. Check Price Alerts (Existing Logic)
-                async with self.bot.db.execute("SELECT id, user_id, ticker, target_price, condition FROM price_alerts WHERE triggered = 0") as cursor:
-                    alerts = await cursor.fetchall()
-                
-                # 2. Check Limit Orders
-                async with self.bot.db.execute("SELECT order_id, user_id, symbol, order_type, target_price, quantity FROM limit_orders") as cursor:
-                    orders = await cursor.fetchall()
-
-                if not alerts and not orders:
-                    await asyncio.sleep(60)
-                    continue
-
-                # Collect all tickers
-                alert_tickers = [a[2] for a in alerts]
-                order_tickers = [o[2] for o in orders]
-                all_tickers = list(set(alert_tickers + order_tickers))
+                all_tickers = await self.check_alerts()
+            except Exception as e:
+                log.exception(f"Loop error: {e}")
+                all_tickers = []
+
+            if all_tickers is None:
+                await asyncio.sleep(60)
+                continue
+            # Stock prices only move while the market is open; crypto keeps the loop at full speed.
+            # Capped so alerts created while the market is shut are still picked up.
+            await asyncio.sleep(min(market_hours.poll_interval(all_tickers), 900))
+
+    async def check_alerts(self):
+        """One pass over price alerts, limit orders and indicator alerts. Returns the tickers checked, None if idle."""
+        # 1. Check Price Alerts (Existing Logic)
+        async with self.bot.db.execute("SELECT id, user_id, ticker, target_price, condition FROM price_alerts WHERE triggered = 0") as cursor:
+            alerts = await cursor.fetchall()
+        
+        # 2. Check Limit Orders
+        async with self.bot.db.execute("SELECT order_id, user_id, symbol, order_type, target_price, quantity FROM limit_orders") as cursor:
+            orders = await cursor.fetchall()
+
+        # 3. Indicator Alerts
+        async with self.bot.db.execute("SELECT id, user_id, ticker, kind, period, period2, threshold, direction FROM indicator_alerts WHERE triggered = 0") as cursor:
+            indicator_rows = await cursor.fetchall()
+
+        if not alerts and not orders and not indicator_rows:
+            self.indicator_alerts.states.clear()
+            return None
+
+        # Collect all tickers
+        alert_tickers = [a[2] for a in alerts]
+        order_tickers = [o[2] for o in orders]
+        all_tickers = list(set(alert_tickers + order_tickers + [r[2] for r in indicator_rows]))
+        
+        # Latest prices from the tick store (kept fresh by the price poller)
+        prices = {}
+        for ticker in all_tickers:
+            tick = self.bot.ticks.get(ticker)
+            if tick: prices[ticker] = tick.price
+
+        # Process Alerts
+        for alert_id, user_id, ticker, target, condition in alerts:
+            if ticker not in prices: continue
+            current = prices[ticker]
+            triggered = False
+            if condition == 'above' and current >= target: triggered = True
+            elif condition == 'below' and current <= target: triggered = True
+            
+            if triggered:
+                user = self.bot.get_user(user_id)
+                if user:
+                    try: await user.send(f"🚨 **Price Alert!** {ticker} hit **${current:.2f}** (Target: {condition} ${target:.2f})")
+                    except: pass
+                await self.bot.db.execute("UPDATE price_alerts SET triggered = 1 WHERE id = ?", (alert_id,))
+
+        # Process Limit Orders
+        for oid, user_id, symbol, otype, target, qty in orders:
+            if symbol not in prices: continue
+            current = prices[symbol]
+            executed = False
+            
+            if otype == 'buy_limit' and current <= target:
+                # Execute Buy
+                # Funds already deducted. Just add shares.
+                await positions.record_buy(self.bot.db, user_id, symbol, qty, current, "limit")
                 
-                prices = {}
-                # Fetch prices
-                for ticker in all_tickers:
-                    try:
-                        if ticker.startswith("CRYPTO:"):
-                             coin = ticker.split(":")[1]
-                             url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin}&vs_currencies=usd"
-                             async with aiohttp.ClientSession() as session:
-                                 async with session.get(url) as resp:
-                                     data = await resp.json()
-                                     if coin in data:
-                                         prices[ticker] = data[coin]['usd']
-                        else:
-                            stock = yf.Ticker(ticker)
-                            hist = stock.history(period="1d")
-                            if not hist.empty:
-                                prices[ticker] = hist['Close'].iloc[-1]
-                    except:
-                        pass
-
-                # Process Alerts
-                for alert_id, user_id, ticker, target, condition in alerts:
-                    if ticker not in prices: continue
-                    current = prices[ticker]
-                    triggered = False
-                    if condition == 'above' and current >= target: triggered = True
-                    elif condition == 'below' and current <= target: triggered = True
-                    
-                    if triggered:
-                        user = self.bot.get_user(user_id)
-                        if user:
-                            try: await user.send(f"🚨 **Price Alert!** {ticker} hit **${current:.2f}** (Target: {condition} ${target:.2f})")
-                            except: pass
-                        await self.bot.db.execute("UPDATE price_alerts SET triggered = 1 WHERE id = ?", (alert_id,))
-
-                # Process Limit Orders
-                for oid, user_id, symbol, otype, target, qty in orders:
-                    if symbol not in prices: continue
-                    current = prices[symbol]
-                    executed = False
-                    
-                    if otype == 'buy_limit' and current <= target:
-                        # Execute Buy
-                        # Funds already deducted. Just add shares.
-                        # Update Avg Buy Price
-                        async with self.bot.db.execute("SELECT shares, avg_buy_price FROM portfolio WHERE user_id = ? AND ticker = ?", (user_id, symbol)) as cursor:
-                            row = await cursor.fetchone()
-                            if row:
-                                old_shares, old_avg = row
-                                new_shares = old_shares + qty
-                                # Weighted average
-                                new_avg = ((old_shares * old_avg) + (qty * current)) / new_shares
-                                await self.bot.db.execute("UPDATE portfolio SET shares = ?, avg_buy_price = ? WHERE user_id = ? AND ticker = ?", (new_shares, new_avg, user_id, symbol))
-                            else:
-                                await self.bot.db.execute("INSERT INTO portfolio (user_id, ticker, shares, avg_price, avg_buy_price) VALUES (?, ?, ?, ?, ?)", (user_id, symbol, qty, current, current))
-                        
-                        executed = True
-                        msg = f"✅ **Limit Buy Executed!** Bought {qty}x {symbol} at ${current:.2f} (Target: ${target:.2f})"
-
-                    elif otype == 'sell_limit' and current >= target:
-                        # Execute Sell
-                        # Shares already deducted. Just add funds.
-                        total_val = current * qty
-                        await self.bot.db.execute("UPDATE users SET balance = balance + ? WHERE user_id = ?", (total_val, user_id))
-                        executed = True
-                        msg = f"✅ **Limit Sell Executed!** Sold {qty}x {symbol} at ${current:.2f} (Target: ${target:.2f}). Earned ${total_val:.2f}"
-
-                    if executed:
-                        await self.bot.db.execute("DELETE FROM limit_orders WHERE order_id = ?", (oid,))
-                        user = self.bot.get_user(user_id)
-                        if user:
-                            try: await user.send(msg)
-                            except: pass
-
-                await self.bot.db.commit()
+                executed = True
+                msg = f"✅ **Limit Buy Executed!** Bought {qty}x {symbol} at ${current:.2f} (Target: ${target:.2f})"
+
+            elif otype == 'sell_limit' and current >= target:
+                # Execute Sell
+                # Shares were reserved when the order was placed
+                await positions.record_sell(self.bot.db, user_id, symbol, qty, current, "limit", reserved=True)
+                total_val = current * qty
+                await self.bot.db.execute("UPDATE users SET balance = balance + ? WHERE user_id = ?", (total_val, user_id))
+                executed = True
+                msg = f"✅ **Limit Sell Executed!** Sold {qty}x {symbol} at ${current:.2f} (Target: ${target:.2f}). Earned ${total_val:.2f}"
+
+            if executed:
+                await self.bot.db.execute("DELETE FROM limit_orders WHERE order_id = ?", (oid,))
+                user = self.bot.get_user(user_id)
+                if user:
+                    try: await user.send(msg)
+                    except: pass
+
+        # Process Indicator Alerts (one running state per symbol, shared by every alert on it)
+        fired = await self.indicator_alerts.evaluate(indicator_rows)
+        for row, value in fired:
+            self.bot.notifier.send(row[1], self.describe_indicator_alert(row, value, prices.get(row[2])))
+        await self.bot.db.executemany("UPDATE indicator_alerts SET triggered = 1 WHERE id = ?", [(row[0],) for row, _ in fired])
 
+        await self.bot.db.commit()
+        return all_tickers
+
+    async def snapshot_loop(self):
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed():
+            try:
+                # Catches up on the latest close too, if the bot was down when it happened
+                close = market_hours.last_close()
+                if not await snapshots.has_snapshot(self.bot.db, close.date().isoformat()):
+                    count = await snapshots.take_snapshot(self.bot, close)
+                    if count is None:
+                        # Some closing prices are still missing; try again shortly
+                        await asyncio.sleep(900)
+                        continue
+                    log.info(f"Portfolio snapshot for {close.date()}: {count} holders")
             except Exception as e:
-                print(f"Loop error: {e}")
-            
-            await asyncio.sleep(60)
+                log.exception(f"Snapshot loop error: {e}")
+
+            # A few minutes after the next close, once the poller has the closing prices
+            wait = (market_hours.next_close() - market_hours.now_et()).total_seconds() + 600
+            await asyncio.sleep(wait)
 
     @commands.hybrid_command(description="View your portfolio performance.")
     async def portfolio(self, ctx):
-        async with self.bot.db.execute("SELECT ticker, shares, avg_buy_price FROM portfolio WHERE user_id = ?", (ctx.author.id,)) as cursor:
+        async with self.bot.db.execute("SELECT ticker, shares, avg_price FROM portfolio WHERE user_id = ? AND shares > 0", (ctx.author.id,)) as cursor:
             rows = await cursor.fetchall()
         
         if not rows:
@@ -243,22 +261,8 @@ class Market(commands.Cog):
         for ticker, shares, avg_buy in rows:
             if shares <= 0: continue
             
-            # Fetch current price
-            current_price = 0
-            try:
-                if ticker.startswith("CRYPTO:"):
-                     coin = ticker.split(":")[1]
-                     url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin}&vs_currencies=usd"
-                     async with aiohttp.ClientSession() as session:
-                         async with session.get(url) as resp:
-                             data = await resp.json()
-                             if coin in data: current_price = data[coin]['usd']
-                else:
-                    stock = yf.Ticker(ticker)
-                    hist = stock.history(period="1d")
-                    if not hist.empty: current_price = hist['Close'].iloc[-1]
-            except:
-                pass
+            tick = await self.bot.prices.quote(ticker)
+            current_price = tick.price if tick else 0
             
             if current_price == 0:
                 description += f"**{ticker}**: {shares} shares (Price Error)\n"
@@ -284,134 +288,173 @@ class Market(commands.Cog):
         
         await ctx.send(embed=embed)
 
+    @commands.hybrid_command(aliases=["nw"], description="Chart your net worth and P/L over time.")
+    async def networth(self, ctx, days: int = 30):
+        days = max(2, min(days, 3650))
+        since = (market_hours.now_et().date() - datetime.timedelta(days=days)).isoformat()
+        async with self.bot.db.execute("SELECT day, value, cost, cash, partial FROM portfolio_snapshots WHERE user_id = ? AND day >= ? ORDER BY day",
+                                       (ctx.author.id, since)) as cursor:
+            rows = await cursor.fetchall()
+
+        if not rows:
+            await ctx.send("No history yet. Snapshots are taken at every market close while you hold positions.")
+            return
+
+        first_day, first_value, _, first_cash, _ = rows[0]
+        last_day, value, cost, cash, partial = rows[-1]
+        change = (value + cash) - (first_value + first_cash)
+        unrealized = value - cost
+        unrealized_pct = (unrealized / cost * 100) if cost > 0 else 0
+
+        embed = discord.Embed(title=f"📊 {ctx.author.name}'s Net Worth", color=discord.Color.blue())
+        embed.add_field(name="Net Worth", value=f"${value + cash:,.2f}", inline=True)
+        embed.add_field(name="Holdings", value=f"${value:,.2f}", inline=True)
+        embed.add_field(name=f"Change since {first_day}", value=f"{'🟢' if change >= 0 else '🔴'} ${change:+,.2f}", inline=True)
+        embed.add_field(name="Unrealized P/L", value=f"${unrealized:+,.2f} ({unrealized_pct:+.2f}%)", inline=True)
+        footer = f"As of the {last_day} close"
+        if partial:
+            footer += " (some holdings had no closing price and are shown at cost)"
+        embed.set_footer(text=footer)
+
+        if len(rows) < 2:
+            await ctx.send(embed=embed)
+            return
+
+        buf = await asyncio.to_thread(self.render_networth, rows)
+        embed.set_image(url="attachment://networth.png")
+        await ctx.send(embed=embed, file=discord.File(buf, filename="networth.png"))
+
+    @staticmethod
+    def render_networth(rows):
+        days = [datetime.date.fromisoformat(r[0]) for r in rows]
+        fig = mfigure.Figure(figsize=(8, 4))
+        ax = fig.subplots()
+        ax.plot(days, [r[1] + r[3] for r in rows], label="Net worth")
+        ax.plot(days, [r[1] for r in rows], label="Holdings")
+        ax.plot(days, [r[2] for r in rows], label="Cost basis", linestyle="--")
+        ax.legend()
+        ax.grid(alpha=0.3)
+        fig.autofmt_xdate()
+
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=100, bbox_inches="tight")
+        buf.seek(0)
+        return buf
+
     @commands.hybrid_command(description="View top market movers.")
     async def movers(self, ctx):
-        # Using a hardcoded list of popular stocks for now as yfinance movers is unreliable
-        popular = ["AAPL", "TSLA", "NVDA", "AMD", "MSFT", "GOOGL", "AMZN", "META", "NFLX", "GME"]
-        
-        movers_data = []
-        msg = await ctx.send("Fetching market movers...")
-        
-        for ticker in popular:
-            try:
-                stock = yf.Ticker(ticker)
-                hist = stock.history(period="1d")
-                if not hist.empty:
-                    current = hist['Close'].iloc[-1]
-                    open_price = hist['Open'].iloc[0]
-                    change = current - open_price
-                    pct = (change / open_price) * 100
-                    movers_data.append((ticker, current, pct))
-            except:
-                pass
-        
-        # Sort by absolute pct change
-        movers_data.sort(key=lambda x: abs(x[2]), reverse=True)
-        
-        embed = discord.Embed(title="🚀 Top Market Movers (Watchlist)", color=discord.Color.gold())
-        for ticker, price, pct in movers_data[:5]:
-            emoji = "🟢" if pct >= 0 else "🔴"
-            embed.add_field(name=f"{emoji} {ticker}", value=f"${price:.2f} ({pct:+.2f}%)", inline=False)
-            
-        await msg.edit(content=None, embed=embed)
+        # Answered from the screener snapshot (refreshed in the background for the whole universe)
+        gainers = await screener.screen(self.bot.db, "gainers", 5)
+        losers = await screener.screen(self.bot.db, "losers", 5)
+        if not gainers:
+            await ctx.send("⏳ The market screener hasn't finished its first refresh yet. Try again in a minute.")
+            return
 
-async def setup(bot):
-    await bot.add_cog(Market(bot))
+        embed = discord.Embed(title="🚀 Top Market Movers", color=discord.Color.gold())
+        for name, rows in (("🟢 Gainers", gainers), ("🔴 Losers", losers)):
+            lines = [f"**{ticker}** ${price:,.2f} ({change:+.2f}%)" for ticker, price, change, _, _ in rows]
+            embed.add_field(name=name, value="\n".join(lines) or "None", inline=True)
+        embed.set_footer(text=await self.screener_footer())
+        await ctx.send(embed=embed)
+
+    async def screener_footer(self):
+        updated = await self.bot.screener.last_update()
+        return f"{len(self.bot.screener.universe)} large caps | Updated {updated:%Y-%m-%d %H:%M}" if updated else ""
+
+    @commands.hybrid_command(description="Screen large caps: gainers, losers, volume, highs or lows.")
+    async def screen(self, ctx, screen: str = "gainers", limit: int = 10):
+        screen = screen.lower()
+        if screen not in screener.SCREENS:
+            await ctx.send(f"❌ Unknown screen. Choose from: {', '.join(screener.SCREENS)}")
+            return
+
+        rows = await screener.screen(self.bot.db, screen, max(1, min(limit, 25)))
+        if not rows and not await self.bot.screener.last_update():
+            await ctx.send("⏳ The market screener hasn't finished its first refresh yet. Try again in a minute.")
+            return
+
+        lines = []
+        for ticker, price, change, volume_ratio, from_high in rows:
+            line = f"**{ticker}** ${price:,.2f} ({change or 0:+.2f}%)"
+            if screen == "volume":
+                line += f" | {volume_ratio:.1f}x avg volume"
+            elif screen in ("highs", "lows") and from_high is not None:
+                line += f" | {from_high:+.1f}% from 52w high"
+            lines.append(line)
+
+        embed = discord.Embed(title=screener.SCREENS[screen][0], description="\n".join(lines) or "Nothing matches right now.", color=discord.Color.gold())
+        embed.set_footer(text=await self.screener_footer())
+        await ctx.send(embed=embed)
 
     @commands.hybrid_command(aliases=['price'], description="Get real-time price for a ticker.")
+    @app_commands.autocomplete(ticker=symbols.complete_stocks)
     async def p(self, ctx, ticker: str):
         ticker = ticker.upper()
-        try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            
-            # yfinance info can be flaky, try fast_info or history if info fails
-            current_price = info.get('currentPrice') or info.get('regularMarketPrice')
-            if not current_price:
-                 # Fallback to history
-                hist = stock.history(period="1d")
-                if not hist.empty:
-                    current_price = hist['Close'].iloc[-1]
-                else:
-                    await ctx.send(f"Could not find data for {ticker}.")
-                    return
-
-            prev_close = info.get('previousClose') or current_price # Avoid div by zero
-            change = current_price - prev_close
-            pct_change = (change / prev_close) * 100
-            
-            color = discord.Color.green() if change >= 0 else discord.Color.red()
-            arrow = "🔼" if change >= 0 else "🔽"
-            
-            embed = discord.Embed(title=f"{ticker} Price", color=color)
-            embed.add_field(name="Price", value=f"${current_price:.2f}", inline=True)
-            embed.add_field(name="Change", value=f"{arrow} {change:.2f} ({pct_change:.2f}%)", inline=True)
-            
-            await ctx.send(embed=embed)
-        except Exception as e:
-            await ctx.send(f"Error fetching data for {ticker}: {e}")
+        found = await self.bot.symbols.resolve(ticker, "stock")
+        tick = await self.bot.prices.quote(found.symbol) if found else None
+        if not tick:
+            if found and not self.bot.prices.quotes.available(found.symbol):
+                await ctx.send(f"⚠️ The price source is unavailable right now and there is no cached price for {ticker}. Try again later.")
+                return
+            await ctx.send(f"Could not find data for {ticker}.{self.bot.symbols.suggest(ticker, 'stock')}")
+            return
+
+        current_price = tick.price
+        prev_close = tick.prev_close or current_price # Avoid div by zero
+        change = current_price - prev_close
+        pct_change = (change / prev_close) * 100
+        
+        color = discord.Color.green() if change >= 0 else discord.Color.red()
+        arrow = "🔼" if change >= 0 else "🔽"
+        
+        embed = discord.Embed(title=f"{ticker} Price", color=color)
+        embed.add_field(name="Price", value=f"${current_price:.2f}", inline=True)
+        embed.add_field(name="Change", value=f"{arrow} {change:.2f} ({pct_change:.2f}%)", inline=True)
+        if tick.stale:
+            embed.set_footer(text=f"⚠️ Last known price as of {datetime.datetime.fromtimestamp(tick.ts):%Y-%m-%d %H:%M}; the price source is unavailable.")
+        
+        await ctx.send(embed=embed)
 
     @commands.hybrid_command(description="Get real-time crypto price (CoinGecko).")
+    @app_commands.autocomplete(coin=symbols.complete_coins)
     async def crypto(self, ctx, coin: str):
-        coin = coin.lower()
-        url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin}&vs_currencies=usd,eur,gbp&include_24hr_change=true"
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    await ctx.send("❌ Error fetching data.")
-                    return
-                
-                data = await response.json()
-                if coin not in data:
-                    await ctx.send(f"❌ Coin `{coin}` not found. Try the full name (e.g., `bitcoin`, `ethereum`).")
-                    return
-                
-                price_usd = data[coin]['usd']
-                change_24h = data[coin].get('usd_24h_change', 0)
-                
-                color = discord.Color.green() if change_24h >= 0 else discord.Color.red()
-                arrow = "🔼" if change_24h >= 0 else "🔽"
-                
-                embed = discord.Embed(title=f"{coin.title()} Price", color=color)
-                embed.add_field(name="USD", value=f"${price_usd:,.2f}", inline=True)
-                embed.add_field(name="24h Change", value=f"{arrow} {change_24h:.2f}%", inline=True)
-                embed.set_footer(text="Source: CoinGecko")
-                
-                await ctx.send(embed=embed)
+        # Accepts the CoinGecko id, symbol or name (bitcoin, btc, Bitcoin)
+        found = await self.bot.symbols.resolve(coin, "coin")
+        tick = await self.bot.prices.quote(found.symbol) if found else None
+        if not tick:
+            await ctx.send(f"❌ Coin `{coin}` not found.{self.bot.symbols.suggest(coin, 'coin') or ' Try the full name (e.g., `bitcoin`, `ethereum`).'}")
+            return
+        coin = found.name
+        
+        price_usd = tick.price
+        change_24h = (tick.price / tick.prev_close - 1) * 100 if tick.prev_close else 0
+        
+        color = discord.Color.green() if change_24h >= 0 else discord.Color.red()
+        arrow = "🔼" if change_24h >= 0 else "🔽"
+        
+        embed = discord.Embed(title=f"{coin.title()} Price", color=color)
+        embed.add_field(name="USD", value=f"${price_usd:,.2f}", inline=True)
+        embed.add_field(name="24h Change", value=f"{arrow} {change_24h:.2f}%", inline=True)
+        embed.set_footer(text=f"⚠️ Last known price as of {datetime.datetime.fromtimestamp(tick.ts):%Y-%m-%d %H:%M}" if tick.stale else "Source: CoinGecko")
+        
+        await ctx.send(embed=embed)
 
     @commands.hybrid_group(name="pricealert", aliases=["pa"], invoke_without_command=True, description="Manage price alerts.")
     async def pricealert(self, ctx):
         await ctx.send("Use `/pricealert set <ticker> <price>`, `/pricealert list`, or `/pricealert remove <id>`.")
 
     @pricealert.command(description="Set a price alert.")
+    @app_commands.autocomplete(ticker=symbols.complete_symbols)
     async def set(self, ctx, ticker: str, price: float):
         ticker = ticker.upper()
         # Determine condition (above or below current price)
-        # We need current price first
+        # We need current price first: the symbol index says whether it's a stock or a coin
         current_price = 0
-        is_crypto = False
-        
-        # Check if crypto (simple heuristic: if ticker is a common name or user specifies)
-        # For now, let's assume stocks unless prefixed with CRYPTO:
-        # Actually, let's just support stocks for now in alerts to keep it simple, or try both.
-        
-        try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period="1d")
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-            else:
-                # Try crypto
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(f"https://api.coingecko.com/api/v3/simple/price?ids={ticker.lower()}&vs_currencies=usd") as resp:
-                        data = await resp.json()
-                        if ticker.lower() in data:
-                            current_price = data[ticker.lower()]['usd']
-                            is_crypto = True
-                            ticker = f"CRYPTO:{ticker.lower()}"
-        except:
-            pass
+        found = await self.bot.symbols.resolve(ticker)
+        tick = await self.bot.prices.quote(found.symbol) if found else None
+        if tick:
+            ticker = found.symbol
+            current_price = tick.price
         
         if current_price == 0:
             await ctx.send(f"❌ Could not verify current price for {ticker}. Alert not set.")
@@ -440,67 +483,119 @@ async def setup(bot):
         
         await ctx.send(embed=embed)
 
-    @pricealert.command(description="Remove an alert by ID.")
-    async def remove(self, ctx, alert_id: int):
+    @pricealert.command(name="remove", description="Remove an alert by ID.")
+    async def remove_alert(self, ctx, alert_id: int):
         await self.bot.db.execute("DELETE FROM price_alerts WHERE id = ? AND user_id = ?", (alert_id, ctx.author.id))
         await self.bot.db.commit()
         await ctx.send(f"🗑️ Alert {alert_id} removed.")
 
-    @commands.hybrid_command(name="marketnews", aliases=["mnews"], description="Get news and sentiment for a ticker.")
-    async def marketnews(self, ctx, ticker: str):
+    # --- Indicator Alerts ---
+    @staticmethod
+    def describe_indicator(kind, period, period2, threshold, direction):
+        if kind == "rsi":
+            return f"RSI({period}) {direction} {threshold:g}"
+        if kind == "move":
+            return f"Day move {'+' if direction == 'above' else '-'}{threshold:g}%"
+        avg = kind.split("_")[0].upper()
+        return f"{avg}({period}) crosses {direction} {avg}({period2})"
+
+    def describe_indicator_alert(self, row, value, price):
+        _, _, ticker, kind, period, period2, threshold, direction = row
+        msg = f"📈 **Indicator Alert!** {ticker}: {self.describe_indicator(kind, period, period2, threshold, direction)}"
+        if kind == "rsi":
+            msg += f" (RSI {value:.1f})"
+        elif kind == "move":
+            msg += f" ({value:+.2f}%)"
+        if price is not None:
+            msg += f" at **${price:,.2f}**"
+        return msg
+
+    async def resolve_alert_ticker(self, ctx, ticker, needs_history=0):
+        """Stock ticker or CRYPTO:<coin id> with a live price, or None after telling the user why."""
         ticker = ticker.upper()
-        msg = await ctx.send(f"📰 Fetching news for {ticker}...")
-        
-        try:
-            stock = yf.Ticker(ticker)
-            news = stock.news
-            
-            if not news:
-                await msg.edit(content=f"No news found for {ticker}.")
-                return
-            
-            embed = discord.Embed(title=f"📰 News for {ticker}", color=discord.Color.blue())
-            
-            # Simple Sentiment Analysis
-            bullish_words = ["surge", "jump", "record", "beat", "buy", "profit", "growth", "high", "soar"]
-            bearish_words = ["plunge", "drop", "miss", "fail", "sell", "loss", "decline", "low", "crash"]
-            
-            for item in news[:3]: # Top 3
-                # Handle yfinance structure change (nested in 'content')
-                if 'content' in item:
-                    item = item['content']
+        found = await self.bot.symbols.resolve(ticker)
+        tick = await self.bot.prices.quote(found.symbol) if found else None
+        if not tick:
+            await ctx.send(f"❌ Could not verify current price for {ticker}. Alert not set.{self.bot.symbols.suggest(ticker)}")
+            return None
+        ticker = found.symbol
+        if needs_history:
+            if market_hours.is_crypto(ticker):
+                await ctx.send("❌ Indicator alerts need daily history, which crypto coins don't have. Use `/indicator move` instead.")
+                return None
+            bars = await self.bot.ohlcv.history(ticker, "1d", "2y")
+            if len(bars) < needs_history:
+                await ctx.send(f"❌ Not enough history for {ticker} ({len(bars)} of {needs_history} daily bars).")
+                return None
+        return ticker
+
+    async def add_indicator_alert(self, ctx, ticker, kind, period, period2, threshold, direction):
+        cursor = await self.bot.db.execute("INSERT INTO indicator_alerts (user_id, ticker, kind, period, period2, threshold, direction, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                           (ctx.author.id, ticker, kind, period, period2, threshold, direction, datetime.datetime.now().isoformat()))
+        await self.bot.db.commit()
+        await ctx.send(f"✅ Alert {cursor.lastrowid} set for **{ticker}**: {self.describe_indicator(kind, period, period2, threshold, direction)}.")
 
-                title = item.get('title', '')
-                
-                # Try to find link
-                link = item.get('link', '')
-                if not link:
-                    if 'canonicalUrl' in item:
-                        link = item['canonicalUrl'].get('url', '')
-                    elif 'clickThroughUrl' in item:
-                        link = item['clickThroughUrl'].get('url', '')
-                
-                # publisher = item.get('publisher', 'Unknown')
-                
-                score = 0
-                lower_title = title.lower()
-                for w in bullish_words: 
-                    if w in lower_title: score += 1
-                for w in bearish_words: 
-                    if w in lower_title: score -= 1
-                
-                sentiment = "Neutral 😐"
-                if score > 0: sentiment = "Bullish 🟢"
-                elif score < 0: sentiment = "Bearish 🔴"
-                
-                embed.add_field(name=f"{sentiment} {title}", value=f"[Read More]({link})", inline=False)
-            
-            await msg.edit(content=None, embed=embed)
-            
-        except Exception as e:
-            await msg.edit(content=f"Error fetching news: {e}")
+    @commands.hybrid_group(name="indicator", aliases=["ia"], invoke_without_command=True, description="Manage indicator alerts.")
+    async def indicator(self, ctx):
+        await ctx.send("Use `/indicator rsi`, `/indicator cross`, `/indicator move`, `/indicator list`, or `/indicator remove <id>`.")
+
+    @indicator.command(name="rsi", description="Alert when a stock's daily RSI crosses a level.")
+    @app_commands.autocomplete(ticker=symbols.complete_stocks)
+    async def indicator_rsi(self, ctx, ticker: str, level: float, period: int = 14):
+        if not 0 < level < 100 or not 2 <= period <= 100:
+            await ctx.send("❌ Level must be between 0 and 100 and period between 2 and 100.")
+            return
+        ticker = await self.resolve_alert_ticker(ctx, ticker, needs_history=period + 1)
+        if not ticker: return
+        # Overbought levels fire on the way up, oversold on the way down
+        await self.add_indicator_alert(ctx, ticker, "rsi", period, None, level, 'above' if level >= 50 else 'below')
+
+    @indicator.command(name="cross", description="Alert when a fast moving average crosses a slow one.")
+    @app_commands.autocomplete(ticker=symbols.complete_stocks)
+    async def indicator_cross(self, ctx, ticker: str, fast: int = 50, slow: int = 200, average: str = "sma", direction: str = "above"):
+        average, direction = average.lower(), direction.lower()
+        if average not in ("sma", "ema") or direction not in ("above", "below"):
+            await ctx.send("❌ Average must be `sma` or `ema`, direction `above` or `below`.")
+            return
+        if not 1 <= fast < slow <= 250:
+            await ctx.send("❌ Need 1 <= fast < slow <= 250.")
+            return
+        ticker = await self.resolve_alert_ticker(ctx, ticker, needs_history=slow)
+        if not ticker: return
+        await self.add_indicator_alert(ctx, ticker, f"{average}_cross", fast, slow, None, direction)
+
+    @indicator.command(name="move", description="Alert when a symbol moves a percentage from the previous close (e.g. 5 or -5).")
+    @app_commands.autocomplete(ticker=symbols.complete_symbols)
+    async def indicator_move(self, ctx, ticker: str, percent: float):
+        if percent == 0 or abs(percent) > 100:
+            await ctx.send("❌ Percent must be non-zero and at most 100.")
+            return
+        ticker = await self.resolve_alert_ticker(ctx, ticker)
+        if not ticker: return
+        await self.add_indicator_alert(ctx, ticker, "move", None, None, abs(percent), 'above' if percent > 0 else 'below')
+
+    @indicator.command(name="list", description="List your active indicator alerts.")
+    async def indicator_list(self, ctx):
+        async with self.bot.db.execute("SELECT id, ticker, kind, period, period2, threshold, direction FROM indicator_alerts WHERE user_id = ? AND triggered = 0", (ctx.author.id,)) as cursor:
+            rows = await cursor.fetchall()
+
+        if not rows:
+            await ctx.send("No active indicator alerts.")
+            return
+
+        embed = discord.Embed(title="📈 Your Indicator Alerts", color=discord.Color.gold())
+        for aid, ticker, kind, period, period2, threshold, direction in rows[:25]:
+            embed.add_field(name=f"ID: {aid} | {ticker}", value=self.describe_indicator(kind, period, period2, threshold, direction), inline=False)
+        await ctx.send(embed=embed)
+
+    @indicator.command(name="remove", description="Remove an indicator alert by ID.")
+    async def indicator_remove(self, ctx, alert_id: int):
+        await self.bot.db.execute("DELETE FROM indicator_alerts WHERE id = ? AND user_id = ?", (alert_id, ctx.author.id))
+        await self.bot.db.commit()
+        await ctx.send(f"🗑️ Indicator alert {alert_id} removed.")
 
     @commands.hybrid_command(description="View a candlestick chart.")
+    @app_commands.autocomplete(ticker=symbols.complete_stocks)
     async def chart(self, ctx, ticker: str, timeframe: str = "1mo"):
         """
         View a chart for a ticker.
@@ -512,11 +607,13 @@ async def setup(bot):
         if timeframe not in valid_timeframes:
             await ctx.send(f"Invalid timeframe. Use: {', '.join(valid_timeframes)}")
             return
+        if not await self.bot.symbols.resolve(ticker, "stock"):
+            await ctx.send(f"No data found for {ticker}.{self.bot.symbols.suggest(ticker, 'stock')}")
+            return
 
         msg = await ctx.send(f"Generating {timeframe} chart for {ticker}...")
         
         try:
-            stock = yf.Ticker(ticker)
             # Interval selection based on timeframe
             interval = "1d"
             if timeframe in ["1d", "5d"]: interval = "15m"
@@ -524,12 +621,15 @@ async def setup(bot):
             elif timeframe in ["6mo", "1y"]: interval = "1wk"
             else: interval = "1mo"
 
-            hist = stock.history(period=timeframe, interval=interval)
+            # Bars come from the local store; only ones newer than the last stored bar are downloaded
+            bars = await self.bot.ohlcv.history(ticker, interval, timeframe)
             
-            if hist.empty:
+            if not len(bars):
                 await msg.edit(content=f"No data found for {ticker}.")
                 return
 
+            hist = ohlcv.frame_from_bars(bars)
+
             # Create buffer
             buf = io.BytesIO()
             
@@ -560,29 +660,28 @@ async def setup(bot):
             
         tickers = [row[0] for row in rows]
         
-        # Fetch data for all tickers (simplified for speed)
+        # Prices come from the tick store, no per-ticker download
         embed = discord.Embed(title=f"{ctx.author.name}'s Watchlist", color=discord.Color.blue())
         
         description = ""
         for ticker in tickers:
-            try:
-                stock = yf.Ticker(ticker)
-                # Just get fast price
-                hist = stock.history(period="1d")
-                if not hist.empty:
-                    price = hist['Close'].iloc[-1]
-                    description += f"**{ticker}**: ${price:.2f}\n"
-                else:
-                    description += f"**{ticker}**: N/A\n"
-            except:
-                description += f"**{ticker}**: Error\n"
+            tick = await self.bot.prices.quote(ticker)
+            if tick:
+                description += f"**{ticker}**: ${tick.price:.2f}\n"
+            else:
+                description += f"**{ticker}**: N/A\n"
         
         embed.description = description
         await ctx.send(embed=embed)
 
-    @wl.command(description="Add a ticker to your watchlist.")
-    async def add(self, ctx, ticker: str):
-        ticker = ticker.upper()
+    @wl.command(name="add", description="Add a ticker to your watchlist.")
+    @app_commands.autocomplete(ticker=symbols.complete_symbols)
+    async def wl_add(self, ctx, ticker: str):
+        found = await self.bot.symbols.resolve(ticker)
+        if not found:
+            await ctx.send(f"❌ Unknown symbol {ticker.upper()}.{self.bot.symbols.suggest(ticker)}")
+            return
+        ticker = found.symbol
         try:
             await self.bot.db.execute("INSERT INTO watchlist (user_id, ticker) VALUES (?, ?)", (ctx.author.id, ticker))
             await self.bot.db.commit()
@@ -590,12 +689,19 @@ async def setup(bot):
         except:
             await ctx.send(f"{ticker} is already in your watchlist.")
 
-    @wl.command(description="Remove a ticker from your watchlist.")
-    async def remove(self, ctx, ticker: str):
-        ticker = ticker.upper()
-        await self.bot.db.execute("DELETE FROM watchlist WHERE user_id = ? AND ticker = ?", (ctx.author.id, ticker))
+    @wl.command(name="remove", description="Remove a ticker from your watchlist.")
+    @app_commands.autocomplete(ticker=symbols.complete_symbols)
+    async def wl_remove(self, ctx, ticker: str):
+        # Rows are stored under the resolved symbol (CRYPTO:bitcoin); older ones as typed, upper-cased
+        found = await self.bot.symbols.resolve(ticker)
+        candidates = {ticker.strip().upper()} | ({found.symbol} if found else set())
+        async with self.bot.db.execute(f"DELETE FROM watchlist WHERE user_id = ? AND ticker IN ({', '.join('?' * len(candidates))})",
+                                       (ctx.author.id, *candidates)) as cursor:
+            if cursor.rowcount == 0:
+                await ctx.send(f"❌ {ticker.upper()} is not in your watchlist.")
+                return
         await self.bot.db.commit()
-        await ctx.send(f"Removed {ticker} from watchlist.")
+        await ctx.send(f"Removed {found.symbol if found else ticker.upper()} from watchlist.")
 
     @commands.hybrid_command(description="View today's economic calendar (ForexFactory).")
     async def calendar(self, ctx):
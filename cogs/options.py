@@ -1,8 +1,13 @@
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
-import yfinance as yf
 import datetime
 import asyncio
+import numpy as np
+from utils import market_hours, pricing, symbols
+from utils.log import get_logger
+
+log = get_logger("options")
 
 class Options(commands.Cog):
     def __init__(self, bot):
@@ -16,32 +21,122 @@ class Options(commands.Cog):
         await self.bot.wait_until_ready()
         while not self.bot.is_closed():
             try:
-                today = datetime.date.today().isoformat()
-                # Find active options that expired yesterday or today
-                async with self.bot.db.execute("SELECT id, user_id, ticker, option_type, strike_price FROM options WHERE status = 'active' AND expiration_date < ?", (today,)) as cursor:
-                    expired = await cursor.fetchall()
-                
-                for oid, uid, ticker, otype, strike in expired:
-                    # Mark as expired
-                    await self.bot.db.execute("UPDATE options SET status = 'expired' WHERE id = ?", (oid,))
-                    
-                    user = self.bot.get_user(uid)
-                    if user:
-                        try: await user.send(f"📉 Your {ticker} {otype.upper()} option (Strike: ${strike}) has expired.")
-                        except: pass
-                
-                await self.bot.db.commit()
-
+                settled = await self.settle_expired()
+                if settled:
+                    log.info(f"Settled {settled} expired options")
             except Exception as e:
-                print(f"Options loop error: {e}")
+                log.exception(f"Options loop error: {e}")
             
-            await asyncio.sleep(3600) # Check every hour
+            # Nothing can expire between closes; sleep until just after the next one
+            wait = (market_hours.next_close() - market_hours.now_et()).total_seconds() + 60
+            await asyncio.sleep(wait)
+
+    async def settle_expired(self, close=None):
+        """
+        Settle every active contract expiring at or before a session close: in-the-money ones are
+        exercised at the closing price, the rest expire worthless. All payouts and status changes
+        are written together and committed once; owners get one DM each through the notifier.
+        """
+        # Options expire at the close of their expiration date (or the first close after it)
+        close = close or market_hours.last_close()
+        async with self.bot.db.execute("SELECT id, user_id, ticker, option_type, strike_price, contracts FROM options WHERE status = 'active' AND expiration_date <= ?",
+                                       (close.date().isoformat(),)) as cursor:
+            rows = await cursor.fetchall()
+        if not rows:
+            return 0
+
+        tickers = sorted({r[2] for r in rows})
+        await self.bot.prices.refresh_since(tickers, close.timestamp())
+
+        ids = np.array([r[0] for r in rows], dtype=np.int64)
+        users = np.array([r[1] for r in rows], dtype=np.int64)
+        is_call = np.array([r[3] == 'call' for r in rows])
+        strikes = np.array([r[4] for r in rows], dtype=np.float64)
+        contracts = np.array([r[5] or 1 for r in rows], dtype=np.float64)
+        # A tick from before the close is an intraday price, not the close
+        spots = self.bot.ticks.prices([r[2] for r in rows], since=close.timestamp())
+
+        # Without a closing price a contract can't be valued; leave it for the next pass
+        priced = ~np.isnan(spots)
+        if not priced.all():
+            missing = sorted({r[2] for r, ok in zip(rows, priced) if not ok})
+            log.warning(f"No closing price for {', '.join(missing)}; {int((~priced).sum())} options left active")
+
+        payouts = np.round(pricing.payoff(np.where(priced, spots, 0), strikes, is_call) * contracts, 2)
+        statuses = np.where(payouts > 0, 'exercised', 'expired')
+
+        timestamp = datetime.datetime.now().isoformat()
+        try:
+            # A contract exercised by hand since the select is no longer active; only pay the rows this pass settled
+            settled = np.zeros(len(rows), dtype=bool)
+            for i in np.flatnonzero(priced):
+                async with self.bot.db.execute("UPDATE options SET status = ?, payout = ? WHERE id = ? AND status = 'active'",
+                                               (str(statuses[i]), float(payouts[i]), int(ids[i]))) as cursor:
+                    settled[i] = cursor.rowcount > 0
+            exercised = settled & (payouts > 0)
+            # One balance update per user, however many contracts they had
+            credited, idx = np.unique(users[exercised], return_inverse=True)
+            totals = np.bincount(idx, weights=payouts[exercised], minlength=len(credited))
+            await self.bot.db.executemany("UPDATE users SET balance = balance + ? WHERE user_id = ?",
+                                          zip(totals.tolist(), credited.tolist()))
+            await self.bot.db.executemany("INSERT INTO transaction_logs (user_id, type, amount, description, timestamp) VALUES (?, ?, ?, ?, ?)",
+                                          [(int(users[i]), "options", float(payouts[i]), f"Auto-exercised {rows[i][2]} {rows[i][3].upper()} ${rows[i][4]}", timestamp)
+                                           for i in np.flatnonzero(exercised)])
+            await self.bot.db.commit()
+        except Exception:
+            await self.bot.db.rollback()
+            raise
+
+        messages = {}
+        for i in np.flatnonzero(settled):
+            oid, uid, ticker, otype, strike, _ = rows[i]
+            if exercised[i]:
+                line = f"✅ {ticker} {otype.upper()} (Strike: ${strike}) exercised at ${spots[i]:.2f}: **+${payouts[i]:.2f}**"
+            else:
+                line = f"📉 {ticker} {otype.upper()} (Strike: ${strike}) expired worthless at ${spots[i]:.2f}"
+            messages.setdefault(uid, []).append(line)
+        for uid, lines in messages.items():
+            self.bot.notifier.send(uid, "**Options settled at the close**\n" + "\n".join(lines))
+
+        return int(settled.sum())
 
     @commands.hybrid_group(name="option", description="Trade stock options.")
     async def option(self, ctx):
-        await ctx.send("Use `/option buy` or `/option list`.")
+        await ctx.send("Use `/option chain`, `/option buy` or `/option list`.")
+
+    @option.command(description="View calls and puts around the current price.")
+    @app_commands.autocomplete(ticker=symbols.complete_stocks)
+    async def chain(self, ctx, ticker: str):
+        ticker = ticker.upper()
+        tick = await self.bot.prices.quote(ticker)
+        if not tick:
+            await ctx.send(f"Could not fetch price for {ticker}.")
+            return
+
+        vol = await pricing.realized_vol(self.bot.ohlcv, ticker)
+        chain = pricing.option_chain(ticker, tick.price, vol)
+
+        embed = discord.Embed(title=f"🧾 {ticker} Option Chain",
+                              description=f"Spot: **${tick.price:.2f}** | Volatility: **{vol * 100:.1f}%**",
+                              color=discord.Color.gold())
+        embed.add_field(name="Calls", value=self.format_chain(chain, chain.call, tick.price), inline=False)
+        embed.add_field(name="Puts", value=self.format_chain(chain, chain.put, tick.price), inline=False)
+        embed.set_footer(text=f"Premium per contract, minimum ${pricing.MIN_PREMIUM:.2f}. Buy with /option buy <call|put> {ticker} <strike> <days>")
+        await ctx.send(embed=embed)
+
+    @staticmethod
+    def format_chain(chain, quotes, spot):
+        atm = abs(chain.strikes - spot).argmin()
+        prices = quotes.price.clip(min=pricing.MIN_PREMIUM)
+        lines = [f"  {'Strike':>8} " + "".join(f"{f'{d}d':>8}" for d in chain.days) + f"{'Δ':>6}"]
+        for i, strike in enumerate(chain.strikes):
+            marker = ">" if i == atm else " "
+            cells = "".join(f"{p:>8.2f}" for p in prices[i])
+            lines.append(f"{marker} {strike:>8.2f} {cells}{quotes.delta[i, -1]:>6.2f}")
+        return "```\n" + "\n".join(lines) + "\n```"
 
     @option.command(description="Buy a Call or Put option.")
+    @app_commands.autocomplete(ticker=symbols.complete_stocks)
     async def buy(self, ctx, option_type: str, ticker: str, strike_price: float, expiry_days: int):
         option_type = option_type.lower()
         ticker = ticker.upper()
@@ -56,12 +151,10 @@ class Options(commands.Cog):
 
         # Fetch current price
         current_price = 0
-        try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period="1d")
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-        except:
+        tick = await self.bot.prices.quote(ticker)
+        if tick:
+            current_price = tick.price
+        else:
             await ctx.send(f"Could not fetch price for {ticker}.")
             return
 
@@ -69,29 +162,23 @@ class Options(commands.Cog):
             await ctx.send("Price error.")
             return
 
-        # Calculate Premium (Simplified)
-        # Premium = Intrinsic Value + Time Value
-        # Intrinsic Call = Max(0, Current - Strike)
-        # Intrinsic Put = Max(0, Strike - Current)
-        # Time Value = (Current * 0.02 * Days) (2% volatility per day approximation)
-        
-        intrinsic = 0
-        if option_type == 'call':
-            intrinsic = max(0, current_price - strike_price)
-        else:
-            intrinsic = max(0, strike_price - current_price)
-            
-        time_value = (current_price * 0.01 * expiry_days) # 1% per day cost
-        premium_per_share = intrinsic + time_value
+        if strike_price <= 0:
+            await ctx.send("Strike must be positive.")
+            return
+
+        # Black-Scholes premium with realized volatility from the stored daily history
+        vol = await pricing.realized_vol(self.bot.ohlcv, ticker)
+        quote = pricing.black_scholes(current_price, strike_price, expiry_days / 365, vol, option_type == 'call')
+        premium_per_share = float(quote.price)
         
         # Minimum premium
-        if premium_per_share < 1: premium_per_share = 1
+        if premium_per_share < pricing.MIN_PREMIUM: premium_per_share = pricing.MIN_PREMIUM
         
         # 1 Contract = 1 Share (Simplified for this bot economy)
         total_cost = premium_per_share
         
         # Confirm
-        embed = discord.Embed(title=f"📝 Confirm Option Buy", description=f"**Type:** {option_type.upper()}\n**Ticker:** {ticker}\n**Strike:** ${strike_price}\n**Current:** ${current_price:.2f}\n**Expiry:** {expiry_days} days\n\n**Premium (Cost):** ${total_cost:.2f}", color=discord.Color.blue())
+        embed = discord.Embed(title=f"📝 Confirm Option Buy", description=f"**Type:** {option_type.upper()}\n**Ticker:** {ticker}\n**Strike:** ${strike_price}\n**Current:** ${current_price:.2f}\n**Expiry:** {expiry_days} days\n**Volatility:** {vol * 100:.1f}% | **Delta:** {float(quote.delta):.2f}\n\n**Premium (Cost):** ${total_cost:.2f}", color=discord.Color.blue())
         view = ConfirmOptionView(ctx.author, total_cost)
         msg = await ctx.send(embed=embed, view=view)
         
@@ -148,12 +235,10 @@ class Options(commands.Cog):
         
         # Fetch current price
         current_price = 0
-        try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period="1d")
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-        except:
+        tick = await self.bot.prices.quote(ticker)
+        if tick:
+            current_price = tick.price
+        else:
             await ctx.send("Could not fetch current price.")
             return
 
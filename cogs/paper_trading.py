@@ -1,22 +1,22 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
-import yfinance as yf
+import time
+from utils import backtest, positions, symbols
 
 class PaperTrading(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    def cog_unload(self):
+        backtest.shutdown()
+
     async def get_price(self, ticker):
-        try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period="1d")
-            if not hist.empty:
-                return hist['Close'].iloc[-1]
-        except:
-            pass
-        return None
+        tick = await self.bot.prices.quote(ticker)
+        return tick.price if tick else None
 
     @commands.hybrid_command(description="Buy stocks (simulated).")
+    @app_commands.autocomplete(ticker=symbols.complete_stocks)
     async def tbuy(self, ctx, ticker: str, shares: int):
         if shares <= 0:
             await ctx.send("Shares must be positive.")
@@ -44,21 +44,13 @@ class PaperTrading(commands.Cog):
         await self.bot.get_cog("Economy").log_transaction(ctx.author.id, "paper_trading", -total_cost, f"Bought {shares} {ticker} @ ${price:.2f}")
         
         # Update portfolio
-        async with self.bot.db.execute("SELECT avg_price, shares FROM portfolio WHERE user_id = ? AND ticker = ?", (ctx.author.id, ticker)) as cursor:
-            row = await cursor.fetchone()
-            
-        if row:
-            current_avg, current_shares = row
-            new_shares = current_shares + shares
-            new_avg = ((current_avg * current_shares) + total_cost) / new_shares
-            await self.bot.db.execute("UPDATE portfolio SET avg_price = ?, shares = ? WHERE user_id = ? AND ticker = ?", (new_avg, new_shares, ctx.author.id, ticker))
-        else:
-            await self.bot.db.execute("INSERT INTO portfolio (user_id, ticker, avg_price, shares) VALUES (?, ?, ?, ?)", (ctx.author.id, ticker, price, shares))
+        await positions.record_buy(self.bot.db, ctx.author.id, ticker, shares, price, "paper")
             
         await self.bot.db.commit()
         await ctx.send(f"Bought {shares} shares of {ticker} at ${price:.2f} (Total: ${total_cost:.2f}).")
 
     @commands.hybrid_command(description="Sell stocks (simulated).")
+    @app_commands.autocomplete(ticker=symbols.complete_stocks)
     async def tsell(self, ctx, ticker: str, shares: int):
         if shares <= 0:
             await ctx.send("Shares must be positive.")
@@ -66,12 +58,11 @@ class PaperTrading(commands.Cog):
             
         ticker = ticker.upper()
         
-        # Check ownership
-        async with self.bot.db.execute("SELECT avg_price, shares FROM portfolio WHERE user_id = ? AND ticker = ?", (ctx.author.id, ticker)) as cursor:
-            row = await cursor.fetchone()
+        # Check ownership (shares held by open sell limits can't be sold twice)
+        owned = await positions.available(self.bot.db, ctx.author.id, ticker)
             
-        if not row or row[1] < shares:
-            await ctx.send(f"You don't have enough shares. Owned: {row[1] if row else 0}")
+        if owned < shares:
+            await ctx.send(f"You don't have enough shares. Owned: {max(owned, 0)}")
             return
             
         price = await self.get_price(ticker)
@@ -80,14 +71,9 @@ class PaperTrading(commands.Cog):
             return
             
         total_value = price * shares
-        avg_price, current_shares = row
         
-        # Update portfolio
-        new_shares = current_shares - shares
-        if new_shares == 0:
-            await self.bot.db.execute("DELETE FROM portfolio WHERE user_id = ? AND ticker = ?", (ctx.author.id, ticker))
-        else:
-            await self.bot.db.execute("UPDATE portfolio SET shares = ? WHERE user_id = ? AND ticker = ?", (new_shares, ctx.author.id, ticker))
+        # Update portfolio (oldest lots are sold first)
+        cost_basis, pl = await positions.record_sell(self.bot.db, ctx.author.id, ticker, shares, price, "paper")
             
         # Add balance
         await self.bot.db.execute("UPDATE users SET balance = balance + ? WHERE user_id = ?", (total_value, ctx.author.id))
@@ -95,16 +81,14 @@ class PaperTrading(commands.Cog):
         await self.bot.db.commit()
         
         # Calculate P/L
-        cost_basis = avg_price * shares
-        pl = total_value - cost_basis
-        pl_pct = (pl / cost_basis) * 100
+        pl_pct = (pl / cost_basis) * 100 if cost_basis > 0 else 0
         
         color = "🟢" if pl >= 0 else "🔴"
         await ctx.send(f"Sold {shares} shares of {ticker} at ${price:.2f} (Total: ${total_value:.2f}).\nP/L: {color} ${pl:.2f} ({pl_pct:.2f}%)")
 
     @commands.hybrid_command(name="tportfolio", aliases=["tp"], description="View your paper trading portfolio.")
     async def tportfolio(self, ctx):
-        async with self.bot.db.execute("SELECT ticker, avg_price, shares FROM portfolio WHERE user_id = ?", (ctx.author.id,)) as cursor:
+        async with self.bot.db.execute("SELECT ticker, avg_price, shares FROM portfolio WHERE user_id = ? AND shares > 0", (ctx.author.id,)) as cursor:
             rows = await cursor.fetchall()
             
         if not rows:
@@ -144,5 +128,40 @@ class PaperTrading(commands.Cog):
         
         await ctx.send(embed=embed)
 
+    @commands.hybrid_command(description="Backtest a simple strategy on daily history.")
+    @app_commands.autocomplete(ticker=symbols.complete_stocks)
+    async def backtest(self, ctx, ticker: str, strategy: str = "sma", years: int = 3, fast: int = 20, slow: int = 50):
+        """
+        Strategies: sma, ema (fast/slow crossover), rsi (fast = RSI period), hold
+        """
+        ticker = ticker.upper()
+        strategy = strategy.lower()
+        if strategy not in backtest.STRATEGIES:
+            await ctx.send(f"Invalid strategy. Use: {', '.join(backtest.STRATEGIES)}")
+            return
+        if not 1 <= years <= 20 or not 2 <= fast < slow <= 400:
+            await ctx.send("Years must be 1-20, and periods need 2 <= fast < slow <= 400.")
+            return
+
+        bars = await self.bot.ohlcv.history(ticker, "1d")
+        bars = bars[bars["ts"] >= time.time() - years * 365 * 86400]
+        if len(bars) < slow + 2:
+            await ctx.send(f"Not enough history for {ticker}.")
+            return
+
+        result = await backtest.run_async(bars["close"], strategy, fast, slow)
+
+        label = {"sma": f"SMA {fast}/{slow} cross", "ema": f"EMA {fast}/{slow} cross", "rsi": f"RSI({fast}) 30/70", "hold": "Buy & hold"}[strategy]
+        icon = "🟢" if result["return"] >= 0 else "🔴"
+        embed = discord.Embed(title=f"🧪 Backtest: {ticker} - {label}", description=backtest.STRATEGIES[strategy], color=discord.Color.purple())
+        embed.add_field(name="Return", value=f"{icon} {result['return'] * 100:+.2f}%", inline=True)
+        embed.add_field(name="Buy & Hold", value=f"{result['hold_return'] * 100:+.2f}%", inline=True)
+        embed.add_field(name="CAGR", value=f"{result['cagr'] * 100:+.2f}%", inline=True)
+        embed.add_field(name="Max Drawdown", value=f"{result['max_drawdown'] * 100:.2f}%", inline=True)
+        embed.add_field(name="Trades", value=f"{result['trades']} ({result['win_rate'] * 100:.0f}% won)", inline=True)
+        embed.add_field(name="Time in Market", value=f"{result['exposure'] * 100:.0f}%", inline=True)
+        embed.set_footer(text=f"{result['bars']} daily bars, fills at the next close, no fees.")
+        await ctx.send(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(PaperTrading(bot))
@@ -0,0 +1,57 @@
+import discord
+from discord.ext import commands
+import datetime
+
+class Perf(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    def format_rows(self, rows):
+        lines = []
+        for name, count, errors, total, p50, p95, p99 in rows:
+            err = f" | ❌ {errors}" if errors else ""
+            lines.append(f"`{name[:60]}`\n{count}x | p50 {p50 * 1000:.1f}ms | p95 {p95 * 1000:.1f}ms | p99 {p99 * 1000:.1f}ms | total {total:.2f}s{err}")
+        return "\n".join(lines) or "No samples yet."
+
+    @commands.hybrid_command(description="Admin: Show the slowest commands, queries and API calls.")
+    @commands.has_permissions(administrator=True)
+    async def perf(self, ctx, kind: str = "all", sort: str = "p95", limit: int = 5):
+        """
+        kind: all, command, command_db, query, http, loop
+        sort: p50, p95, p99, total, count, errors
+        """
+        metrics = self.bot.metrics
+        if sort not in ["p50", "p95", "p99", "total", "count", "errors"]:
+            await ctx.send("Invalid sort. Use p50, p95, p99, total, count or errors.")
+            return
+
+        kinds = sorted(metrics.series.keys()) if kind == "all" else [kind]
+        limit = max(1, min(limit, 10))
+
+        since = datetime.datetime.fromtimestamp(metrics.started)
+        embed = discord.Embed(title="⏱️ Performance Report", description=f"Since <t:{int(since.timestamp())}:R> • sorted by **{sort}**", color=discord.Color.blurple())
+        for k in kinds:
+            embed.add_field(name=k, value=self.format_rows(metrics.top(k, sort, limit))[:1024], inline=False)
+
+        if not kinds:
+            embed.add_field(name="No data", value="Nothing has been measured yet.", inline=False)
+
+        # Quote provider circuit breakers
+        lines = []
+        for name, breaker in self.bot.prices.quotes.breakers.items():
+            state = breaker.state
+            if state == "closed":
+                lines.append(f"🟢 **{name}**: ok")
+            else:
+                lines.append(f"🔴 **{name}**: {state}, retry <t:{int(breaker.retry_at)}:R> ({breaker.opens} backoffs)")
+        embed.add_field(name="Quote providers", value="\n".join(lines) or "None", inline=False)
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="perfreset", description="Admin: Reset performance counters.")
+    @commands.has_permissions(administrator=True)
+    async def perfreset(self, ctx):
+        self.bot.metrics.reset()
+        await ctx.send("✅ Performance counters reset.")
+
+async def setup(bot):
+    await bot.add_cog(Perf(bot))
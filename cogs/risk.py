@@ -0,0 +1,69 @@
+import discord
+from discord.ext import commands
+import numpy as np
+from utils import risk
+
+class Risk(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    def totals_fields(self, embed, book):
+        value = np.where(book.priced, book.value, book.cost).sum()
+        pnl = value - book.cost.sum()
+        embed.add_field(name="Market Value", value=f"${value:,.2f}", inline=True)
+        embed.add_field(name="P/L", value=f"{'🟢' if pnl >= 0 else '🔴'} ${pnl:+,.2f}", inline=True)
+        embed.add_field(name="Positions", value=f"{len(book.users)}", inline=True)
+        embed.add_field(name="Delta ($)", value=f"${book.delta.sum():+,.2f}", inline=True)
+        embed.add_field(name="Gamma ($ per 1%)", value=f"${book.gamma.sum():+,.2f}", inline=True)
+        embed.add_field(name="Theta ($/day)", value=f"${book.theta.sum():+,.2f}", inline=True)
+
+    @staticmethod
+    def top(exposure, limit):
+        """Indices of the largest absolute dollar deltas."""
+        return np.argsort(-np.abs(exposure.delta))[:limit]
+
+    @commands.hybrid_command(description="View the risk of your stock and option positions.")
+    async def risk(self, ctx):
+        book = await risk.load_book(self.bot, ctx.author.id)
+        if not len(book.users):
+            await ctx.send("You have no open positions.")
+            return
+
+        embed = discord.Embed(title=f"🛡️ {ctx.author.name}'s Risk", color=discord.Color.blue())
+        self.totals_fields(embed, book)
+
+        by_ticker = risk.aggregate(book, book.tickers)
+        lines = []
+        for i in self.top(by_ticker, 10):
+            flag = " ⚠️ no price" if by_ticker.unpriced[i] else ""
+            lines.append(f"**{by_ticker.keys[i]}**: Δ ${by_ticker.delta[i]:+,.0f} | Γ ${by_ticker.gamma[i]:+,.0f} | Θ ${by_ticker.theta[i]:+,.2f} | P/L ${by_ticker.pnl[i]:+,.2f}{flag}")
+        embed.add_field(name="By Ticker", value="\n".join(lines)[:1024], inline=False)
+        embed.set_footer(text="Delta is stock-equivalent $ exposure, gamma its change per 1% move. Marked to the latest polled prices.")
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="riskreport", description="Admin: Mark-to-market risk across every open position.")
+    @commands.has_permissions(administrator=True)
+    async def riskreport(self, ctx, limit: int = 10):
+        book = await risk.load_book(self.bot)
+        if not len(book.users):
+            await ctx.send("No open positions.")
+            return
+
+        embed = discord.Embed(title="🛡️ Risk Report", color=discord.Color.dark_red())
+        self.totals_fields(embed, book)
+
+        by_user = risk.aggregate(book, book.users)
+        lines = []
+        for i in self.top(by_user, max(1, min(limit, 25))):
+            user = self.bot.get_user(int(by_user.keys[i]))
+            name = user.name if user else f"<@{by_user.keys[i]}>"
+            lines.append(f"**{name}**: Δ ${by_user.delta[i]:+,.0f} | Θ ${by_user.theta[i]:+,.2f} | P/L ${by_user.pnl[i]:+,.2f} ({by_user.positions[i]} pos)")
+        embed.add_field(name="Largest Exposures", value="\n".join(lines)[:1024], inline=False)
+
+        unpriced = int((~book.priced).sum())
+        if unpriced:
+            embed.set_footer(text=f"{unpriced} positions have no price and are carried at cost.")
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(Risk(bot))
@@ -4,6 +4,9 @@ import aiohttp
 import os
 import datetime
 import json
+from utils.log import get_logger
+
+log = get_logger("streamers")
 
 class Streamers(commands.Cog):
     def __init__(self, bot):
@@ -33,7 +36,7 @@ class Streamers(commands.Cog):
                     self.twitch_token_expires = datetime.datetime.now().timestamp() + data['expires_in'] - 60
                     return self.twitch_token
                 else:
-                    print(f"Failed to get Twitch token: {resp.status}")
+                    log.warning(f"Failed to get Twitch token: {resp.status}")
                     return None
 
     async def check_twitch(self, session, username):
@@ -70,7 +73,7 @@ class Streamers(commands.Cog):
                         
                         return True, title, thumbnail, game_name, viewer_count, avatar_url
         except Exception as e:
-            print(f"Twitch check error for {username}: {e}")
+            log.warning(f"Twitch check error for {username}: {e}")
         
         return False, None, None, None, None, None
 
@@ -116,7 +119,7 @@ class Streamers(commands.Cog):
 
                         return True, title, thumbnail, "YouTube Live", viewer_count, avatar_url
         except Exception as e:
-             print(f"YouTube check error for {username}: {e}")
+             log.warning(f"YouTube check error for {username}: {e}")
 
         return False, None, None, None, None, None
 
@@ -1,8 +1,15 @@
 import discord
 from discord.ext import commands
-import aiofiles
 import os
-import datetime
+import io
+from utils.transcripts import export_transcript, make_writer
+from utils import ticket_archive
+
+# Transcript output: "txt" or "html", optionally gzip-compressed
+TRANSCRIPT_FORMAT = os.getenv("TICKET_TRANSCRIPT_FORMAT", "txt").lower()
+TRANSCRIPT_GZIP = os.getenv("TICKET_TRANSCRIPT_GZIP", "0") == "1"
+# Keep compressed transcripts + a search index of closed tickets in the database
+ARCHIVE_ENABLED = os.getenv("TICKET_ARCHIVE", "1") == "1"
 
 class TicketView(discord.ui.View):
     def __init__(self, bot):
@@ -85,43 +92,37 @@ class Tickets(commands.Cog):
 
         await ctx.send("🔒 Closing ticket in 5 seconds...")
         
-        # Generate Transcript
-        messages = [message async for message in ctx.channel.history(limit=None, oldest_first=True)]
-        transcript_text = f"Transcript for {ctx.channel.name}\nUser ID: {user_id}\nDate: {datetime.datetime.now()}\n\n"
-        
-        for msg in messages:
-            transcript_text += f"[{msg.created_at.strftime('%Y-%m-%d %H:%M:%S')}] {msg.author.name}: {msg.content}\n"
-            for att in msg.attachments:
-                transcript_text += f"[Attachment] {att.url}\n"
-
-        # Save transcript to file
-        filename = f"transcript-{ctx.channel.name}-{ctx.message.id}.txt"
-        async with aiofiles.open(filename, mode='w', encoding='utf-8') as f:
-            await f.write(transcript_text)
-
         # Log to log channel (if configured)
-        # Try 'ticket_logs' first, then 'other', then 'all' (handled by get_log_channel in logging but we need to check manually here or use logging cog helper)
-        
+        # Try 'ticket_logs' first, then 'other' ('all' is handled by get_log_channel)
+        log_channel = None
         logging_cog = self.bot.get_cog("Logging")
         if logging_cog:
-            # We can use the helper directly if we want to send the file
-            # But log_event takes an embed. We want to send a file.
-            # So we get the channel ID manually using the helper logic
-            
             channel_id = await logging_cog.get_log_channel(ctx.guild.id, "ticket_logs")
             if not channel_id:
                 channel_id = await logging_cog.get_log_channel(ctx.guild.id, "other")
-            
             if channel_id:
                 log_channel = ctx.guild.get_channel(channel_id)
-                if log_channel:
-                    await log_channel.send(f"📕 **Ticket Closed**: {ctx.channel.name}", file=discord.File(filename))
 
-        # Clean up file
-        try:
-            os.remove(filename)
-        except:
-            pass
+        # Generate Transcript: one pass over the history feeds the log copy, the archive and the search index
+        log_writer = make_writer(TRANSCRIPT_FORMAT, TRANSCRIPT_GZIP) if log_channel else None
+        archive_writer = make_writer("txt", compress=True) if ARCHIVE_ENABLED else None
+        indexer = ticket_archive.ArchiveIndexer(self.bot.db, ctx.channel.id, ctx.guild.id) if ARCHIVE_ENABLED else None
+        writers = [w for w in (log_writer, archive_writer) if w]
+
+        if indexer:
+            await indexer.clear()
+        if writers:
+            await export_transcript(ctx.channel, user_id, *writers, on_message=indexer.add if indexer else None)
+
+        if log_writer:
+            filename = log_writer.filename(f"transcript-{ctx.channel.name}-{ctx.message.id}")
+            await log_channel.send(f"📕 **Ticket Closed**: {ctx.channel.name} ({log_writer.count} messages)",
+                                   file=discord.File(log_writer.buffer, filename=filename))
+
+        if archive_writer:
+            await indexer.flush()
+            await ticket_archive.store_transcript(self.bot.db, ctx.channel.id, ctx.guild.id, user_id, ctx.channel.name,
+                                                  archive_writer.count, archive_writer.buffer)
 
         # Close Ticket in DB
         await self.bot.db.execute("UPDATE tickets SET status = 'closed' WHERE channel_id = ?", (ctx.channel.id,))
@@ -163,5 +164,46 @@ class Tickets(commands.Cog):
         await ctx.channel.send(f"👮 **{ctx.author.mention}** has claimed this ticket!")
         # Logic to edit channel name or topic could go here
 
+    @commands.hybrid_group(name="ticket", description="Search archived tickets.")
+    async def ticket(self, ctx):
+        await ctx.send("Use `/ticket search <text>` or `/ticket transcript <ticket id>`.")
+
+    @ticket.command(name="search", description="Search the messages of closed tickets.")
+    @commands.has_permissions(manage_channels=True)
+    async def ticket_search(self, ctx, *, query: str):
+        try:
+            rows = await ticket_archive.search(self.bot.db, ctx.guild.id, query)
+        except Exception as e:
+            await ctx.send(f"❌ Search failed: {e}", ephemeral=True)
+            return
+
+        if not rows:
+            await ctx.send(f"No archived ticket messages match `{query}`.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title=f"🔎 Ticket Search: {query}", color=discord.Color.blue())
+        for ticket_id, channel_name, author, created_at, snippet in rows:
+            date = created_at[:10] if created_at else "?"
+            embed.add_field(name=f"{channel_name or 'ticket'} (ID: {ticket_id}) • {author} • {date}", value=snippet[:1024], inline=False)
+        embed.set_footer(text="Use /ticket transcript <ID> to download the full transcript.")
+        await ctx.send(embed=embed, ephemeral=True)
+
+    @ticket.command(name="transcript", description="Download the transcript of a closed ticket.")
+    @commands.has_permissions(manage_channels=True)
+    async def ticket_transcript(self, ctx, ticket_id: str):
+        try:
+            result = await ticket_archive.load_transcript(self.bot.db, int(ticket_id), ctx.guild.id)
+        except ValueError:
+            await ctx.send("❌ Invalid ticket ID.", ephemeral=True)
+            return
+
+        if not result:
+            await ctx.send("❌ No archived transcript for that ticket.", ephemeral=True)
+            return
+
+        channel_name, text = result
+        file = discord.File(io.BytesIO(text.encode("utf-8")), filename=f"transcript-{channel_name}-{ticket_id}.txt")
+        await ctx.send(f"📕 Transcript for **{channel_name}**", file=file, ephemeral=True)
+
 async def setup(bot):
     await bot.add_cog(Tickets(bot))
@@ -1,6 +1,9 @@
 import discord
 from discord.ext import commands
 import asyncio
+from utils.log import get_logger
+
+log = get_logger("voice")
 
 class Voice(commands.Cog):
     def __init__(self, bot):
@@ -54,7 +57,7 @@ class Voice(commands.Cog):
                     await self.bot.db.execute("INSERT INTO temp_channels (channel_id, owner_id) VALUES (?, ?)", (new_channel.id, member.id))
                     await self.bot.db.commit()
                 except Exception as e:
-                    print(f"Error creating voice channel: {e}")
+                    log.exception(f"Error creating voice channel: {e}")
 
         # 2. Check if left a Temp Channel
         if before.channel:
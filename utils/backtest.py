@@ -0,0 +1,105 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import numpy as np
+
+STRATEGIES = {
+    "sma": "Long while the fast SMA is above the slow SMA",
+    "ema": "Long while the fast EMA is above the slow EMA",
+    "rsi": "Buy when RSI(fast) drops below 30, sell when it rises above 70",
+    "hold": "Buy and hold",
+}
+
+TRADING_DAYS = 252
+
+def sma(x, n):
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        c = np.cumsum(np.insert(x, 0, 0.0))
+        out[n - 1:] = (c[n:] - c[:-n]) / n
+    return out
+
+def ema(x, n, alpha=None):
+    # The recursion is sequential; pandas' ewm runs it in C
+    import pandas as pd
+    return pd.Series(x).ewm(alpha=alpha, span=None if alpha else n, adjust=False).mean().to_numpy()
+
+def rsi(x, n):
+    change = np.diff(x, prepend=x[0])
+    gain = ema(np.maximum(change, 0), n, alpha=1 / n)
+    loss = ema(np.maximum(-change, 0), n, alpha=1 / n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100 - 100 / (1 + gain / loss)
+    out[:n] = np.nan
+    return np.where(loss == 0, 100.0, out)
+
+def signals(close, strategy, fast, slow):
+    """1 where the strategy wants to be long after that bar's close, else 0."""
+    if strategy == "hold":
+        return np.ones(len(close))
+    if strategy in ("sma", "ema"):
+        avg = sma if strategy == "sma" else ema
+        f, s = avg(close, fast), avg(close, slow)
+        want = f > s
+        want[np.isnan(s) | np.isnan(f)] = False
+        return want.astype(float)
+
+    # rsi: enter below 30, exit above 70, hold in between (state carried forward)
+    r = rsi(close, fast)
+    events = np.where(r < 30, 1.0, np.where(r > 70, 0.0, np.nan))
+    idx = np.where(np.isnan(events), 0, np.arange(len(events)))
+    np.maximum.accumulate(idx, out=idx)
+    held = events[idx]
+    return np.nan_to_num(held)
+
+def run(close, strategy, fast=20, slow=50):
+    """
+    Backtest one strategy on daily closes. Trades fill at the close after the signal bar
+    (no look-ahead), no costs. Runs in a worker process, so arguments are plain arrays.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    daily = np.diff(close) / close[:-1]
+    # A signal on bar i is filled at bar i+1's close, so it earns the returns from i+1 onwards
+    position = np.concatenate(([0.0], signals(close, strategy, fast, slow)[:-2]))[:len(daily)]
+    returns = position * daily
+
+    equity = np.cumprod(1 + returns)
+    peak = np.maximum.accumulate(np.concatenate(([1.0], equity)))[1:]
+    drawdown = equity / peak - 1
+
+    # Trades: each run of consecutive long days
+    edges = np.diff(np.concatenate(([0.0], position, [0.0])))
+    entries, exits = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    log_growth = np.concatenate(([0.0], np.cumsum(np.log1p(returns))))
+    trade_returns = np.expm1(log_growth[exits] - log_growth[entries])
+
+    years = len(daily) / TRADING_DAYS
+    total = float(equity[-1] - 1) if len(equity) else 0.0
+    return {
+        "return": total,
+        "cagr": (1 + total) ** (1 / years) - 1 if years > 0 and total > -1 else -1.0,
+        "hold_return": float(close[-1] / close[0] - 1),
+        "max_drawdown": float(drawdown.min()) if len(drawdown) else 0.0,
+        "trades": int(len(entries)),
+        "win_rate": float((trade_returns > 0).mean()) if len(trade_returns) else 0.0,
+        "exposure": float(position.mean()) if len(position) else 0.0,
+        "bars": int(len(close)),
+    }
+
+_pool = None
+
+def get_pool():
+    # spawn, not fork: the bot process has the event loop, sqlite and monitor threads running
+    global _pool
+    if _pool is None:
+        _pool = concurrent.futures.ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def shutdown():
+    global _pool
+    if _pool:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+async def run_async(close, strategy, fast=20, slow=50):
+    return await asyncio.get_running_loop().run_in_executor(get_pool(), run, np.array(close), strategy, fast, slow)
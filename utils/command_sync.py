@@ -0,0 +1,44 @@
+import hashlib
+import json
+import os
+
+STATE_FILE = "data/command_tree.json"
+
+def _command_payload(command, tree):
+    # discord.py >= 2.4 takes the tree (for translations), older versions take nothing
+    try:
+        return command.to_dict(tree)
+    except TypeError:
+        return command.to_dict()
+
+def snapshot(tree):
+    """Serialize the global app-command tree into {"type:name": per-command hash}."""
+    commands = {}
+    for command in tree.get_commands():
+        payload = _command_payload(command, tree)
+        key = f"{payload.get('type', 1)}:{payload['name']}"
+        commands[key] = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return commands
+
+def tree_hash(commands):
+    return hashlib.sha256(json.dumps(commands, sort_keys=True).encode()).hexdigest()
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(commands, path=STATE_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"hash": tree_hash(commands), "commands": commands}, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def diff(old, new):
+    """Return (added, removed, changed) command keys between two snapshots."""
+    added = sorted(set(new) - set(old))
+    removed = sorted(set(old) - set(new))
+    changed = sorted(k for k in set(old) & set(new) if old[k] != new[k])
+    return added, removed, changed
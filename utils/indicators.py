@@ -0,0 +1,180 @@
+import datetime
+import numpy as np
+from utils import market_hours
+
+# Daily-bar indicators kept as O(1) running state per symbol. Committed state only covers
+# finished sessions; the live tick is folded in on read (value(price)) without mutating it,
+# and the previous session's close is committed once when the first tick of a later day arrives.
+# Stock days are bar dates: a pre-market or weekend quote still belongs to the last session's bar.
+
+class RollingSMA:
+    def __init__(self, n):
+        self.n = n
+        self.ring = np.zeros(n)
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+
+    def push(self, close):
+        self.total += close - self.ring[self.pos]
+        self.ring[self.pos] = close
+        self.pos = (self.pos + 1) % self.n
+        self.count = min(self.count + 1, self.n)
+
+    def value(self, price):
+        """SMA with today's bar closing at `price`: drop the oldest committed close, add price."""
+        if self.count < self.n - 1:
+            return None
+        oldest = self.ring[self.pos] if self.count == self.n else 0.0
+        return (self.total - oldest + price) / self.n
+
+class RollingEMA:
+    def __init__(self, n):
+        self.alpha = 2 / (n + 1)
+        self.ema = None
+
+    def push(self, close):
+        self.ema = close if self.ema is None else self.ema + self.alpha * (close - self.ema)
+
+    def value(self, price):
+        return None if self.ema is None else self.ema + self.alpha * (price - self.ema)
+
+class WilderRSI:
+    def __init__(self, n):
+        self.n = n
+        self.last = None
+        self.gain = 0.0
+        self.loss = 0.0
+        self.count = 0
+
+    def _step(self, gain, loss, change):
+        if self.count < self.n:
+            # Seed with a plain average of the first n changes
+            k = self.count + 1
+            return gain + (max(change, 0) - gain) / k, loss + (max(-change, 0) - loss) / k
+        return (gain * (self.n - 1) + max(change, 0)) / self.n, (loss * (self.n - 1) + max(-change, 0)) / self.n
+
+    def push(self, close):
+        if self.last is not None:
+            self.gain, self.loss = self._step(self.gain, self.loss, close - self.last)
+            self.count += 1
+        self.last = close
+
+    def value(self, price):
+        if self.last is None or self.count < self.n - 1:
+            return None
+        gain, loss = self._step(self.gain, self.loss, price - self.last)
+        return 100.0 if loss == 0 else 100 - 100 / (1 + gain / loss)
+
+INDICATORS = {"sma": RollingSMA, "ema": RollingEMA, "rsi": WilderRSI}
+
+class SymbolState:
+    def __init__(self, closes, day):
+        self.closes = closes  # committed history, only kept to seed indicators added later
+        self.day = day
+        self.last_price = None
+        self.indicators = {}
+        self.signs = {}       # crossover key -> last fast-vs-slow sign
+
+    def indicator(self, kind, n):
+        key = (kind, n)
+        ind = self.indicators.get(key)
+        if ind is None:
+            ind = INDICATORS[kind](n)
+            for close in self.closes[-(n * 10):]: # EMA/RSI converge well within 10 periods
+                ind.push(close)
+            self.indicators[key] = ind
+        return ind
+
+    def tick(self, price, prev_close, day):
+        if day > self.day and self.last_price is not None:
+            # The quote's previous close is the official one; the last price seen is the fallback
+            close = prev_close if prev_close else self.last_price
+            for ind in self.indicators.values():
+                ind.push(close)
+            self.closes = np.append(self.closes[-4000:], close)
+        self.day = max(day, self.day)
+        self.last_price = price
+
+class IndicatorAlerts:
+    """
+    Evaluates every untriggered indicator alert against the tick store. Alerts are grouped by
+    (ticker, indicator); each group's value is computed once per pass from the symbol's running
+    state, then all thresholds are compared as arrays.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.states = {}
+
+    async def state(self, ticker, tick_day):
+        state = self.states.get(ticker)
+        if state is None:
+            closes = np.empty(0)
+            if not market_hours.is_crypto(ticker):
+                bars = await self.bot.ohlcv.history(ticker, "1d", "2y")
+                cutoff = datetime.datetime.combine(tick_day, datetime.time(), market_hours.ET).timestamp()
+                closes = np.array(bars["close"][bars["ts"] < cutoff])
+            state = self.states[ticker] = SymbolState(closes, tick_day)
+        return state
+
+    async def evaluate(self, alerts):
+        """
+        alerts: rows (id, user_id, ticker, kind, period, period2, threshold, direction).
+        Returns [(row, value)] for the alerts that fired.
+        """
+        if not alerts:
+            self.states.clear()
+            return []
+
+        # One running-state update per symbol
+        ticks, current = {}, set()
+        for ticker in {a[2] for a in alerts}:
+            tick = self.bot.ticks.get(ticker)
+            if not tick:
+                continue
+            when = datetime.datetime.fromtimestamp(tick.ts, market_hours.ET)
+            day = when.date() if market_hours.is_crypto(ticker) else market_hours.bar_date(when)
+            state = await self.state(ticker, day)
+            state.tick(tick.price, tick.prev_close, day)
+            ticks[ticker] = tick
+            if day == when.date():
+                current.add(ticker) # quoted on its bar's own day, so its move is today's
+        for ticker in set(self.states) - {a[2] for a in alerts}:
+            del self.states[ticker]
+
+        # One indicator value per (ticker, kind, period, period2); crossovers also keep the previous sign
+        values, previous = {}, {}
+        keys = []
+        for _, _, ticker, kind, p1, p2, _, _ in alerts:
+            key = (ticker, kind, p1, p2)
+            keys.append(key)
+            if key in values or ticker not in ticks:
+                continue
+            state, price = self.states[ticker], ticks[ticker].price
+            if kind == "move":
+                # Before the open the quote is still the last session's move; don't alert on it again
+                prev = ticks[ticker].prev_close
+                values[key] = (price / prev - 1) * 100 if prev and ticker in current else None
+            elif kind == "rsi":
+                values[key] = state.indicator("rsi", p1).value(price)
+            else: # sma_cross / ema_cross
+                avg = kind.split("_")[0]
+                fast, slow = state.indicator(avg, p1).value(price), state.indicator(avg, p2).value(price)
+                sign = None if fast is None or slow is None else (1.0 if fast > slow else -1.0)
+                previous[key] = state.signs.get(key)
+                state.signs[key] = sign
+                values[key] = sign
+
+        value = np.array([np.nan if values.get(k) is None else values[k] for k in keys])
+        prev = np.array([np.nan if previous.get(k) is None else previous[k] for k in keys])
+        kinds = np.array([a[3] for a in alerts])
+        threshold = np.array([a[6] or 0 for a in alerts], dtype=np.float64)
+        up = np.array([a[7] == "above" for a in alerts])
+
+        cross = np.char.endswith(kinds.astype(str), "_cross")
+        with np.errstate(invalid="ignore"):
+            level = np.where(up, value >= threshold, value <= np.where(kinds == "move", -threshold, threshold))
+            crossed = np.where(up, (prev < 0) & (value > 0), (prev > 0) & (value < 0))
+        fired = np.where(cross, crossed, level) & ~np.isnan(value)
+        return [(alerts[i], float(value[i])) for i in np.flatnonzero(fired)]
@@ -0,0 +1,50 @@
+import importlib
+import time
+
+# Heavy third-party modules used by the market/external cogs, in dependency order
+HEAVY_MODULES = ["numpy", "pandas", "matplotlib", "mplfinance", "yfinance", "tweepy"]
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+    Lets cogs keep `yf.Ticker(...)`-style code without paying the import at load time.
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] else "not loaded"
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+def lazy_import(name):
+    return LazyModule(name)
+
+def preload(modules=HEAVY_MODULES):
+    """
+    Import heavy modules ahead of first use. Meant to run in a worker thread
+    (asyncio.to_thread) while the bot connects; returns {module: seconds or error}.
+    """
+    report = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(name)
+            if name == "matplotlib":
+                # Headless bot: never try to open a GUI backend
+                module.use("Agg")
+            report[name] = time.perf_counter() - start
+        except Exception as e:
+            report[name] = e
+    return report
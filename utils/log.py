@@ -0,0 +1,120 @@
+import contextvars
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+# Per-task context (cog, command, guild, user...) attached to every record logged inside it
+_context = contextvars.ContextVar("log_context", default={})
+
+CONTEXT_FIELDS = ("cog", "command", "guild", "user", "event", "latency_ms")
+
+_listener = None
+
+def get_logger(name):
+    return logging.getLogger(f"botr.{name}")
+
+def bind(**fields):
+    """Add fields to the logging context of the current task. Returns a token for unbind()."""
+    return _context.set({**_context.get(), **fields})
+
+def unbind(token):
+    _context.reset(token)
+
+class ContextFilter(logging.Filter):
+    """Copies the task's context onto the record. Runs on the caller's side of the queue."""
+
+    def filter(self, record):
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps the exception text separate from the message, so the
+    JSON formatter on the listener thread can still emit it as its own field.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in CONTEXT_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        extra = getattr(record, "data", None)
+        if extra:
+            entry.update(extra)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s%(ctx)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record):
+        ctx = " ".join(f"{k}={getattr(record, k)}" for k in CONTEXT_FIELDS if getattr(record, k, None) is not None)
+        record.ctx = f" [{ctx}]" if ctx else ""
+        return super().format(record)
+
+def setup_logging(log_dir="logs", level=logging.INFO, startup_log="startup.log"):
+    """
+    Route all logging through a queue to a background listener thread that writes
+    rotating JSON lines (logs/bot.jsonl), human-readable console output, and the
+    per-boot startup.log. Callers never block on file I/O.
+    """
+    global _listener
+    if _listener:
+        return _listener
+
+    os.makedirs(log_dir, exist_ok=True)
+
+    json_handler = logging.handlers.RotatingFileHandler(os.path.join(log_dir, "bot.jsonl"), maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8")
+    json_handler.setFormatter(JsonFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(TextFormatter())
+
+    startup_handler = logging.FileHandler(startup_log, mode="w", encoding="utf-8")
+    startup_handler.setFormatter(TextFormatter())
+    startup_handler.addFilter(logging.Filter("botr.startup"))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, json_handler, console_handler, startup_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def shutdown_logging():
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,89 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from utils.log import get_logger
+
+log = get_logger("loop")
+
+class LoopMonitor:
+    """
+    Event-loop health monitor.
+    A sampler task sleeps for a fixed interval and records how late it wakes up (scheduling lag).
+    A watchdog thread watches the sampler's heartbeat; when the loop stops beating for longer
+    than the stall threshold it captures the running task and the loop thread's stack, which
+    points straight at the blocking call (sync yfinance, mpf.plot, tweepy, ...).
+    """
+
+    def __init__(self, metrics, interval=0.25, lag_threshold=0.1, stall_threshold=0.25):
+        self.metrics = metrics
+        self.interval = interval
+        self.lag_threshold = lag_threshold
+        self.stall_threshold = stall_threshold
+        self.loop = None
+        self._beat = time.monotonic()
+        self._stall = None  # (coroutine name, stack) captured during the current stall
+        self._task = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start monitoring the running loop. Must be called from inside it."""
+        if self._task: return
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = self.loop.create_task(self._sample())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _sample(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = max(0.0, now - start - self.interval)
+            self.metrics.record("loop", "lag", lag)
+
+            if lag > self.lag_threshold:
+                stall, self._stall = self._stall, None
+                culprit = stall[0] if stall else "unknown"
+                self.metrics.record("loop", f"blocked: {culprit}", lag)
+                log.warning(f"Event loop lagged {lag * 1000:.0f}ms (blocked in {culprit})",
+                            extra={"latency_ms": round(lag * 1000, 1), "data": {"culprit": culprit}})
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(self.stall_threshold / 2):
+            beat = self._beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue <= self.stall_threshold or reported == beat:
+                continue
+
+            # Loop is stuck; capture what it is running once per stall
+            reported = beat
+            culprit = self._running_coroutine()
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            self._stall = (culprit, stack)
+            log.warning(f"Slow callback: event loop blocked for over {overdue * 1000:.0f}ms in {culprit}",
+                        extra={"data": {"culprit": culprit, "stack": stack}})
+
+    def _running_coroutine(self):
+        try:
+            task = asyncio.current_task(self.loop)
+        except RuntimeError:
+            task = None
+        if not task:
+            return "callback"
+        coro = task.get_coro()
+        return getattr(coro, "__qualname__", None) or task.get_name()
@@ -0,0 +1,167 @@
+import datetime
+import functools
+import zoneinfo
+
+try:
+    ET = zoneinfo.ZoneInfo("America/New_York")
+except:
+    # Fallback if tzdata is missing (no DST, but close enough)
+    ET = datetime.timezone(datetime.timedelta(hours=-5))
+
+PRE_OPEN = datetime.time(4, 0)
+OPEN = datetime.time(9, 30)
+CLOSE = datetime.time(16, 0)
+EARLY_CLOSE = datetime.time(13, 0)
+POST_CLOSE = datetime.time(20, 0)
+
+def now_et():
+    return datetime.datetime.now(ET)
+
+def is_crypto(symbol):
+    return symbol.startswith("CRYPTO:")
+
+# --- NYSE holiday calendar ---
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th given weekday of a month (n=-1 for the last one)."""
+    if n > 0:
+        first = datetime.date(year, month, 1)
+        return first + datetime.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+    return last - datetime.timedelta(days=(last.weekday() - weekday) % 7)
+
+def _observed(day):
+    """Saturday holidays move to Friday, Sunday holidays to Monday."""
+    if day.weekday() == 5:
+        return day - datetime.timedelta(days=1)
+    if day.weekday() == 6:
+        return day + datetime.timedelta(days=1)
+    return day
+
+@functools.lru_cache(maxsize=None)
+def holidays(year):
+    """Full-day NYSE closures for a year."""
+    days = {
+        _nth_weekday(year, 1, 0, 3),                  # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),                  # Washington's Birthday
+        _easter(year) - datetime.timedelta(days=2),   # Good Friday
+        _nth_weekday(year, 5, 0, -1),                 # Memorial Day
+        _observed(datetime.date(year, 7, 4)),         # Independence Day
+        _nth_weekday(year, 9, 0, 1),                  # Labor Day
+        _nth_weekday(year, 11, 3, 4),                 # Thanksgiving
+        _observed(datetime.date(year, 12, 25)),       # Christmas
+    }
+    # New Year's Day on a Saturday is not observed (the Friday is the previous year's last session)
+    new_year = datetime.date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days.add(_observed(new_year))
+    if year >= 2022:
+        days.add(_observed(datetime.date(year, 6, 19)))  # Juneteenth
+    return frozenset(days)
+
+@functools.lru_cache(maxsize=None)
+def early_closes(year):
+    """13:00 ET closes: the day before Independence Day, the day after Thanksgiving, Christmas Eve."""
+    days = {_nth_weekday(year, 11, 3, 4) + datetime.timedelta(days=1)}
+    for day in (datetime.date(year, 7, 3), datetime.date(year, 12, 24)):
+        if day.weekday() < 5 and day not in holidays(year):
+            days.add(day)
+    return frozenset(days)
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+def session_hours(day):
+    """(open, close) ET datetimes of the regular session on a date, or None if the market is shut."""
+    if not is_trading_day(day):
+        return None
+    close = EARLY_CLOSE if day in early_closes(day.year) else CLOSE
+    return datetime.datetime.combine(day, OPEN, ET), datetime.datetime.combine(day, close, ET)
+
+def us_session(now=None):
+    """NYSE session for an ET datetime: 'regular', 'pre', 'post' or 'closed' (weekends, holidays, overnight)."""
+    now = now or now_et()
+    hours = session_hours(now.date())
+    if not hours:
+        return "closed"
+    t = now.timetz().replace(tzinfo=None)
+    if OPEN <= t < hours[1].time():
+        return "regular"
+    if PRE_OPEN <= t < OPEN:
+        return "pre"
+    if hours[1].time() <= t < POST_CLOSE:
+        return "post"
+    return "closed"
+
+def next_close(now=None):
+    """The next regular-session close strictly after now."""
+    now = now or now_et()
+    day = now.date()
+    while True:
+        hours = session_hours(day)
+        if hours and hours[1] > now:
+            return hours[1]
+        day += datetime.timedelta(days=1)
+
+def last_close(now=None):
+    """The most recent regular-session close at or before now."""
+    now = now or now_et()
+    day = now.date()
+    while True:
+        hours = session_hours(day)
+        if hours and hours[1] <= now:
+            return hours[1]
+        day -= datetime.timedelta(days=1)
+
+def bar_date(now=None):
+    """Date of the daily bar a stock quote at now belongs to: the last trading day whose session has opened."""
+    now = now or now_et()
+    day = now.date()
+    while True:
+        hours = session_hours(day)
+        if hours and hours[0] <= now:
+            return day
+        day -= datetime.timedelta(days=1)
+
+def next_pre_open(now=None):
+    """Start of the next pre-market session after now."""
+    now = now or now_et()
+    day = now.date()
+    while True:
+        if is_trading_day(day):
+            start = datetime.datetime.combine(day, PRE_OPEN, ET)
+            if start > now:
+                return start
+        day += datetime.timedelta(days=1)
+
+# --- Poll cadence ---
+
+def poll_interval(symbols=(), now=None, fast=60, slow=300):
+    """
+    Seconds until a market poller should run again for these symbols:
+    `fast` in regular hours or whenever crypto (24/7) is involved, `slow` pre/post-market,
+    and when the stock market is shut, the time until the next pre-market session.
+    """
+    if any(is_crypto(s) for s in symbols):
+        return fast
+    now = now or now_et()
+    session = us_session(now)
+    if session == "regular":
+        return fast
+    if session in ("pre", "post"):
+        return slow
+    return max(fast, (next_pre_open(now) - now).total_seconds())
@@ -0,0 +1,43 @@
+import asyncio
+from utils.log import get_logger
+
+log = get_logger("notify")
+
+class NotificationQueue:
+    """
+    DMs from background jobs (settlements, alerts). Jobs enqueue and move on; one worker
+    drains the queue at a steady rate so a batch of hundreds doesn't hit Discord's DM limits.
+    """
+
+    def __init__(self, bot, per_second=2):
+        self.bot = bot
+        self.delay = 1 / per_second
+        self.queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def send(self, user_id, content=None, **kwargs):
+        self.queue.put_nowait((user_id, content, kwargs))
+
+    def __len__(self):
+        return self.queue.qsize()
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            user_id, content, kwargs = await self.queue.get()
+            try:
+                user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+                await user.send(content, **kwargs)
+            except Exception as e:
+                # Closed DMs, deleted accounts: nothing to retry
+                log.debug(f"DM to {user_id} failed: {e}")
+            await asyncio.sleep(self.delay)
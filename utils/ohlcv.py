@@ -0,0 +1,196 @@
+import asyncio
+import datetime
+import os
+import time
+import numpy as np
+from utils import market_hours
+from utils.lazy import lazy_import
+from utils.log import get_logger
+
+yf = lazy_import("yfinance")
+pd = lazy_import("pandas")
+
+log = get_logger("ohlcv")
+
+# One fixed-size record per bar; files are plain arrays of these, so they can be appended and memory-mapped
+BAR = np.dtype([("ts", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<f8")])
+
+# How far back yfinance serves each interval on the first fill
+INITIAL_PERIOD = {"15m": "60d", "30m": "60d", "1h": "730d"}
+
+# Re-check upstream at most this often per (symbol, interval) while the market is open
+REFRESH_AFTER = {"15m": 900, "30m": 1800, "1h": 3600, "1d": 3600, "1wk": 6 * 3600, "1mo": 24 * 3600}
+
+PERIOD_DAYS = {"1mo": 31, "3mo": 92, "6mo": 183, "1y": 366, "2y": 731, "5y": 1827}
+PERIOD_SESSIONS = {"1d": 1, "5d": 5}
+
+def bars_from_frame(hist):
+    """yfinance history DataFrame -> BAR array (timestamps as UTC epoch seconds)."""
+    if hist is None or hist.empty:
+        return np.empty(0, dtype=BAR)
+    index = hist.index.tz_convert("UTC") if hist.index.tz is not None else hist.index.tz_localize("UTC")
+    bars = np.empty(len(hist), dtype=BAR)
+    bars["ts"] = ((index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy(np.int64)
+    for field in ("open", "high", "low", "close", "volume"):
+        bars[field] = hist[field.title()].to_numpy(np.float64)
+    return bars
+
+def frame_from_bars(bars, tz=market_hours.ET):
+    """BAR array -> DataFrame shaped like yfinance history (what mplfinance expects)."""
+    index = pd.to_datetime(bars["ts"], unit="s", utc=True).tz_convert(tz)
+    return pd.DataFrame({"Open": bars["open"], "High": bars["high"], "Low": bars["low"],
+                         "Close": bars["close"], "Volume": bars["volume"]}, index=index)
+
+class OhlcvStore:
+    """
+    On-disk bar history: data/ohlcv/<interval>/<SYMBOL>.bin holds BAR records sorted by time.
+    Refreshes only ask yfinance for bars from the last stored one onwards and write them over
+    the tail in place, so existing memory maps stay valid; reads return zero-copy memmap slices.
+    """
+
+    def __init__(self, root="data/ohlcv", metrics=None, breaker=None):
+        self.root = root
+        self.metrics = metrics
+        self.breaker = breaker  # yfinance's, shared with the quote providers
+        self._maps = {}     # {path: (inode, size, memmap)}
+        self._checked = {}  # {(symbol, interval): last upstream check}
+        self._locks = {}
+
+    def path(self, symbol, interval):
+        return os.path.join(self.root, interval, symbol.upper().replace("/", "_") + ".bin")
+
+    def read(self, symbol, interval, start=None):
+        """All stored bars (or those at/after `start`, epoch seconds) as a read-only memmap view."""
+        path = self.path(symbol, interval)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return np.empty(0, dtype=BAR)
+
+        count = st.st_size // BAR.itemsize # ignore a torn trailing record
+        if count == 0:
+            return np.empty(0, dtype=BAR)
+
+        cached = self._maps.get(path)
+        if cached and cached[0] == st.st_ino and cached[1] == count:
+            bars = cached[2]
+        else:
+            bars = np.memmap(path, dtype=BAR, mode="r", shape=(count,))
+            self._maps[path] = (st.st_ino, count, bars)
+
+        if start is not None:
+            bars = bars[np.searchsorted(bars["ts"], start, side="left"):]
+        return bars
+
+    def last_ts(self, symbol, interval):
+        bars = self.read(symbol, interval)
+        return int(bars["ts"][-1]) if len(bars) else None
+
+    def write(self, symbol, interval, bars):
+        """Merge new bars (sorted) into the file: everything from bars[0].ts onwards is replaced."""
+        if not len(bars):
+            return 0
+        path = self.path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        existing = self.read(symbol, interval)
+        pos = int(np.searchsorted(existing["ts"], bars["ts"][0], side="left")) if len(existing) else 0
+
+        if len(existing) - pos > len(bars):
+            # Upstream returned fewer bars than we hold for that range (a revision); rewrite the
+            # file aside and swap it in so readers of the old map are never truncated under them
+            merged = np.concatenate([np.asarray(existing[:pos]), bars])
+            added = len(bars) - (len(existing) - pos)
+            tmp = path + ".tmp"
+            merged.tofile(tmp)
+            # Windows refuses to replace a file that is still mapped, so release our map first
+            self._maps.pop(path, None)
+            del existing
+            try:
+                os.replace(tmp, path)
+            except PermissionError as e:
+                # A reader still holds a view of the old map; keep the old file until the next refresh
+                os.remove(tmp)
+                log.warning(f"Could not rewrite {path} while it is in use: {e}")
+                return 0
+            return added
+
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.seek(pos * BAR.itemsize)
+            f.write(bars.tobytes())
+        return len(bars) - (len(existing) - pos)
+
+    def fetch(self, symbol, interval):
+        """
+        Blocking: download bars newer than the last stored one and merge them. Returns bars added,
+        or None when Yahoo sent nothing for a symbol it has given us bars for before.
+        """
+        last = self.last_ts(symbol, interval)
+        stock = yf.Ticker(symbol)
+        if last is None:
+            hist = stock.history(period=INITIAL_PERIOD.get(interval, "max"), interval=interval)
+        else:
+            start = datetime.datetime.fromtimestamp(last, datetime.timezone.utc)
+            hist = stock.history(start=start.strftime("%Y-%m-%d"), interval=interval)
+        bars = bars_from_frame(hist)
+        if last is not None and not len(bars):
+            return None # the range includes the last stored bar, so this is never legitimately empty
+        if last is not None:
+            bars = bars[bars["ts"] >= last] # the last stored bar may still be forming; refresh it
+        return self.write(symbol, interval, bars)
+
+    def is_fresh(self, symbol, interval):
+        checked = self._checked.get((symbol, interval))
+        if checked is None:
+            return False
+        if market_hours.us_session() == "closed" and checked >= market_hours.last_close().timestamp():
+            return True # nothing new until the next session
+        return time.time() - checked < REFRESH_AFTER.get(interval, 3600)
+
+    async def ensure(self, symbol, interval):
+        """Bring (symbol, interval) up to date unless it was checked recently."""
+        key = (symbol.upper(), interval)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if self.is_fresh(*key):
+                return 0
+            if self.breaker and not self.breaker.allow():
+                return 0 # Yahoo is backing off; serve what is stored
+            try:
+                if self.metrics:
+                    with self.metrics.timed("external", "yfinance history"):
+                        added = await asyncio.to_thread(self.fetch, *key)
+                else:
+                    added = await asyncio.to_thread(self.fetch, *key)
+            except Exception as e:
+                if not self.breaker:
+                    raise
+                self.breaker.failure(e)
+                return 0
+            if added is None:
+                # An empty answer for a known symbol is how Yahoo throttling looks
+                if self.breaker:
+                    self.breaker.failure(f"no {interval} bars for {key[0]}")
+                return 0
+            if self.breaker:
+                self.breaker.success()
+            self._checked[key] = time.time()
+            if added > 0:
+                log.debug(f"Appended {added} {interval} bars for {key[0]}")
+            return added
+
+    async def history(self, symbol, interval, period="max"):
+        """Stored bars for a yfinance-style period (1d, 5d, 1mo ... ytd, max), refreshed first if stale."""
+        await self.ensure(symbol, interval)
+        bars = self.read(symbol, interval)
+        if not len(bars) or period == "max":
+            return bars
+
+        if period in PERIOD_SESSIONS:
+            # Last N trading days present in the data (sessions never span UTC midnight)
+            days = np.unique(bars["ts"] // 86400)
+            start = int(days[-min(PERIOD_SESSIONS[period], len(days))]) * 86400
+        elif period == "ytd":
+            start = datetime.datetime(market_hours.now_et().year, 1, 1, tzinfo=market_hours.ET).timestamp()
+        else:
+            start = time.time() - PERIOD_DAYS.get(period, 31) * 86400
+        return bars[np.searchsorted(bars["ts"], start, side="left"):]
@@ -0,0 +1,230 @@
+import asyncio
+import collections
+import contextvars
+import re
+import time
+
+# Seconds of DB time spent by the current command (a one-element list so it can be mutated in place)
+_db_time = contextvars.ContextVar("perf_db_time", default=None)
+
+class Series:
+    """Latency samples for one key: a fixed-size ring of recent durations plus running totals."""
+
+    __slots__ = ("samples", "count", "errors", "total")
+
+    def __init__(self, size):
+        self.samples = collections.deque(maxlen=size)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+
+    def add(self, seconds, error=False):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if error:
+            self.errors += 1
+
+    def percentiles(self, points=(50, 95, 99)):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {p: 0.0 for p in points}
+        last = len(ordered) - 1
+        return {p: ordered[min(last, int(round(p / 100 * last)))] for p in points}
+
+class Metrics:
+    """
+    Per-kind latency histograms ("command", "query", "http", "external", ...).
+    Everything runs on the event loop thread, so appends need no locking; percentiles
+    are computed from the ring on read, never on the hot path.
+    """
+
+    def __init__(self, ring_size=1024):
+        self.ring_size = ring_size
+        self.series = collections.defaultdict(dict)  # {kind: {name: Series}}
+        self.started = time.time()
+
+    def record(self, kind, name, seconds, error=False):
+        bucket = self.series[kind]
+        series = bucket.get(name)
+        if series is None:
+            series = bucket[name] = Series(self.ring_size)
+        series.add(seconds, error)
+
+    def timed(self, kind, name):
+        return _Timer(self, kind, name)
+
+    def top(self, kind, key="p95", limit=10):
+        """Rows of (name, count, errors, total, p50, p95, p99) sorted by key, worst first."""
+        rows = []
+        for name, series in self.series.get(kind, {}).items():
+            pct = series.percentiles()
+            rows.append((name, series.count, series.errors, series.total, pct[50], pct[95], pct[99]))
+        index = {"count": 1, "errors": 2, "total": 3, "p50": 4, "p95": 5, "p99": 6}[key]
+        rows.sort(key=lambda r: r[index], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        self.series.clear()
+        self.started = time.time()
+
+    def prometheus(self):
+        """Render every series in Prometheus text exposition format (summaries)."""
+        lines = []
+        for kind, bucket in sorted(self.series.items()):
+            metric = f"botr_{kind}_latency_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for name, series in sorted(bucket.items()):
+                label = _escape_label(name)
+                for p, value in series.percentiles().items():
+                    lines.append(f'{metric}{{name="{label}",quantile="{p / 100}"}} {value:.6f}')
+                lines.append(f'{metric}_sum{{name="{label}"}} {series.total:.6f}')
+                lines.append(f'{metric}_count{{name="{label}"}} {series.count}')
+            errors = f"botr_{kind}_errors_total"
+            lines.append(f"# TYPE {errors} counter")
+            for name, series in sorted(bucket.items()):
+                lines.append(f'{errors}{{name="{_escape_label(name)}"}} {series.errors}')
+        return "\n".join(lines) + "\n"
+
+class _Timer:
+    def __init__(self, metrics, kind, name):
+        self.metrics = metrics
+        self.kind = kind
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.kind, self.name, time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+_whitespace = re.compile(r"\s+")
+
+def query_name(sql):
+    """Collapse a SQL statement into a short, stable label."""
+    return _whitespace.sub(" ", sql).strip()[:80]
+
+def begin_command():
+    """Start accumulating DB time for the current command. Returns (token, accumulator)."""
+    acc = [0.0]
+    return _db_time.set(acc), acc
+
+def end_command(token):
+    try:
+        _db_time.reset(token)
+    except ValueError:
+        pass
+
+def _add_db_time(seconds):
+    acc = _db_time.get()
+    if acc is not None:
+        acc[0] += seconds
+
+class _TimedResult:
+    """Wraps aiosqlite's execute() result so both `await` and `async with` are timed."""
+
+    def __init__(self, metrics, name, result):
+        self.metrics = metrics
+        self.name = name
+        self.result = result
+
+    def _record(self, start, error):
+        elapsed = time.perf_counter() - start
+        self.metrics.record("query", self.name, elapsed, error)
+        _add_db_time(elapsed)
+
+    def __await__(self):
+        return self._await().__await__()
+
+    async def _await(self):
+        start = time.perf_counter()
+        try:
+            cursor = await self.result
+        except Exception:
+            self._record(start, True)
+            raise
+        self._record(start, False)
+        return cursor
+
+    async def __aenter__(self):
+        start = time.perf_counter()
+        try:
+            cursor = await self.result.__aenter__()
+        except Exception:
+            self._record(start, True)
+            raise
+        self._record(start, False)
+        return cursor
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return await self.result.__aexit__(exc_type, exc, tb)
+
+class InstrumentedConnection:
+    """Transparent proxy around an aiosqlite connection that times execute/executemany/commit."""
+
+    def __init__(self, conn, metrics):
+        self._conn = conn
+        self._metrics = metrics
+
+    def execute(self, sql, parameters=None):
+        return _TimedResult(self._metrics, query_name(sql), self._conn.execute(sql, parameters))
+
+    def executemany(self, sql, parameters):
+        return _TimedResult(self._metrics, "MANY " + query_name(sql), self._conn.executemany(sql, parameters))
+
+    async def commit(self):
+        start = time.perf_counter()
+        try:
+            await self._conn.commit()
+        finally:
+            elapsed = time.perf_counter() - start
+            self._metrics.record("query", "COMMIT", elapsed)
+            _add_db_time(elapsed)
+
+    def __getattr__(self, attr):
+        return getattr(self._conn, attr)
+
+def instrument_http(http, metrics):
+    """Time every Discord REST call, keyed by method and route template (not the filled-in URL)."""
+    original = http.request
+
+    async def request(route, **kwargs):
+        start = time.perf_counter()
+        error = False
+        try:
+            return await original(route, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            metrics.record("http", f"{route.method} {getattr(route, 'path', route.url)}", time.perf_counter() - start, error)
+
+    http.request = request
+
+async def serve_prometheus(metrics, port, host="127.0.0.1"):
+    """Minimal HTTP endpoint serving metrics.prometheus() on every request."""
+
+    async def handle(reader, writer):
+        try:
+            await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+            body = metrics.prometheus().encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except Exception:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
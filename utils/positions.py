@@ -0,0 +1,96 @@
+import datetime
+
+# Every trade is appended to `fills` and opens or consumes FIFO `lots`; the `portfolio` row per
+# (user, ticker) is the running aggregate (shares, cost, realized, reserved) every view reads.
+# avg_price and avg_buy_price are both kept at cost / shares so older readers agree.
+# Nothing here commits: callers commit together with their balance changes.
+
+async def position(db, user_id, ticker):
+    """(shares, cost, reserved) for a holding, zeros if none."""
+    async with db.execute("SELECT shares, cost, reserved FROM portfolio WHERE user_id = ? AND ticker = ?", (user_id, ticker)) as cursor:
+        row = await cursor.fetchone()
+    return (row[0], row[1] or 0, row[2] or 0) if row else (0, 0, 0)
+
+async def available(db, user_id, ticker):
+    """Shares that can be sold: held minus those reserved by open sell limits."""
+    shares, _, reserved = await position(db, user_id, ticker)
+    return shares - reserved
+
+async def _fill(db, user_id, ticker, side, shares, price, source, realized=None):
+    cursor = await db.execute("INSERT INTO fills (user_id, ticker, side, shares, price, realized, source, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                              (user_id, ticker, side, shares, price, realized, source, datetime.datetime.now().isoformat()))
+    return cursor.lastrowid
+
+async def record_buy(db, user_id, ticker, shares, price, source):
+    fill_id = await _fill(db, user_id, ticker, "buy", shares, price, source)
+    await db.execute("INSERT INTO lots (user_id, ticker, fill_id, remaining, price) VALUES (?, ?, ?, ?, ?)",
+                     (user_id, ticker, fill_id, shares, price))
+    await db.execute("""
+        INSERT INTO portfolio (user_id, ticker, shares, cost, avg_price, avg_buy_price, realized, reserved)
+        VALUES (?, ?, ?, ?, ?, ?, 0, 0)
+        ON CONFLICT (user_id, ticker) DO UPDATE SET
+            shares = shares + excluded.shares,
+            cost = COALESCE(cost, 0) + excluded.cost,
+            avg_price = (COALESCE(cost, 0) + excluded.cost) / (shares + excluded.shares),
+            avg_buy_price = (COALESCE(cost, 0) + excluded.cost) / (shares + excluded.shares)
+    """, (user_id, ticker, shares, shares * price, price, price))
+
+async def record_sell(db, user_id, ticker, shares, price, source, reserved=False):
+    """
+    Sell against the oldest lots first. `reserved` releases shares an open sell limit was holding.
+    Returns (cost basis of the shares sold, realized P/L).
+    """
+    async with db.execute("SELECT id, remaining, price FROM lots WHERE user_id = ? AND ticker = ? AND remaining > 0 ORDER BY id",
+                          (user_id, ticker)) as cursor:
+        lots = await cursor.fetchall()
+
+    left, basis, updates = shares, 0.0, []
+    for lot_id, remaining, lot_price in lots:
+        if left <= 0:
+            break
+        take = min(left, remaining)
+        basis += take * lot_price
+        left -= take
+        updates.append((remaining - take, lot_id))
+    await db.executemany("UPDATE lots SET remaining = ? WHERE id = ?", updates)
+
+    realized = shares * price - basis
+    await _fill(db, user_id, ticker, "sell", shares, price, source, realized)
+    await db.execute("""
+        UPDATE portfolio SET
+            shares = shares - ?,
+            cost = MAX(COALESCE(cost, 0) - ?, 0),
+            realized = COALESCE(realized, 0) + ?,
+            reserved = MAX(COALESCE(reserved, 0) - ?, 0),
+            avg_price = CASE WHEN shares - ? > 0 THEN MAX(COALESCE(cost, 0) - ?, 0) / (shares - ?) ELSE 0 END,
+            avg_buy_price = CASE WHEN shares - ? > 0 THEN MAX(COALESCE(cost, 0) - ?, 0) / (shares - ?) ELSE 0 END
+        WHERE user_id = ? AND ticker = ?
+    """, (shares, basis, realized, shares if reserved else 0, shares, basis, shares, shares, basis, shares, user_id, ticker))
+    return basis, realized
+
+async def reserve(db, user_id, ticker, shares):
+    await db.execute("UPDATE portfolio SET reserved = COALESCE(reserved, 0) + ? WHERE user_id = ? AND ticker = ?", (shares, user_id, ticker))
+
+async def release(db, user_id, ticker, shares):
+    await db.execute("UPDATE portfolio SET reserved = MAX(COALESCE(reserved, 0) - ?, 0) WHERE user_id = ? AND ticker = ?", (shares, user_id, ticker))
+
+async def backfill(cursor):
+    """
+    Bring holdings from before the ledger into it: one opening lot per position at its recorded
+    average (market buys wrote avg_buy_price, paper trades avg_price) and the aggregate cost.
+    Only touches rows that have never had a cost, so it is a no-op after the first run.
+    """
+    await cursor.execute("""
+        INSERT INTO lots (user_id, ticker, fill_id, remaining, price)
+        SELECT user_id, ticker, NULL, shares, COALESCE(NULLIF(avg_buy_price, 0), avg_price, 0)
+        FROM portfolio WHERE cost IS NULL AND shares > 0
+    """)
+    await cursor.execute("""
+        UPDATE portfolio SET
+            cost = shares * COALESCE(NULLIF(avg_buy_price, 0), avg_price, 0),
+            avg_price = COALESCE(NULLIF(avg_buy_price, 0), avg_price, 0),
+            avg_buy_price = COALESCE(NULLIF(avg_buy_price, 0), avg_price, 0),
+            realized = COALESCE(realized, 0),
+            reserved = COALESCE(reserved, 0)
+        WHERE cost IS NULL
+    """)
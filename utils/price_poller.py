@@ -0,0 +1,163 @@
+import asyncio
+import collections
+import time
+from utils import market_hours
+from utils.quotes import QuoteService
+from utils.log import get_logger
+
+log = get_logger("prices")
+
+# Every symbol someone holds, has an order or alert on, or watches
+TRACKED_SQL = """
+    SELECT ticker FROM portfolio WHERE shares > 0
+    UNION SELECT symbol FROM limit_orders
+    UNION SELECT ticker FROM price_alerts WHERE triggered = 0
+    UNION SELECT ticker FROM indicator_alerts WHERE triggered = 0
+    UNION SELECT ticker FROM options WHERE status = 'active'
+    UNION SELECT ticker FROM watchlist
+"""
+
+# Seconds between refreshes: stocks in regular hours / pre- and post-market (idle when closed);
+# crypto trades around the clock
+STOCK_FAST = 60
+STOCK_SLOW = 300
+CRYPTO_INTERVAL = 60
+
+# A tick older than this (while its market trades) is flagged stale
+STALE_AFTER = {"regular": STOCK_FAST * 5, "pre": STOCK_SLOW * 3, "post": STOCK_SLOW * 3, "crypto": CRYPTO_INTERVAL * 5}
+
+# On-demand lookups (/p, /wl ...) stay polled; cap them so one-off symbols age out
+MAX_EXTRA_SYMBOLS = 200
+
+class PricePoller:
+    """
+    Keeps bot.ticks fresh for every tracked symbol. Stocks are refreshed in batched
+    downloads on a cadence taken from the NYSE calendar (plus one pass after the close,
+    nothing on weekends and holidays), crypto in batched calls every minute, both through
+    the QuoteService's providers. Commands read the store instead of hitting the network;
+    quote() fetches only symbols never seen before, and flags ticks it can't keep fresh.
+    """
+
+    def __init__(self, bot, store, batch_size=50, quotes=None):
+        self.bot = bot
+        self.store = store
+        self.quotes = quotes or QuoteService.default(bot)
+        self.batch_size = batch_size
+        self.extra = collections.OrderedDict()
+        self._last_stock = 0
+        self._last_crypto = 0
+        self._stock_session = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def tracked_symbols(self):
+        async with self.bot.db.execute(TRACKED_SQL) as cursor:
+            rows = await cursor.fetchall()
+        return {row[0] for row in rows if row[0]} | set(self.extra)
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed():
+            try:
+                await self.poll()
+            except Exception as e:
+                log.exception(f"Price poll failed: {e}")
+            await asyncio.sleep(15)
+
+    async def poll(self):
+        now = time.time()
+        session = market_hours.us_session()
+        symbols = await self.tracked_symbols()
+        stocks = [s for s in symbols if not market_hours.is_crypto(s)]
+        coins = [s for s in symbols if market_hours.is_crypto(s)]
+
+        if session == "closed":
+            # One pass right after the session ends picks up the final prices, then idle
+            stock_due = self._stock_session != "closed"
+        else:
+            stock_due = now - self._last_stock >= market_hours.poll_interval(stocks, fast=STOCK_FAST, slow=STOCK_SLOW)
+
+        # Symbols the store has never seen are fetched regardless of the session
+        batch = stocks if stock_due else [s for s in stocks if s not in self.store]
+        if batch:
+            await self.refresh_stocks(batch)
+        if stock_due:
+            self._last_stock = now
+            self._stock_session = session
+
+        crypto_due = now - self._last_crypto >= CRYPTO_INTERVAL
+        batch = coins if crypto_due else [s for s in coins if s not in self.store]
+        if batch:
+            await self.refresh_crypto(batch)
+        if crypto_due:
+            self._last_crypto = now
+
+    async def refresh(self, symbols):
+        # Provider failures are handled (and logged) by the breakers; an open one costs nothing
+        count = 0
+        for i in range(0, len(symbols), self.batch_size):
+            quotes = await self.quotes.fetch(symbols[i:i + self.batch_size], known=self.store)
+            self.store.update_many(quotes)
+            count += len(quotes)
+        return count
+
+    async def refresh_stocks(self, symbols):
+        return await self.refresh(symbols)
+
+    async def refresh_crypto(self, symbols):
+        return await self.refresh(symbols)
+
+    async def refresh_since(self, symbols, since):
+        """Re-fetch any of symbols whose last tick predates `since` (epoch seconds), e.g. to get closing prices."""
+        stale = []
+        for symbol in symbols:
+            tick = self.store.get(symbol)
+            if not tick or tick.ts < since:
+                stale.append(symbol)
+        stocks = [s for s in stale if not market_hours.is_crypto(s)]
+        coins = [s for s in stale if market_hours.is_crypto(s)]
+        if stocks:
+            await self.refresh_stocks(stocks)
+        if coins:
+            await self.refresh_crypto(coins)
+
+    def is_stale(self, tick):
+        """True when tick is the last known price rather than a current one: its providers are
+        backing off, or it is older than the poll cadence allows."""
+        if not self.quotes.available(tick.symbol):
+            return True
+        if market_hours.is_crypto(tick.symbol):
+            return time.time() - tick.ts > STALE_AFTER["crypto"]
+        session = market_hours.us_session()
+        if session == "closed":
+            return tick.ts < market_hours.last_close().timestamp()
+        return time.time() - tick.ts > STALE_AFTER[session]
+
+    async def quote(self, symbol):
+        """
+        Latest tick for a symbol (CRYPTO:<id> for coins). Unknown symbols are fetched once, then
+        polled. Ticks that couldn't be kept fresh are still returned, with stale=True.
+        """
+        tick = self.store.get(symbol)
+        if not tick:
+            await self.refresh([symbol])
+            tick = self.store.get(symbol)
+        if tick:
+            self._touch(symbol)
+            if self.is_stale(tick):
+                tick = tick._replace(stale=True)
+        return tick
+
+    def _touch(self, symbol):
+        self.extra[symbol] = True
+        self.extra.move_to_end(symbol)
+        while len(self.extra) > MAX_EXTRA_SYMBOLS:
+            self.extra.popitem(last=False)
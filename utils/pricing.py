@@ -0,0 +1,154 @@
+import collections
+import datetime
+import math
+import numpy as np
+from utils.log import get_logger
+
+log = get_logger("pricing")
+
+Greeks = collections.namedtuple("Greeks", "price delta gamma theta vega rho")
+Chain = collections.namedtuple("Chain", "ticker spot vol strikes days call put")
+
+RISK_FREE_RATE = 0.04
+TRADING_DAYS = 252
+
+# Used when a ticker has too little history for a realized estimate; clamp keeps one bad print from pricing absurdly
+DEFAULT_VOL = 0.30
+MIN_VOL = 0.05
+MAX_VOL = 3.0
+
+# Cheapest contract the bot sells
+MIN_PREMIUM = 1.0
+
+# Chain grid: expiries offered by /option buy and strikes either side of spot
+CHAIN_DAYS = (7, 14, 21, 30)
+CHAIN_STRIKES = 9
+
+# Chains are reused while spot stays within the same 0.5% step and vol within the same point
+SPOT_BUCKET = math.log(1.005)
+VOL_BUCKET = 0.01
+CHAIN_CACHE_SIZE = 256
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / np.sqrt(2 * np.pi)
+
+def norm_cdf(x):
+    """Standard normal CDF via the Abramowitz-Stegun erf approximation (|error| < 1.5e-7), no scipy needed."""
+    z = np.abs(x) / np.sqrt(2)
+    t = 1 / (1 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - poly * np.exp(-z * z)
+    return 0.5 * (1 + np.sign(x) * erf)
+
+def black_scholes(spot, strike, years, vol, is_call=True, rate=RISK_FREE_RATE):
+    """
+    European option value and Greeks. Every argument broadcasts, so a whole chain
+    (strikes x expiries) or a book of positions prices in one call.
+    theta is per calendar day, vega and rho per 1 percentage point.
+    Expired contracts (years <= 0) are worth intrinsic value.
+    """
+    spot, strike, years, vol, is_call = np.broadcast_arrays(
+        np.asarray(spot, dtype=np.float64), np.asarray(strike, dtype=np.float64),
+        np.asarray(years, dtype=np.float64), np.asarray(vol, dtype=np.float64), np.asarray(is_call, dtype=bool))
+
+    live = years > 0
+    t = np.where(live, years, 1.0)
+    sig = np.maximum(vol, 1e-8)
+    root_t = np.sqrt(t)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * sig * sig) * t) / (sig * root_t)
+    d2 = d1 - sig * root_t
+    discount = np.exp(-rate * t)
+    sign = np.where(is_call, 1.0, -1.0)
+
+    nd1 = norm_cdf(sign * d1)
+    nd2 = norm_cdf(sign * d2)
+    pdf = norm_pdf(d1)
+
+    price = sign * (spot * nd1 - strike * discount * nd2)
+    delta = sign * nd1
+    gamma = pdf / (spot * sig * root_t)
+    theta = (-spot * pdf * sig / (2 * root_t) - sign * rate * strike * discount * nd2) / 365
+    vega = spot * pdf * root_t / 100
+    rho = sign * strike * t * discount * nd2 / 100
+
+    intrinsic = payoff(spot, strike, is_call)
+    expired_delta = np.where(intrinsic > 0, sign, 0.0)
+    zero = np.zeros_like(price)
+    return Greeks(np.where(live, price, intrinsic), np.where(live, delta, expired_delta),
+                  np.where(live, gamma, zero), np.where(live, theta, zero),
+                  np.where(live, vega, zero), np.where(live, rho, zero))
+
+def payoff(spot, strike, is_call):
+    """Intrinsic value per share at expiry."""
+    return np.maximum(np.where(is_call, 1.0, -1.0) * (np.asarray(spot, dtype=np.float64) - strike), 0.0)
+
+def historical_volatility(closes, window=30):
+    """Annualized standard deviation of daily log returns over the last `window` sessions."""
+    closes = np.asarray(closes, dtype=np.float64)
+    closes = closes[np.isfinite(closes) & (closes > 0)][-(window + 1):]
+    if len(closes) < 10:
+        return None
+    returns = np.diff(np.log(closes))
+    return float(np.std(returns, ddof=1) * np.sqrt(TRADING_DAYS))
+
+# {ticker: (date, vol)}; realized vol only changes once a day
+_vol_cache = {}
+
+async def realized_vol(store, ticker, window=30):
+    """Realized volatility from the OHLCV store's daily bars, computed once per ticker per day."""
+    today = datetime.date.today()
+    cached = _vol_cache.get(ticker)
+    if cached and cached[0] == today:
+        return cached[1]
+
+    vol = None
+    try:
+        bars = await store.history(ticker, "1d", "6mo")
+        vol = historical_volatility(bars["close"], window)
+    except Exception as e:
+        log.warning(f"No history for {ticker} volatility: {e}")
+    vol = DEFAULT_VOL if vol is None else min(max(vol, MIN_VOL), MAX_VOL)
+    _vol_cache[ticker] = (today, vol)
+    return vol
+
+def years_until(expiration_date, now=None):
+    """Time to expiry in years, counting to the end of the expiration date."""
+    now = now or datetime.datetime.now()
+    expiry = datetime.datetime.combine(datetime.date.fromisoformat(expiration_date), datetime.time(16, 0))
+    return max((expiry - now).total_seconds(), 0) / (365 * 86400)
+
+def strike_step(spot):
+    """Listed-strike spacing for a price level."""
+    for limit, step in ((5, 0.5), (25, 1), (100, 2.5), (250, 5), (1000, 10)):
+        if spot < limit:
+            return step
+    return 50
+
+def chain_strikes(spot, count=CHAIN_STRIKES):
+    step = strike_step(spot)
+    center = round(spot / step) * step
+    strikes = center + step * (np.arange(count) - count // 2)
+    return strikes[strikes > 0]
+
+# (ticker, spot bucket, vol bucket, expiries, date) -> Chain, least recently used first
+_chain_cache = collections.OrderedDict()
+
+def option_chain(ticker, spot, vol, days=CHAIN_DAYS):
+    """Calls and puts for a strike x expiry grid around spot, priced in one pass and cached per bucket."""
+    key = (ticker, round(math.log(spot) / SPOT_BUCKET), round(vol / VOL_BUCKET), tuple(days), datetime.date.today())
+    chain = _chain_cache.get(key)
+    if chain:
+        _chain_cache.move_to_end(key)
+        return chain
+
+    strikes = chain_strikes(spot)
+    years = np.asarray(days, dtype=np.float64) / 365
+    grid = (strikes[:, None], years[None, :])
+    call = black_scholes(spot, grid[0], grid[1], vol, True)
+    put = black_scholes(spot, grid[0], grid[1], vol, False)
+    chain = Chain(ticker, spot, vol, strikes, tuple(days), call, put)
+
+    _chain_cache[key] = chain
+    while len(_chain_cache) > CHAIN_CACHE_SIZE:
+        _chain_cache.popitem(last=False)
+    return chain
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+import time
+import aiohttp
+from utils import market_hours
+from utils.lazy import lazy_import
+from utils.log import get_logger
+
+yf = lazy_import("yfinance")
+pd = lazy_import("pandas")
+
+log = get_logger("quotes")
+
+# Consecutive failures before a provider's breaker opens, and how long it stays open
+# (doubling on every failed probe up to MAX_BACKOFF)
+FAILURE_THRESHOLD = 3
+BASE_BACKOFF = 30
+MAX_BACKOFF = 900
+PROBE_TIMEOUT = 120
+
+class ProviderError(Exception):
+    pass
+
+class CircuitBreaker:
+    """
+    closed: calls go through. open: calls are refused until retry_at. After that one probe
+    call is let through (half-open); success closes the breaker, failure reopens it for
+    twice as long.
+    """
+
+    def __init__(self, name, threshold=FAILURE_THRESHOLD, base=BASE_BACKOFF, cap=MAX_BACKOFF):
+        self.name = name
+        self.threshold = threshold
+        self.base = base
+        self.cap = cap
+        self.failures = 0
+        self.opens = 0
+        self.retry_at = 0
+        self.probe_at = None
+
+    @property
+    def state(self):
+        if not self.retry_at:
+            return "closed"
+        return "open" if time.time() < self.retry_at else "half-open"
+
+    def allow(self):
+        if not self.retry_at:
+            return True
+        now = time.time()
+        if now < self.retry_at:
+            return False
+        # One probe at a time; a probe that never reported back (cancelled) is retried
+        if self.probe_at is None or now - self.probe_at > PROBE_TIMEOUT:
+            self.probe_at = now
+            return True
+        return False
+
+    def success(self):
+        if self.retry_at:
+            log.info(f"{self.name} recovered after {self.opens} backoff(s)")
+        self.failures = 0
+        self.opens = 0
+        self.retry_at = 0
+        self.probe_at = None
+
+    def failure(self, error):
+        self.failures += 1
+        if self.probe_at is None and (self.failures < self.threshold or self.state == "open"):
+            return
+        delay = min(self.base * 2 ** self.opens, self.cap)
+        self.opens += 1
+        self.retry_at = time.time() + delay
+        self.probe_at = None
+        log.warning(f"{self.name} unavailable ({error}); backing off for {delay}s")
+
+class YFinanceProvider:
+    """Stocks in batched daily downloads. With `aliases`, also CRYPTO:<id> through Yahoo's <CODE>-USD pairs."""
+
+    name = "yfinance"
+    metric = "yfinance download"
+
+    def __init__(self, aliases=None):
+        self.aliases = aliases
+
+    def handles(self, symbol):
+        if market_hours.is_crypto(symbol):
+            return bool(self.aliases and self.aliases(symbol))
+        return True
+
+    async def fetch(self, symbols):
+        yahoo = {(self.aliases(s) if market_hours.is_crypto(s) else s): s for s in symbols}
+        quotes = await asyncio.to_thread(fetch_stocks, list(yahoo))
+        return {yahoo[s]: q for s, q in quotes.items()}
+
+class CoinGeckoProvider:
+    name = "coingecko"
+    metric = "coingecko price"
+
+    def handles(self, symbol):
+        return market_hours.is_crypto(symbol)
+
+    async def fetch(self, symbols):
+        async with aiohttp.ClientSession() as session:
+            return await fetch_crypto(session, symbols)
+
+class ReplayProvider:
+    """
+    Quotes from a JSON file instead of the network, for tests and offline runs. The file is
+    either {symbol: [price, prev_close]} or a list of such frames, played back one frame
+    every `step` seconds and then held on the last.
+    """
+
+    name = "replay"
+    metric = "replay quotes"
+
+    def __init__(self, path, step=60):
+        self.path = path
+        self.step = step
+        self.started = time.time()
+        with open(path) as f:
+            data = json.load(f)
+        self.frames = data if isinstance(data, list) else [data]
+
+    def handles(self, symbol):
+        return True
+
+    async def fetch(self, symbols):
+        frame = self.frames[min(int((time.time() - self.started) / self.step), len(self.frames) - 1)]
+        return {s: tuple(frame[s]) for s in symbols if s in frame}
+
+class QuoteService:
+    """
+    Routes each symbol to the first provider that handles it and whose breaker is closed,
+    failing over to the next one for whatever is left. Errors (and empty answers for
+    symbols that have been priced before, which is how Yahoo throttling looks) count
+    against the provider's breaker; an open breaker is skipped without a network call.
+    """
+
+    def __init__(self, providers, metrics=None):
+        self.providers = providers
+        self.metrics = metrics
+        self.breakers = {p.name: CircuitBreaker(p.name) for p in providers}
+
+    @classmethod
+    def default(cls, bot):
+        replay = os.getenv("QUOTES_REPLAY")
+        if replay:
+            return cls([ReplayProvider(replay)], getattr(bot, "metrics", None))
+
+        def yahoo_pair(symbol):
+            # Only coins the symbol index knows, so a CoinGecko outage can fall back to Yahoo
+            index = getattr(bot, "symbols", None)
+            entry = index.coin_ids.get(symbol.split(":", 1)[1]) if index else None
+            return f"{entry.code}-USD" if entry and entry.code else None
+
+        return cls([CoinGeckoProvider(), YFinanceProvider(aliases=yahoo_pair)], getattr(bot, "metrics", None))
+
+    def breaker(self, name):
+        return self.breakers.get(name)
+
+    def available(self, symbol):
+        """Whether any provider for symbol would be called right now."""
+        return any(p.handles(symbol) and self.breakers[p.name].state != "open" for p in self.providers)
+
+    async def fetch(self, symbols, known=()):
+        """{symbol: (price, prev_close)} for as many of symbols as the providers can price."""
+        quotes = {}
+        remaining = list(symbols)
+        for provider in self.providers:
+            batch = [s for s in remaining if provider.handles(s)]
+            breaker = self.breakers[provider.name]
+            if not batch or not breaker.allow():
+                continue
+            try:
+                if self.metrics:
+                    with self.metrics.timed("external", provider.metric):
+                        got = await provider.fetch(batch)
+                else:
+                    got = await provider.fetch(batch)
+            except Exception as e:
+                breaker.failure(e)
+                continue
+            if not got and any(s in known for s in batch):
+                breaker.failure(f"no quotes for {len(batch)} known symbols")
+                continue
+            breaker.success()
+            quotes.update(got)
+            remaining = [s for s in remaining if s not in got]
+            if not remaining:
+                break
+        return quotes
+
+def fetch_stocks(symbols):
+    """Blocking batch download of the last few daily bars. Returns {symbol: (price, prev_close)}."""
+    data = yf.download(symbols, period="5d", interval="1d", group_by="ticker", progress=False, threads=False)
+    quotes = {}
+    if data is None or data.empty:
+        return quotes
+    for symbol in symbols:
+        closes = _closes(data, symbol)
+        if closes is None or closes.empty:
+            continue
+        prev = float(closes.iloc[-2]) if len(closes) > 1 else None
+        quotes[symbol] = (float(closes.iloc[-1]), prev)
+    return quotes
+
+def _closes(data, symbol):
+    if not isinstance(data.columns, pd.MultiIndex):
+        return data["Close"].dropna() if "Close" in data else None
+    # group_by="ticker" gives (ticker, field); some yfinance versions return (field, ticker)
+    for level in range(data.columns.nlevels):
+        if symbol in data.columns.get_level_values(level):
+            frame = data.xs(symbol, axis=1, level=level)
+            return frame["Close"].dropna() if "Close" in frame else None
+    return None
+
+async def fetch_crypto(session, symbols):
+    """One CoinGecko call for a batch of CRYPTO:<id> symbols."""
+    ids = {s.split(":", 1)[1]: s for s in symbols}
+    url = f"https://api.coingecko.com/api/v3/simple/price?ids={','.join(ids)}&vs_currencies=usd&include_24hr_change=true"
+    async with session.get(url) as resp:
+        if resp.status != 200:
+            # 429s are the common case; raising lets the breaker see them
+            raise ProviderError(f"CoinGecko returned {resp.status} for {len(ids)} coins")
+        data = await resp.json()
+
+    quotes = {}
+    for coin, symbol in ids.items():
+        if coin not in data or "usd" not in data[coin]:
+            continue
+        price = data[coin]["usd"]
+        change = data[coin].get("usd_24h_change")
+        prev = price / (1 + change / 100) if change is not None else None
+        quotes[symbol] = (price, prev)
+    return quotes
@@ -0,0 +1,85 @@
+import asyncio
+import collections
+import datetime
+import numpy as np
+from utils import pricing
+
+STOCKS_SQL = """
+    SELECT user_id, ticker, shares, COALESCE(cost, 0)
+    FROM portfolio WHERE shares > 0
+"""
+OPTIONS_SQL = """
+    SELECT user_id, ticker, option_type, strike_price, expiration_date, premium, contracts
+    FROM options WHERE status = 'active'
+"""
+
+# Per-row exposures, stocks first then options. delta is dollar delta (stock-equivalent exposure,
+# delta * spot), gamma the change in dollar delta for a 1% move, theta $ per day.
+Book = collections.namedtuple("Book", "users tickers kind value cost delta gamma theta priced")
+
+Exposure = collections.namedtuple("Exposure", "keys value pnl delta gamma theta positions unpriced")
+
+async def load_book(bot, user_id=None):
+    """Every open stock and option position (or one user's), marked to the tick store in one pass."""
+    where, params = ("", ()) if user_id is None else (" AND user_id = ?", (user_id,))
+    async with bot.db.execute(STOCKS_SQL + where, params) as cursor:
+        stocks = await cursor.fetchall()
+    async with bot.db.execute(OPTIONS_SQL + where, params) as cursor:
+        options = await cursor.fetchall()
+
+    # Symbols the store has never seen get one batched fetch; everything else is read as-is
+    tickers = {r[1] for r in stocks} | {r[1] for r in options}
+    await bot.prices.refresh_since(tickers, 0)
+    option_tickers = sorted({r[1] for r in options})
+    vols = dict(zip(option_tickers, await asyncio.gather(*(pricing.realized_vol(bot.ohlcv, t) for t in option_tickers))))
+    return mark_book(stocks, options, bot.ticks.prices, vols)
+
+def mark_book(stocks, options, prices_for, vols, now=None):
+    """Pure part of load_book: rows + a price lookup + per-ticker vols -> Book."""
+    now = now or datetime.datetime.now()
+    s_users = np.array([r[0] for r in stocks], dtype=np.int64)
+    s_tickers = [r[1] for r in stocks]
+    shares = np.array([r[2] for r in stocks], dtype=np.float64)
+    s_cost = np.array([r[3] for r in stocks], dtype=np.float64)
+    s_spot = prices_for(s_tickers) if stocks else np.empty(0)
+
+    o_users = np.array([r[0] for r in options], dtype=np.int64)
+    o_tickers = [r[1] for r in options]
+    is_call = np.array([r[2] == 'call' for r in options], dtype=bool)
+    strikes = np.array([r[3] for r in options], dtype=np.float64)
+    years = np.array([pricing.years_until(r[4], now) for r in options], dtype=np.float64)
+    o_cost = np.array([r[5] or 0 for r in options], dtype=np.float64)
+    contracts = np.array([r[6] or 1 for r in options], dtype=np.float64)
+    o_spot = prices_for(o_tickers) if options else np.empty(0)
+    o_vol = np.array([vols.get(t, pricing.DEFAULT_VOL) for t in o_tickers], dtype=np.float64)
+
+    greeks = pricing.black_scholes(o_spot, strikes, years, o_vol, is_call)
+
+    spot = np.concatenate([s_spot, o_spot])
+    priced = ~np.isnan(spot)
+    spot = np.where(priced, spot, 0.0)
+    s_spot, o_spot = spot[:len(stocks)], spot[len(stocks):]
+    delta = np.concatenate([shares, greeks.delta * contracts])
+    gamma = np.concatenate([np.zeros(len(stocks)), greeks.gamma * contracts])
+    return Book(
+        users=np.concatenate([s_users, o_users]),
+        tickers=np.array(s_tickers + o_tickers, dtype=object),
+        kind=np.array(["stock"] * len(stocks) + [r[2] for r in options], dtype=object),
+        value=np.nan_to_num(np.concatenate([shares * s_spot, greeks.price * contracts])),
+        cost=np.concatenate([s_cost, o_cost]),
+        delta=np.nan_to_num(delta * spot),
+        gamma=np.nan_to_num(gamma * spot * spot / 100),
+        theta=np.nan_to_num(np.concatenate([np.zeros(len(stocks)), greeks.theta * contracts])),
+        priced=priced,
+    )
+
+def aggregate(book, by):
+    """Sum a book's exposures per key (book.users or book.tickers). Unpriced positions count at cost."""
+    keys, idx = np.unique(by, return_inverse=True)
+    value = np.where(book.priced, book.value, book.cost)
+
+    def total(column):
+        return np.bincount(idx, weights=column, minlength=len(keys))
+
+    return Exposure(keys, total(value), total(value - book.cost), total(book.delta), total(book.gamma), total(book.theta),
+                    np.bincount(idx, minlength=len(keys)), np.bincount(idx, weights=~book.priced, minlength=len(keys)).astype(int))
@@ -0,0 +1,119 @@
+import asyncio
+import heapq
+import itertools
+import time
+from utils.log import get_logger
+
+log = get_logger("scheduler")
+
+class Scheduler:
+    """
+    Persistent one-shot job scheduler.
+    Jobs live in the scheduled_jobs table and in an in-memory min-heap of due times;
+    a single timer task sleeps until the earliest job and dispatches it to the handler
+    registered for its kind. Jobs that came due while the bot was offline fire on startup.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.handlers = {}   # {kind: coroutine function taking the job key}
+        self._heap = []      # [(due, seq, kind, key)]
+        self._live = {}      # {(kind, key): seq} - heap entries not in here are stale
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._firing = set() # strong refs so running handlers aren't garbage collected
+
+    def register(self, kind, handler):
+        """Register the coroutine called as handler(key) when a job of this kind is due."""
+        self.handlers[kind] = handler
+
+    async def load(self):
+        """Load pending jobs from the database into the heap."""
+        async with self.bot.db.execute("SELECT kind, job_key, due FROM scheduled_jobs") as cursor:
+            rows = await cursor.fetchall()
+
+        for kind, key, due in rows:
+            self._push(kind, key, due)
+        return len(rows)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def schedule(self, kind, key, due):
+        """Persist a job and queue it. `due` is a unix timestamp; rescheduling replaces the old job."""
+        await self.bot.db.execute("INSERT OR REPLACE INTO scheduled_jobs (kind, job_key, due) VALUES (?, ?, ?)", (kind, key, due))
+        await self.bot.db.commit()
+        self._push(kind, key, due)
+
+    async def cancel(self, kind, key):
+        self._live.pop((kind, key), None)
+        await self.bot.db.execute("DELETE FROM scheduled_jobs WHERE kind = ? AND job_key = ?", (kind, key))
+        await self.bot.db.commit()
+
+    def pending(self):
+        return len(self._live)
+
+    def _push(self, kind, key, due):
+        seq = next(self._seq)
+        self._live[(kind, key)] = seq
+        heapq.heappush(self._heap, (due, seq, kind, key))
+        self._wakeup.set()
+
+    async def _run(self):
+        # Handlers need the gateway cache (channels, members), so hold jobs until ready.
+        await self.bot.wait_until_ready()
+
+        overdue = sum(1 for due, seq, kind, key in self._heap if due <= time.time() and self._live.get((kind, key)) == seq)
+        if overdue:
+            log.info(f"Catching up {overdue} overdue job(s).")
+
+        while not self.bot.is_closed():
+            # Discard cancelled / rescheduled entries sitting at the top of the heap
+            while self._heap and self._live.get((self._heap[0][2], self._heap[0][3])) != self._heap[0][1]:
+                heapq.heappop(self._heap)
+
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                # Sleep until the earliest job, or until a new job is pushed
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due, seq, kind, key = heapq.heappop(self._heap)
+            del self._live[(kind, key)]
+            task = asyncio.create_task(self._fire(kind, key))
+            self._firing.add(task)
+            task.add_done_callback(self._firing.discard)
+
+    async def _fire(self, kind, key):
+        handler = self.handlers.get(kind)
+        if not handler:
+            log.warning(f"No handler registered for '{kind}' (key {key}), keeping job.")
+            return
+
+        try:
+            await handler(key)
+        except Exception:
+            # Leave the row in place so the job is retried on the next startup
+            log.exception(f"Job {kind}:{key} failed")
+            return
+
+        if (kind, key) in self._live:
+            return # Handler rescheduled itself
+
+        await self.bot.db.execute("DELETE FROM scheduled_jobs WHERE kind = ? AND job_key = ?", (kind, key))
+        await self.bot.db.commit()
@@ -0,0 +1,253 @@
+import asyncio
+import datetime
+import numpy as np
+from utils import market_hours
+from utils.lazy import lazy_import
+from utils.log import get_logger
+
+yf = lazy_import("yfinance")
+pd = lazy_import("pandas")
+
+log = get_logger("screener")
+
+# Large US caps (S&P 500 style). The whole universe is screened on every refresh.
+UNIVERSE = """
+AAPL MSFT NVDA AMZN GOOGL GOOG META BRK-B AVGO TSLA LLY JPM V UNH XOM MA JNJ PG HD COST
+ABBV MRK CVX WMT BAC KO PEP NFLX CRM AMD ADBE TMO ORCL LIN MCD ACN CSCO ABT WFC DIS INTU
+DHR QCOM VZ TXN CAT AMGN IBM PFE PM NOW GE UNP CMCSA AMAT SPGI NEE ISRG LOW UBER RTX HON
+GS BKNG T PGR ELV AXP BLK SYK COP MS TJX PLD VRTX LMT SCHW MDT C REGN BSX ADP MMC CB
+ADI PANW ETN LRCX DE MU BMY SBUX CI KLAC AMT GILD MDLZ SO FI BA SNPS ANET CDNS ZTS DUK
+ICE SHW MO CME CL WM PYPL EQIX CVS MCK ITW APH TGT MCO PH TT PNC USB ABNB CMG NOC EOG
+FDX CSX BDX ORLY MAR GD EMR SLB MSI AON NXPI APD MPC ECL PSX TDG ROP HCA WELL AJG CARR
+NSC COF FCX CEG TFC ADSK MMM PCAR GM AFL AZO SRE DHI OKE HLT WMB MET TRV AIG NEM CPRT
+PSA SPG O ROST KMB AEP FTNT DLR BK ALL D JCI PAYX CCI GWW LHX TEL MSCI KMI FIS PRU AMP
+LEN CTAS HUM F IQV ODFL FAST KDP CMI PCG EW A OTIS MNST GIS IDXX DOW CTVA KR VLO EXC
+PWR YUM SYY GEHC CNC RCL ACGL KHC EA VRSK IT CTSH XEL NUE ED BKR DD MLM VMC HPQ
+DAL INTC EL ON GLW HIG IRM DXCM PLTR COIN SNOW SHOP XYZ ROKU GME AMC RIVN LCID SOFI
+""".split()
+
+# Seconds between refreshes while the market is open (one more pass runs after the close)
+REFRESH_INTERVAL = 900
+BATCH_SIZE = 100
+HIGH_LOW_BARS = 252 # 52 weeks of sessions
+MIN_HISTORY_BARS = 200 # fewer prior bars than this (recent listings, gaps) can't make a 52-week high/low
+AVG_VOLUME_BARS = 20
+VOLUME_SPIKE = 2.0
+
+# name -> (title, filter, order); every screen is one query on the snapshot table
+SCREENS = {
+    "gainers": ("🟢 Top Gainers", "change_pct IS NOT NULL", "change_pct DESC"),
+    "losers": ("🔴 Top Losers", "change_pct IS NOT NULL", "change_pct ASC"),
+    "volume": ("📊 Volume Spikes", f"volume_ratio >= {VOLUME_SPIKE}", "volume_ratio DESC"),
+    "highs": ("🏔️ 52-Week Highs", "new_high = 1", "change_pct DESC"),
+    "lows": ("🕳️ 52-Week Lows", "new_low = 1", "change_pct ASC"),
+}
+
+COLUMNS = "ticker, price, change_pct, volume, avg_volume, volume_ratio, high_52w, low_52w, from_high_pct, new_high, new_low, updated_at"
+
+def download(symbols, period):
+    """Blocking batch download of daily bars -> {field: DataFrame (dates x symbols)}."""
+    data = yf.download(symbols, period=period, interval="1d", group_by="ticker", progress=False, threads=True)
+    if data is None or data.empty:
+        return {}
+    if not isinstance(data.columns, pd.MultiIndex):
+        # A single symbol comes back without the ticker level
+        data = pd.concat({symbols[0]: data}, axis=1)
+    # group_by="ticker" gives (ticker, field); some yfinance versions return (field, ticker)
+    level = 1 if "Close" in data.columns.get_level_values(1) else 0
+    return {field: data.xs(field, axis=1, level=level) for field in ("High", "Low", "Close", "Volume")}
+
+def merge(history, recent):
+    """Overlay recent bars on the stored history (recent wins on shared dates), one frame per field."""
+    if not history:
+        return recent
+    merged = {}
+    for field, frame in history.items():
+        new = recent.get(field)
+        if new is None:
+            merged[field] = frame
+            continue
+        # Aligned arrays rather than combine_first, which goes column by column
+        index, columns = frame.index.union(new.index), frame.columns.union(new.columns)
+        old = frame.reindex(index=index, columns=columns).to_numpy(dtype=np.float64)
+        fresh = new.reindex(index=index, columns=columns).to_numpy(dtype=np.float64)
+        merged[field] = pd.DataFrame(np.where(np.isnan(fresh), old, fresh), index=index, columns=columns).iloc[-HIGH_LOW_BARS - 1:]
+    return merged
+
+def compute(bars, now=None):
+    """
+    Screen every symbol at once from date x symbol matrices. The last row is the current
+    session; averages and 52-week extremes before it come from the rows above.
+    Returns rows ready for the snapshot table.
+    """
+    close = bars["Close"].sort_index().ffill()
+    high = bars["High"].reindex(close.index).to_numpy(dtype=np.float64)
+    low = bars["Low"].reindex(close.index).to_numpy(dtype=np.float64)
+    volume = bars["Volume"].reindex(close.index).to_numpy(dtype=np.float64)
+    closes = close.to_numpy(dtype=np.float64)
+    if len(closes) < 2:
+        return []
+
+    price, prev = closes[-1], closes[-2]
+    window_high = np.nanmax(high[-HIGH_LOW_BARS - 1:-1], axis=0, initial=-np.inf)
+    window_low = np.nanmin(low[-HIGH_LOW_BARS - 1:-1], axis=0, initial=np.inf)
+    today_high = np.where(np.isnan(high[-1]), price, high[-1])
+    today_low = np.where(np.isnan(low[-1]), price, low[-1])
+    history = np.isfinite(closes[-HIGH_LOW_BARS - 1:-1]).sum(axis=0)
+    seen = np.isfinite(window_high) & np.isfinite(window_low) & (history >= MIN_HISTORY_BARS)
+    high_52w = np.fmax(window_high, today_high)
+    low_52w = np.fmin(window_low, today_low)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (price / prev - 1) * 100
+        avg_volume = np.nanmean(volume[-AVG_VOLUME_BARS - 1:-1], axis=0)
+        volume_ratio = volume[-1] / avg_volume
+        from_high = (price / high_52w - 1) * 100
+
+    updated = (now or datetime.datetime.now()).isoformat()
+    rows = []
+    for i, ticker in enumerate(close.columns):
+        if np.isnan(price[i]):
+            continue
+        rows.append((ticker, float(price[i]), _num(change[i]), _num(volume[-1][i]), _num(avg_volume[i]), _num(volume_ratio[i]),
+                     _num(high_52w[i]), _num(low_52w[i]), _num(from_high[i]),
+                     int(seen[i] and today_high[i] >= window_high[i]), int(seen[i] and today_low[i] <= window_low[i]), updated))
+    return rows
+
+def _num(x):
+    return None if not np.isfinite(x) else float(x)
+
+class Screener:
+    """
+    Precomputes the screener snapshot for UNIVERSE. A year of daily bars is downloaded once
+    per session day; the refreshes in between only fetch the last few bars and overlay them,
+    then the whole universe is recomputed as matrices and the table replaced in one transaction.
+    """
+
+    def __init__(self, bot, universe=UNIVERSE):
+        self.bot = bot
+        self.universe = list(universe)
+        self.history = None
+        self.history_day = None
+        self.unavailable = set() # symbols a backfill found no bars for; not asked again until the next day
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed():
+            try:
+                if await self.due():
+                    count = await self.refresh()
+                    log.info(f"Screener snapshot refreshed: {count} symbols")
+            except Exception as e:
+                log.exception(f"Screener refresh failed: {e}")
+            await asyncio.sleep(60)
+
+    async def last_update(self):
+        async with self.bot.db.execute("SELECT MAX(updated_at) FROM screener") as cursor:
+            row = await cursor.fetchone()
+        return datetime.datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    async def due(self):
+        last = await self.last_update()
+        if last is None:
+            return True
+        # updated_at is local time; compare in ET like the rest of the market code
+        last = last.astimezone(market_hours.ET)
+        if market_hours.us_session() != "regular":
+            # One pass once the closing prices have settled, then idle until the next session
+            settled = market_hours.last_close() + datetime.timedelta(minutes=10)
+            return last < settled <= market_hours.now_et()
+        return (market_hours.now_et() - last).total_seconds() >= REFRESH_INTERVAL
+
+    async def fetch(self, period, symbols=None):
+        backfill = symbols is not None
+        symbols = self.universe if symbols is None else symbols
+        frames = {}
+        for i in range(0, len(symbols), BATCH_SIZE):
+            chunk = symbols[i:i + BATCH_SIZE]
+            # Shares Yahoo's breaker with the price poller, so a throttled Yahoo isn't hit from here too
+            breaker = self.bot.prices.quotes.breaker("yfinance")
+            if breaker and not breaker.allow():
+                break
+            try:
+                with self.bot.metrics.timed("external", "yfinance download"):
+                    fields = await asyncio.to_thread(download, chunk, period)
+            except Exception as e:
+                log.warning(f"Screener download failed for {len(chunk)} symbols: {e}")
+                if breaker:
+                    breaker.failure(e)
+                continue
+            if not fields:
+                if backfill:
+                    # Only symbols the 1y download had no bars for are asked here, so an empty answer is about them, not Yahoo
+                    self.unavailable.update(chunk)
+                    continue
+                # The universe is all listed names, so an empty chunk means Yahoo is throttling
+                log.warning(f"Screener download returned nothing for {len(chunk)} symbols")
+                if breaker:
+                    breaker.failure(f"no bars for {len(chunk)} symbols")
+                continue
+            if breaker:
+                breaker.success()
+            if backfill:
+                # Yahoo answered; whatever it has no bars for (delisted, renamed) isn't worth asking again today
+                close = fields["Close"]
+                have = set(close.columns[close.notna().any().to_numpy()])
+                self.unavailable.update(s for s in chunk if s not in have)
+            for field, frame in fields.items():
+                frames.setdefault(field, []).append(frame)
+        return {field: pd.concat(parts, axis=1) for field, parts in frames.items()}
+
+    async def refresh(self):
+        today = market_hours.now_et().date()
+        if self.history is None or self.history_day != today:
+            bars = await self.fetch("1y")
+            if bars:
+                self.history, self.history_day = bars, today
+                self.unavailable = set()
+        else:
+            # Chunks that failed in the daily 1y download are retried until they have history
+            missing = [s for s in self.missing() if s not in self.unavailable]
+            if missing:
+                self.history = merge(self.history, await self.fetch("1y", missing))
+                gone = sorted(self.unavailable.intersection(missing))
+                if gone:
+                    log.info(f"No daily history for {len(gone)} symbols, skipped until tomorrow: {', '.join(gone[:10])}")
+            bars = merge(self.history, await self.fetch("5d"))
+            self.history = bars
+        if not bars:
+            return 0
+
+        rows = await asyncio.to_thread(compute, bars)
+        try:
+            await self.bot.db.execute("DELETE FROM screener")
+            await self.bot.db.executemany(f"INSERT INTO screener ({COLUMNS}) VALUES ({', '.join('?' * 12)})", rows)
+            await self.bot.db.commit()
+        except Exception:
+            await self.bot.db.rollback()
+            raise
+        return len(rows)
+
+    def missing(self):
+        """Universe symbols with no daily history yet."""
+        close = self.history.get("Close") if self.history else None
+        if close is None:
+            return list(self.universe)
+        have = set(close.columns[close.notna().any().to_numpy()])
+        return [s for s in self.universe if s not in have]
+
+async def screen(db, name, limit=10):
+    """Rows (ticker, price, change_pct, volume_ratio, from_high_pct) for one of SCREENS, best first."""
+    _, where, order = SCREENS[name]
+    async with db.execute(f"SELECT ticker, price, change_pct, volume_ratio, from_high_pct FROM screener WHERE {where} ORDER BY {order} LIMIT ?", (limit,)) as cursor:
+        return await cursor.fetchall()
@@ -0,0 +1,77 @@
+import time
+import numpy as np
+from utils import market_hours
+from utils.log import get_logger
+
+log = get_logger("snapshots")
+
+# Until this long after a close, a snapshot waits for every symbol to have a post-close price;
+# after it, the rest are carried at cost and the rows are flagged partial
+CLOSE_GRACE = 7200
+
+# Every open position with its cost basis and the owner's cash (wallet + bank)
+POSITIONS_SQL = """
+    SELECT p.user_id, p.ticker, p.shares, COALESCE(p.cost, 0),
+           COALESCE(u.balance, 0) + COALESCE(u.bank, 0)
+    FROM portfolio p LEFT JOIN users u ON u.user_id = p.user_id
+    WHERE p.shares > 0
+"""
+
+def value_positions(user_ids, tickers, shares, costs, prices_for):
+    """
+    Value every position in one pass. `prices_for(symbols)` returns a price vector for the
+    unique tickers (NaN where unknown; those positions are carried at cost).
+    Returns (users, value, cost, partial, missing symbols) with one value/cost/partial entry per
+    user; partial is True for users with a position carried at cost.
+    """
+    symbols, symbol_idx = np.unique(tickers, return_inverse=True)
+    symbol_prices = prices_for(list(symbols))
+    prices = symbol_prices[symbol_idx]
+    unpriced = np.isnan(prices)
+    values = np.where(unpriced, costs, shares * prices)
+
+    users, user_idx = np.unique(user_ids, return_inverse=True)
+    value = np.bincount(user_idx, weights=values, minlength=len(users))
+    cost = np.bincount(user_idx, weights=costs, minlength=len(users))
+    partial = np.bincount(user_idx, weights=unpriced, minlength=len(users)) > 0
+    return users, value, cost, partial, [s for s, p in zip(symbols, symbol_prices) if np.isnan(p)]
+
+async def take_snapshot(bot, close=None):
+    """
+    Record every holder's portfolio value, cost basis and cash as of a session close. Returns rows
+    written, or None when some symbols have no price from after the close yet (retry later).
+    """
+    close = close or market_hours.last_close()
+    async with bot.db.execute(POSITIONS_SQL) as cursor:
+        rows = await cursor.fetchall()
+    if not rows:
+        return 0
+
+    user_ids = np.array([r[0] for r in rows], dtype=np.int64)
+    tickers = np.array([r[1] for r in rows])
+    shares = np.array([r[2] for r in rows], dtype=np.float64)
+    costs = np.array([r[3] for r in rows], dtype=np.float64)
+    cash = np.array([r[4] for r in rows], dtype=np.float64)
+
+    await bot.prices.refresh_since(set(tickers.tolist()), close.timestamp())
+    # A tick from before the close is an intraday price, not the close: treat it as missing
+    users, value, cost, partial, missing = value_positions(user_ids, tickers, shares, costs,
+                                                           lambda symbols: bot.ticks.prices(symbols, since=close.timestamp()))
+    if missing:
+        if time.time() < close.timestamp() + CLOSE_GRACE:
+            log.info(f"No close price yet for {len(missing)} symbols, snapshot postponed: {', '.join(missing[:10])}")
+            return None
+        log.warning(f"No close price for {len(missing)} symbols, carried at cost: {', '.join(missing[:10])}")
+
+    # Cash is per user, repeated on each of their rows; take the first
+    _, first = np.unique(user_ids, return_index=True)
+    day = close.date().isoformat()
+    await bot.db.executemany(
+        "INSERT OR REPLACE INTO portfolio_snapshots (user_id, day, value, cost, cash, partial) VALUES (?, ?, ?, ?, ?, ?)",
+        zip(users.tolist(), [day] * len(users), value.round(2).tolist(), cost.round(2).tolist(), cash[first].tolist(), partial.astype(int).tolist()))
+    await bot.db.commit()
+    return len(users)
+
+async def has_snapshot(db, day):
+    async with db.execute("SELECT 1 FROM portfolio_snapshots WHERE day = ? LIMIT 1", (day,)) as cursor:
+        return await cursor.fetchone() is not None
@@ -0,0 +1,301 @@
+import asyncio
+import collections
+import json
+import os
+import time
+import aiohttp
+from discord import app_commands
+from utils import market_hours
+from utils.log import get_logger
+
+log = get_logger("symbols")
+
+EQUITIES_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqtraded.txt"
+COINS_URL = "https://api.coingecko.com/api/v3/coins/list"
+
+REFRESH_AFTER = 86400
+MISS_TTL = 3600
+MAX_MISSES = 2000
+TRIE_DEPTH = 3 # nodes below this keep every key under them and are filtered on lookup
+TOP_K = 25     # Discord shows at most 25 autocomplete choices
+
+# CoinGecko reuses symbols (hundreds of coins call themselves "btc"); these win ties
+POPULAR_COINS = ("bitcoin", "ethereum", "tether", "binancecoin", "solana", "ripple", "usd-coin", "cardano", "dogecoin",
+                 "tron", "avalanche-2", "chainlink", "polkadot", "litecoin", "shiba-inu", "bitcoin-cash", "stellar",
+                 "monero", "uniswap", "pepe", "sui", "toncoin")
+
+# symbol is what the rest of the bot uses (AAPL, CRYPTO:bitcoin); code is the ticker people type
+Symbol = collections.namedtuple("Symbol", "symbol code name kind")
+
+def parse_equities(text):
+    """nasdaqtraded.txt (pipe separated, header + footer line) -> [[ticker, name]], tickers in Yahoo form."""
+    rows = []
+    lines = text.splitlines()
+    header = lines[0].split("|") if lines else []
+    if "Symbol" not in header:
+        return rows
+    sym, name, test = header.index("Symbol"), header.index("Security Name"), header.index("Test Issue")
+    for line in lines[1:]:
+        if line.startswith("File Creation Time"):
+            continue # footer
+        parts = line.split("|")
+        if len(parts) != len(header) or parts[test] == "Y" or not parts[sym].strip() or "$" in parts[sym]:
+            continue
+        # "Apple Inc. - Common Stock" -> "Apple Inc."; BRK.B -> BRK-B like Yahoo
+        rows.append([parts[sym].replace(".", "-"), parts[name].split(" - ")[0].strip()])
+    return rows
+
+def parse_coins(text):
+    """CoinGecko /coins/list JSON -> [[id, symbol, name]]."""
+    return [[c["id"], c.get("symbol", ""), c.get("name", "")] for c in json.loads(text) if c.get("id")]
+
+def label(entry):
+    if entry.kind == "coin":
+        return f"{entry.code} — {entry.name} ({entry.symbol.split(':', 1)[1]})"
+    return f"{entry.code} — {entry.name}"
+
+class _Node:
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children = {}
+        self.entries = []
+
+class SymbolIndex:
+    """
+    Local index of US-listed tickers and CoinGecko coins, kept on disk and refreshed daily.
+    Exact lookups are dict hits; prefix lookups go through a trie whose upper nodes keep their
+    best TOP_K matches and whose depth-TRIE_DEPTH nodes keep every key below them.
+    Symbols that fail an upstream lookup are remembered for MISS_TTL so repeats stay local.
+    """
+
+    def __init__(self, bot, path="data/symbols.json", metrics=None):
+        self.bot = bot
+        self.path = path
+        self.metrics = metrics
+        self.updated = 0
+        self.stocks = {}
+        self.coin_ids = {}
+        self.coin_codes = {}
+        self.coin_names = {}
+        self.roots = {}
+        self.misses = collections.OrderedDict()
+        self._task = None
+
+    @property
+    def ready(self):
+        return bool(self.stocks or self.coin_ids)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        try:
+            data = await asyncio.to_thread(self.read)
+            if data:
+                await asyncio.to_thread(self.build, data)
+        except Exception as e:
+            log.warning(f"Could not load {self.path}: {e}")
+        while True:
+            if time.time() - self.updated >= REFRESH_AFTER:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    log.exception(f"Symbol index refresh failed: {e}")
+            await asyncio.sleep(3600)
+
+    # --- Storage ---
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return json.load(f)
+
+    def write(self, data):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    async def fetch(self, session, url, source):
+        if self.metrics:
+            with self.metrics.timed("external", f"{source} symbols"):
+                async with session.get(url) as resp:
+                    return resp.status, await resp.text()
+        async with session.get(url) as resp:
+            return resp.status, await resp.text()
+
+    async def download(self, session, url, source, parse):
+        """One source's list, or [] if it can't be fetched or parsed."""
+        try:
+            status, text = await self.fetch(session, url, source)
+            if status != 200:
+                log.warning(f"{source} symbol list returned {status}")
+                return []
+            return parse(text)
+        except Exception as e:
+            log.warning(f"{source} symbol list failed: {e!r}")
+            return []
+
+    async def refresh(self):
+        """Download both lists; a source that fails keeps its previous data."""
+        data = {"updated": time.time(), "equities": [], "coins": []}
+        current = await asyncio.to_thread(self.read) or {}
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
+            data["equities"] = await self.download(session, EQUITIES_URL, "nasdaqtrader", parse_equities)
+            data["coins"] = await self.download(session, COINS_URL, "coingecko", parse_coins)
+
+        for source in ("equities", "coins"):
+            if not data[source]:
+                log.warning(f"No {source} from upstream, keeping the previous list")
+                data[source] = current.get(source, [])
+        await asyncio.to_thread(self.write, data)
+        await asyncio.to_thread(self.build, data)
+        log.info(f"Symbol index: {len(self.stocks)} equities, {len(self.coin_ids)} coins")
+
+    # --- Index ---
+
+    def build(self, data):
+        stocks, coin_ids, coin_codes, coin_names = {}, {}, {}, {}
+        keys = [] # (rank, key, entry); lower rank shows first
+
+        for ticker, name in data.get("equities", []):
+            entry = stocks[ticker] = Symbol(ticker, ticker, name or ticker, "stock")
+            keys.append(((0, len(ticker)), ticker.lower(), entry))
+            if name:
+                keys.append(((3, len(name)), name.lower(), entry))
+
+        popular = {coin: i for i, coin in enumerate(POPULAR_COINS)}
+        for coin, code, name in sorted(data.get("coins", []), key=lambda c: (popular.get(c[0], len(popular)), len(c[0]), c[0])):
+            entry = coin_ids[coin] = Symbol(f"CRYPTO:{coin}", code.upper(), name or coin, "coin")
+            coin_codes.setdefault(code.lower(), entry)
+            coin_names.setdefault((name or coin).lower(), entry)
+            boost = 0 if coin in popular else 1
+            keys.append(((1 + boost, len(code)), code.lower(), entry))
+            keys.append(((2 + boost, len(coin)), coin, entry))
+            if name and name.lower() != coin:
+                keys.append(((3 + boost, len(name)), name.lower(), entry))
+
+        # One trie over everything and one per kind, so /crypto's top matches aren't crowded out by stocks
+        keys.sort(key=lambda k: k[0])
+        roots = {None: _Node(), "stock": _Node(), "coin": _Node()}
+        for _, key, entry in keys:
+            for root in (roots[None], roots[entry.kind]):
+                node = root
+                for depth, ch in enumerate(key[:TRIE_DEPTH], 1):
+                    node = node.children.get(ch) or node.children.setdefault(ch, _Node())
+                    if depth == TRIE_DEPTH:
+                        node.entries.append((key, entry))
+                    elif len(node.entries) < TOP_K and entry not in node.entries:
+                        node.entries.append(entry)
+
+        self.stocks, self.coin_ids, self.coin_codes, self.coin_names, self.roots = stocks, coin_ids, coin_codes, coin_names, roots
+        self.updated = data.get("updated", time.time())
+        self.misses.clear()
+
+    def lookup(self, query, kind=None):
+        """Exact match on a ticker, coin id, coin symbol or coin name; None if not in the index."""
+        query = query.strip()
+        if query.upper().startswith("CRYPTO:"):
+            query, kind = query.split(":", 1)[1], "coin"
+        if kind != "coin" and query.upper() in self.stocks:
+            return self.stocks[query.upper()]
+        if kind != "stock":
+            key = query.lower()
+            return self.coin_ids.get(key) or self.coin_codes.get(key) or self.coin_names.get(key)
+        return None
+
+    def complete(self, prefix, kind=None, limit=TOP_K):
+        """Best matches for a typed prefix, in rank order."""
+        prefix = prefix.strip().lower()
+        if prefix.startswith("crypto:"):
+            prefix, kind = prefix[7:], "coin"
+        node = self.roots.get(kind)
+        if node is None:
+            return []
+        for ch in prefix[:TRIE_DEPTH]:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+
+        if len(prefix) < TRIE_DEPTH:
+            found = node.entries
+        else:
+            found = []
+            for key, entry in node.entries:
+                if key.startswith(prefix) and entry not in found:
+                    found.append(entry)
+                    if len(found) == limit:
+                        break
+        return found[:limit]
+
+    def _miss(self, key):
+        self.misses[key] = time.time() + MISS_TTL
+        self.misses.move_to_end(key)
+        while len(self.misses) > MAX_MISSES:
+            self.misses.popitem(last=False)
+
+    async def resolve(self, query, kind=None):
+        """
+        Symbol for what a user typed, or None. Index hits never touch the network. Tickers it
+        doesn't list (mutual funds, OTC, foreign listings, indices) get one upstream quote;
+        if the provider was reachable and had nothing, the miss is cached for MISS_TTL.
+        """
+        found = self.lookup(query, kind)
+        if found:
+            return found
+
+        key = (query.strip().upper(), kind)
+        if self.misses.get(key, 0) > time.time():
+            return None
+
+        tried = []
+        if kind != "coin" and not market_hours.is_crypto(query.upper()):
+            symbol = query.strip().upper()
+            if await self.bot.prices.quote(symbol):
+                return Symbol(symbol, symbol, symbol, "stock")
+            tried.append(symbol)
+        # The coin list is complete once loaded, so coins only go upstream before that
+        if kind != "stock" and not self.ready:
+            coin = query.strip().lower().split(":")[-1]
+            if await self.bot.prices.quote(f"CRYPTO:{coin}"):
+                return Symbol(f"CRYPTO:{coin}", coin.upper(), coin, "coin")
+            tried.append(f"CRYPTO:{coin}")
+        # Don't remember a miss that only happened because the provider is backed off
+        if all(self.bot.prices.quotes.available(s) for s in tried):
+            self._miss(key)
+        return None
+
+    def suggest(self, query, kind=None):
+        """' Did you mean ...?' for an error message, or empty."""
+        matches = []
+        for n in range(min(len(query), TRIE_DEPTH), 0, -1):
+            matches = self.complete(query[:n], kind, 3)
+            if matches:
+                break
+        return f" Did you mean {', '.join(f'`{e.code}`' for e in matches)}?" if matches else ""
+
+# Slash-command autocomplete callbacks (interaction.client is the bot)
+
+def _choices(interaction, current, kind, value):
+    index = getattr(interaction.client, "symbols", None)
+    if not index or not current:
+        return []
+    return [app_commands.Choice(name=label(e)[:100], value=value(e)) for e in index.complete(current, kind)]
+
+async def complete_stocks(interaction, current):
+    return _choices(interaction, current, "stock", lambda e: e.symbol)
+
+async def complete_coins(interaction, current):
+    return _choices(interaction, current, "coin", lambda e: e.symbol.split(":", 1)[1])
+
+async def complete_symbols(interaction, current):
+    return _choices(interaction, current, None, lambda e: e.symbol)
@@ -0,0 +1,89 @@
+import datetime
+import gzip
+from utils.log import get_logger
+
+log = get_logger("tickets")
+
+class ArchiveIndexer:
+    """
+    Buffers ticket messages, writes them to ticket_messages in batches and adds each batch to
+    the FTS index by rowid. Index errors (e.g. SQLite built without FTS5) are logged once and
+    turn indexing off, so a broken search index never stops a ticket from closing.
+    """
+
+    def __init__(self, db, ticket_id, guild_id, batch_size=500):
+        self.db = db
+        self.ticket_id = ticket_id
+        self.guild_id = guild_id
+        self.batch_size = batch_size
+        self.batch = []
+        self.indexed = 0 # highest ticket_messages id already in the FTS index
+        self.enabled = True
+
+    async def clear(self):
+        """Drop rows left by an earlier close attempt of the same ticket before re-indexing it."""
+        # External-content FTS needs the old values to remove its entries
+        await self._execute("INSERT INTO ticket_messages_fts (ticket_messages_fts, rowid, content, author) "
+                            "SELECT 'delete', id, content, author FROM ticket_messages WHERE ticket_id = ?", (self.ticket_id,))
+        await self._execute("DELETE FROM ticket_messages WHERE ticket_id = ?", (self.ticket_id,))
+
+    async def add(self, msg):
+        if not msg.content or not self.enabled: return
+        self.batch.append((self.ticket_id, self.guild_id, msg.id, msg.author.name, msg.content, msg.created_at.isoformat()))
+        if len(self.batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self.batch: return
+        batch, self.batch = self.batch, []
+        await self._execute("INSERT INTO ticket_messages (ticket_id, guild_id, message_id, author, content, created_at) VALUES (?, ?, ?, ?, ?, ?)", batch, many=True)
+        await self._execute("INSERT INTO ticket_messages_fts (rowid, content, author) "
+                            "SELECT id, content, author FROM ticket_messages WHERE ticket_id = ? AND id > ?", (self.ticket_id, self.indexed))
+        if self.enabled:
+            async with self.db.execute("SELECT MAX(id) FROM ticket_messages WHERE ticket_id = ?", (self.ticket_id,)) as cursor:
+                self.indexed = (await cursor.fetchone())[0] or 0
+
+    async def _execute(self, sql, params, many=False):
+        if not self.enabled: return
+        try:
+            if many:
+                await self.db.executemany(sql, params)
+            else:
+                await self.db.execute(sql, params)
+        except Exception as e:
+            self.enabled = False
+            log.warning(f"Ticket {self.ticket_id} not added to the search index: {e}")
+
+async def store_transcript(db, ticket_id, guild_id, user_id, channel_name, message_count, buffer):
+    """Save a gzip-compressed transcript blob next to the ticket row."""
+    await db.execute("INSERT OR REPLACE INTO ticket_archives (channel_id, guild_id, user_id, channel_name, closed_at, message_count, transcript) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (ticket_id, guild_id, user_id, channel_name, datetime.datetime.now().isoformat(), message_count, buffer.getvalue()))
+
+async def load_transcript(db, ticket_id, guild_id):
+    """Return (channel_name, transcript text) for an archived ticket, or None."""
+    async with db.execute("SELECT channel_name, transcript FROM ticket_archives WHERE channel_id = ? AND guild_id = ?", (ticket_id, guild_id)) as cursor:
+        row = await cursor.fetchone()
+    if not row: return None
+    return row[0], gzip.decompress(row[1]).decode("utf-8")
+
+def fts_query(text):
+    """Quote every term so user input can't break FTS5 query syntax."""
+    terms = [t.replace('"', '""') for t in text.split()]
+    return " ".join(f'"{t}"' for t in terms if t)
+
+async def search(db, guild_id, text, limit=10):
+    """Full-text search over archived ticket messages, best matches first."""
+    query = fts_query(text)
+    if not query: return []
+
+    async with db.execute('''
+        SELECT m.ticket_id, a.channel_name, m.author, m.created_at,
+               snippet(ticket_messages_fts, 0, '**', '**', '…', 16)
+        FROM ticket_messages_fts f
+        JOIN ticket_messages m ON m.id = f.rowid
+        LEFT JOIN ticket_archives a ON a.channel_id = m.ticket_id
+        WHERE ticket_messages_fts MATCH ? AND m.guild_id = ?
+        ORDER BY rank
+        LIMIT ?
+    ''', (query, guild_id, limit)) as cursor:
+        return await cursor.fetchall()
@@ -0,0 +1,80 @@
+import collections
+import time
+import numpy as np
+
+# stale is set by PricePoller.quote() when the price could not be kept current
+Tick = collections.namedtuple("Tick", "symbol price prev_close ts stale", defaults=(False,))
+
+class TickStore:
+    """
+    Latest price per symbol in parallel float64 arrays (price, previous close, timestamp),
+    indexed through a symbol -> slot dict. Reads never touch the network; vectorised
+    callers can pull a whole basket at once with prices().
+    """
+
+    def __init__(self, capacity=256):
+        self.index = {}
+        self.symbols = []
+        self.price = np.full(capacity, np.nan)
+        self.prev_close = np.full(capacity, np.nan)
+        self.ts = np.zeros(capacity)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def _slot(self, symbol):
+        slot = self.index.get(symbol)
+        if slot is None:
+            slot = len(self.symbols)
+            if slot == len(self.price):
+                self._grow()
+            self.index[symbol] = slot
+            self.symbols.append(symbol)
+        return slot
+
+    def _grow(self):
+        size = len(self.price) * 2
+        for name, fill in (("price", np.nan), ("prev_close", np.nan), ("ts", 0.0)):
+            old = getattr(self, name)
+            new = np.full(size, fill)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def update(self, symbol, price, prev_close=None, ts=None):
+        slot = self._slot(symbol)
+        self.price[slot] = price
+        if prev_close is not None:
+            self.prev_close[slot] = prev_close
+        self.ts[slot] = ts or time.time()
+
+    def update_many(self, quotes, ts=None):
+        """quotes: {symbol: (price, prev_close)}"""
+        ts = ts or time.time()
+        for symbol, (price, prev_close) in quotes.items():
+            self.update(symbol, price, prev_close, ts)
+
+    def get(self, symbol, max_age=None):
+        slot = self.index.get(symbol)
+        if slot is None or np.isnan(self.price[slot]):
+            return None
+        if max_age is not None and time.time() - self.ts[slot] > max_age:
+            return None
+        prev = self.prev_close[slot]
+        return Tick(symbol, float(self.price[slot]), None if np.isnan(prev) else float(prev), float(self.ts[slot]))
+
+    def prices(self, symbols, since=None):
+        """Array of latest prices for symbols, NaN where unknown (or last updated before `since`, epoch seconds)."""
+        slots = np.array([self.index.get(s, -1) for s in symbols], dtype=np.int64)
+        out = np.full(len(slots), np.nan)
+        known = slots >= 0
+        if since is not None:
+            known[known] = self.ts[slots[known]] >= since
+        out[known] = self.price[slots[known]]
+        return out
+
+    def age(self, symbol):
+        slot = self.index.get(symbol)
+        return None if slot is None else time.time() - self.ts[slot]
@@ -0,0 +1,112 @@
+import datetime
+import gzip
+import html
+import io
+
+class TextRenderer:
+    extension = "txt"
+
+    def header(self, channel_name, user_id, date):
+        return f"Transcript for {channel_name}\nUser ID: {user_id}\nDate: {date}\n\n"
+
+    def message(self, msg):
+        line = f"[{msg.created_at.strftime('%Y-%m-%d %H:%M:%S')}] {msg.author.name}: {msg.content}\n"
+        for att in msg.attachments:
+            line += f"[Attachment] {att.url}\n"
+        return line
+
+    def footer(self):
+        return ""
+
+class HtmlRenderer:
+    extension = "html"
+
+    def header(self, channel_name, user_id, date):
+        title = html.escape(f"Transcript for {channel_name}")
+        return (
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>{title}</title>"
+            "<style>body{font-family:sans-serif;background:#313338;color:#dbdee1}"
+            ".m{margin:4px 0}.t{color:#949ba4;font-size:12px}.a{font-weight:bold;color:#f2f3f5}"
+            "a{color:#00a8fc}</style></head><body>\n"
+            f"<h2>{title}</h2><p>User ID: {user_id}<br>Date: {html.escape(str(date))}</p>\n"
+        )
+
+    def message(self, msg):
+        parts = [
+            f"<div class=\"m\"><span class=\"t\">[{msg.created_at.strftime('%Y-%m-%d %H:%M:%S')}]</span> "
+            f"<span class=\"a\">{html.escape(msg.author.name)}</span>: {html.escape(msg.content)}"
+        ]
+        for att in msg.attachments:
+            url = html.escape(att.url, quote=True)
+            parts.append(f"<br>[Attachment] <a href=\"{url}\">{html.escape(att.filename)}</a>")
+        parts.append("</div>\n")
+        return "".join(parts)
+
+    def footer(self):
+        return "</body></html>\n"
+
+RENDERERS = {
+    "txt": TextRenderer,
+    "html": HtmlRenderer,
+}
+
+class TranscriptWriter:
+    """
+    Incremental transcript writer.
+    Rendered chunks are encoded straight into an in-memory buffer (optionally through gzip),
+    so the transcript is never held as one big string and nothing is written to disk.
+    """
+
+    def __init__(self, renderer, compress=False):
+        self.renderer = renderer
+        self.compress = compress
+        self.buffer = io.BytesIO()
+        self._out = gzip.GzipFile(fileobj=self.buffer, mode="wb") if compress else self.buffer
+        self.count = 0
+
+    def write_header(self, channel_name, user_id, date):
+        self._write(self.renderer.header(channel_name, user_id, date))
+
+    def write_message(self, msg):
+        self._write(self.renderer.message(msg))
+        self.count += 1
+
+    def close(self):
+        """Finish the transcript and return the buffer rewound for reading."""
+        self._write(self.renderer.footer())
+        if self.compress:
+            self._out.close()
+        self.buffer.seek(0)
+        return self.buffer
+
+    def filename(self, stem):
+        name = f"{stem}.{self.renderer.extension}"
+        return name + ".gz" if self.compress else name
+
+    def _write(self, text):
+        if text:
+            self._out.write(text.encode("utf-8"))
+
+def make_writer(fmt="txt", compress=False):
+    return TranscriptWriter(RENDERERS.get(fmt, TextRenderer)(), compress=compress)
+
+async def export_transcript(channel, user_id, *writers, on_message=None):
+    """
+    Stream a channel's history (oldest first) into one or more TranscriptWriters and close them.
+    on_message, if given, is awaited for every message (used by the archive indexer).
+    """
+    date = datetime.datetime.now()
+    for writer in writers:
+        writer.write_header(channel.name, user_id, date)
+
+    # history() pages 100 messages at a time; each one is rendered and dropped immediately
+    async for msg in channel.history(limit=None, oldest_first=True):
+        for writer in writers:
+            writer.write_message(msg)
+        if on_message:
+            await on_message(msg)
+
+    for writer in writers:
+        writer.close()
+    return writers